@@ -0,0 +1,49 @@
+# Solves a fixed suite of Connect Four positions with C4OptimalPlayer and
+# reports, per position, the score, nodes searched, time-to-solve and nodes/sec.
+#
+# Usage: PYTHONPATH=src python bench/c4_optimal_player_bench.py
+import time
+from c4.c4_board import C4Board
+from c4.c4_optimal_player import C4OptimalPlayer
+
+# (0-based column sequence, expected score), grouped by plies played
+POSITIONS: list[tuple[str, int]] = [
+  ("3566514163062533055162322612", -4),
+  ("4626614635035614051604113130", -7),
+  ("122066241231165350212306", -9),
+  ("040111664050301306233615", -7),
+  ("52056346446301462513", -11),
+  ("11622312521640506505", -2),
+  ("3144053653110035", 12),
+  ("0166326416520455", 0),
+  ("405520531326", 0),
+  ("603662054154", 2),
+]
+
+def main() -> None:
+  total_nodes: int = 0
+  total_time: float = 0.0
+
+  print(f"{'position':<30} {'ply':>3} {'score':>5} {'nodes':>9} {'time (s)':>9} {'nodes/s':>9}")
+  for moves, expected in POSITIONS:
+    board: C4Board = C4Board()
+    for move in moves:
+      board.make_move(board.expected_next_move_color, int(move))
+
+    player: C4OptimalPlayer = C4OptimalPlayer()  # Fresh table, so positions are independent
+    start: float = time.perf_counter()
+    score: int = player.score(board)
+    elapsed: float = time.perf_counter() - start
+
+    if score != expected:
+      raise Exception(f"Wrong score for {moves}: {score}, expected {expected}")
+
+    total_nodes += player.node_count
+    total_time += elapsed
+    nodes_per_sec: float = player.node_count / elapsed if elapsed > 0 else 0.0
+    print(f"{moves:<30} {len(moves):>3} {score:>5} {player.node_count:>9} {elapsed:>9.3f} {nodes_per_sec:>9.0f}")
+
+  print(f"TOTAL: {total_nodes} nodes in {total_time:.3f}s => {total_nodes / total_time:.0f} nodes/s")
+
+if __name__ == "__main__":
+  main()
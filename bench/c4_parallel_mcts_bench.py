@@ -0,0 +1,63 @@
+# Playouts/sec of parallel MCTS against the amount of parallelism:
+#  - root parallelisation, for 1, 2, 4, ... worker processes (up to the core count)
+#  - leaf batching with an (untrained) DQN policy, for several batch sizes
+#
+# Usage: PYTHONPATH=src python bench/c4_parallel_mcts_bench.py
+import multiprocessing
+import time
+from stable_baselines3 import DQN
+from c4.c4_board import C4Board, Color
+from c4.c4_env import ConnectFourEnv
+from c4.c4_mcts_player import C4MctsPlayer
+from c4.c4_parallel_mcts import C4LeafBatchedMctsPlayer, C4RootParallelMctsPlayer
+
+ITERATIONS_PER_WORKER: int = 4000
+LEAF_ITERATIONS: int = 2048
+
+def _position() -> C4Board:
+  board: C4Board = C4Board()
+  for move in "3324":
+    board.make_move(board.expected_next_move_color, int(move))
+  return board
+
+def bench_root_parallel() -> None:
+  print("Root parallel (random rollouts)")
+  print(f"{'workers':>8} {'playouts':>9} {'time (s)':>9} {'playouts/s':>11} {'speedup':>8}")
+
+  baseline: float = 0.0
+  workers: int = 1
+  while workers <= multiprocessing.cpu_count():
+    with C4RootParallelMctsPlayer(workers=workers, iterations=ITERATIONS_PER_WORKER) as player:
+      player.search(C4Board())  # Start the pool outside of the timing
+      player.playouts = 0
+
+      start: float = time.perf_counter()
+      player.search(_position())
+      elapsed: float = time.perf_counter() - start
+
+    rate: float = player.playouts / elapsed
+    baseline = baseline or rate
+    print(f"{workers:>8} {player.playouts:>9} {elapsed:>9.2f} {rate:>11.0f} {rate / baseline:>8.2f}")
+    workers *= 2
+
+def bench_leaf_batched() -> None:
+  print("Leaf batched (DQN priors and values)")
+  print(f"{'batch':>8} {'playouts':>9} {'time (s)':>9} {'playouts/s':>11}")
+
+  policy: DQN = DQN("MlpPolicy", ConnectFourEnv(None, Color.O), seed=0)
+  for batch_size in [1, 8, 32, 128]:
+    player: C4MctsPlayer
+    if batch_size == 1:
+      player = C4MctsPlayer(iterations=LEAF_ITERATIONS, policy=policy, seed=0)
+    else:
+      player = C4LeafBatchedMctsPlayer(policy, batch_size=batch_size, iterations=LEAF_ITERATIONS, seed=0)
+
+    start: float = time.perf_counter()
+    player.search(_position())
+    elapsed: float = time.perf_counter() - start
+    print(f"{batch_size:>8} {player.playouts:>9} {elapsed:>9.2f} {player.playouts / elapsed:>11.0f}")
+
+if __name__ == "__main__":
+  bench_root_parallel()
+  print()
+  bench_leaf_batched()
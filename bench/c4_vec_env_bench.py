@@ -0,0 +1,48 @@
+# Env steps/sec of DummyVecEnv(ConnectFourEnv) against ConnectFourVecEnv, with
+# an (untrained) DQN opponent and random legal agent moves.
+#
+# Usage: PYTHONPATH=src python bench/c4_vec_env_bench.py
+import contextlib
+import io
+import time
+import numpy as np
+from stable_baselines3 import DQN
+from stable_baselines3.common.vec_env import DummyVecEnv, VecEnv
+from c4.c4_board import Color
+from c4.c4_env import ConnectFourEnv
+from c4.c4_vec_env import ConnectFourVecEnv
+
+ENV_COUNTS: list[int] = [1, 16, 64, 256]
+STEPS: int = 20_000  # Env steps per measurement (i.e. vector steps * env count)
+
+def _random_legal(rng: np.random.Generator, legal: np.ndarray) -> np.ndarray:
+  # One random legal column per row of the mask
+  scores: np.ndarray = rng.random(legal.shape) * legal
+  return np.argmax(scores, axis=1)
+
+def _steps_per_second(vec_env: VecEnv, legal_mask, count: int) -> float:
+  rng: np.random.Generator = np.random.default_rng(0)
+  vec_env.reset()
+  vector_steps: int = max(1, STEPS // count)
+  start: float = time.perf_counter()
+  for _ in range(vector_steps):
+    vec_env.step(_random_legal(rng, legal_mask()))
+  return vector_steps * count / (time.perf_counter() - start)
+
+def main() -> None:
+  opponent: DQN = DQN("MlpPolicy", ConnectFourEnv(None, Color.O), seed=0)
+
+  print(f"{'envs':>5} {'DummyVecEnv':>12} {'VecEnv':>10} {'speedup':>8}")
+  for count in ENV_COUNTS:
+    dummy: DummyVecEnv = DummyVecEnv([lambda: ConnectFourEnv(opponent, Color.O) for _ in range(count)])
+    dummy_mask = lambda: np.array([env.board.action_mask() for env in dummy.envs])
+    with contextlib.redirect_stdout(io.StringIO()):  # ConnectFourEnv's progress lines
+      dummy_rate: float = _steps_per_second(dummy, dummy_mask, count)
+
+    vec_env: ConnectFourVecEnv = ConnectFourVecEnv(count, opponent, Color.O)
+    vec_rate: float = _steps_per_second(vec_env, vec_env.batch.legal_mask, count)
+
+    print(f"{count:>5} {dummy_rate:>12.0f} {vec_rate:>10.0f} {vec_rate / dummy_rate:>7.1f}x")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,86 @@
+# NumPy array allocations and time per env step for the board envs. Array
+# allocations are counted as calls to the NumPy functions and methods which
+# allocate a new array, as seen by cProfile (which also sees C functions).
+#
+# Usage: PYTHONPATH=src python bench/env_allocations_bench.py
+import contextlib
+import cProfile
+import io
+import pstats
+import random
+import tempfile
+import time
+import gymnasium as gym
+import numpy as np
+from c4.c4_board import Color
+from c4.c4_env import ConnectFourEnv
+from c4.ttt_1_play_env import Ttt1PlayEnv
+from c4.ttt_2_play_env import Ttt2PlayEnv
+from c4.ttt_optimal_player import TttOptimalPlayer
+
+STEPS: int = 20_000
+ALLOCATING: list[str] = [
+  "<method 'astype' of 'numpy.ndarray' objects>",
+  "<method 'copy' of 'numpy.ndarray' objects>",
+  "<built-in method numpy.zeros>",
+  "<built-in method numpy.empty>",
+  "<built-in method numpy.array>",
+]
+
+class FirstEmptyOpponent:
+  # Plays the first legal action, reading the observation element by element
+  # so that it allocates no arrays itself
+  def predict(self, observation: np.ndarray, deterministic: bool=False):
+    rows, columns = observation.shape
+    if rows == 3 and columns == 3:
+      return next(ii for ii in range(9) if observation[ii // 3, ii % 3] == 0), None
+    return next(col for col in range(columns) if observation[0, col] == 0), None
+
+def run(env: gym.Env, steps: int) -> None:
+  rng: random.Random = random.Random(0)
+  env.reset()
+  for _ in range(steps):
+    _, _, done, _, info = env.step(rng.choice(np.flatnonzero(info_mask(env)).tolist()))
+    if done:
+      env.reset()
+
+def info_mask(env: gym.Env) -> np.ndarray:
+  board = env.board
+  if hasattr(board, "heights"):
+    return np.array([height < board.rows for height in board.heights])
+  return np.array([board.get_at(ii) == Color.NONE.value for ii in range(9)])
+
+def allocations(env: gym.Env) -> int:
+  profile: cProfile.Profile = cProfile.Profile()
+  profile.enable()
+  run(env, STEPS)
+  profile.disable()
+
+  stats: dict = pstats.Stats(profile).stats
+  count: int = sum(calls for (_, _, name), (calls, *_) in stats.items() if name in ALLOCATING)
+  # Less the agent's own mask above, which is not part of the env
+  return count - STEPS
+
+def main(directory: str) -> None:
+  optimal: TttOptimalPlayer = TttOptimalPlayer(f"{directory}/optimal.bin")
+  envs: dict[str, callable] = {
+    "ConnectFourEnv": lambda: ConnectFourEnv(FirstEmptyOpponent(), Color.O),
+    "Ttt1PlayEnv": lambda: Ttt1PlayEnv(optimal, Color.O),
+    "Ttt2PlayEnv": lambda: Ttt2PlayEnv(FirstEmptyOpponent(), Color.X),
+  }
+
+  print(f"{'env':>15} {'arrays/step':>12} {'us/step':>8}")
+  with contextlib.redirect_stdout(io.StringIO()) as output:  # ConnectFourEnv's progress lines
+    rows: list[str] = []
+    for name, make_env in envs.items():
+      count: int = allocations(make_env())
+      env: gym.Env = make_env()
+      start: float = time.perf_counter()
+      run(env, STEPS)
+      elapsed: float = time.perf_counter() - start
+      rows.append(f"{name:>15} {count / STEPS:>12.2f} {elapsed / STEPS * 1e6:>8.1f}")
+  print("\n".join(rows))
+
+if __name__ == "__main__":
+  with tempfile.TemporaryDirectory() as directory:  # The perfect-play table
+    main(directory)
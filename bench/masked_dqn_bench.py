@@ -0,0 +1,83 @@
+# Env steps for DQN and MaskedDQN to reach a target win rate in Tic-Tac-Toe
+# (Ttt2PlayEnv, agent plays O) against a random legal-move opponent. Every
+# EVAL_INTERVAL steps the greedy agent plays EVAL_GAMES games; illegal moves
+# count as losses.
+#
+# Usage: PYTHONPATH=src python bench/masked_dqn_bench.py
+import time
+import numpy as np
+from stable_baselines3 import DQN
+from stable_baselines3.common.callbacks import BaseCallback
+from c4.c4_board import Color
+from c4.masked_dqn import MaskedDQN, random_legal_actions
+from c4.ttt_2_play_env import Ttt2PlayEnv
+
+TARGET_WIN_RATE: float = 0.9
+MAX_STEPS: int = 40_000
+EVAL_INTERVAL: int = 1_000
+EVAL_GAMES: int = 200
+SEEDS: list[int] = [0, 1, 2]
+
+class RandomOpponent:
+  def __init__(self, seed: int):
+    self.rng: np.random.Generator = np.random.default_rng(seed)
+
+  def predict(self, observation: np.ndarray, deterministic: bool=False):
+    return random_legal_actions(observation, 9, self.rng), None
+
+def win_rate(model: DQN, seed: int) -> float:
+  env: Ttt2PlayEnv = Ttt2PlayEnv(RandomOpponent(seed), Color.O)
+  wins: int = 0
+  for _ in range(EVAL_GAMES):
+    obs, _ = env.reset()
+    while True:
+      action, _ = model.predict(obs, deterministic=True)
+      obs, _, done, _, info = env.step(int(action))
+      if done:
+        wins += info.get("winner") == str(Color.O)
+        break
+  return wins / EVAL_GAMES
+
+class WinRateCallback(BaseCallback):
+  # Evaluates every EVAL_INTERVAL steps, and stops training at the target
+  def __init__(self, seed: int):
+    super().__init__()
+    self.seed = seed
+    self.reached_at: int | None = None
+
+  def _on_step(self) -> bool:
+    if self.num_timesteps % EVAL_INTERVAL == 0 and win_rate(self.model, self.seed) >= TARGET_WIN_RATE:
+      self.reached_at = self.num_timesteps
+      return False
+    return True
+
+def steps_to_target(algorithm: type[DQN], seed: int) -> int | None:
+  env: Ttt2PlayEnv = Ttt2PlayEnv(RandomOpponent(seed), Color.O)
+  model: DQN = algorithm(
+    "MlpPolicy",
+    env,
+    learning_rate=0.001,
+    buffer_size=10000,
+    learning_starts=500,
+    batch_size=64,
+    gamma=0.95,
+    target_update_interval=100,
+    exploration_fraction=0.5,
+    exploration_final_eps=0.1,
+    seed=seed,
+  )
+  callback: WinRateCallback = WinRateCallback(seed + 100)
+  model.learn(MAX_STEPS, callback=callback)
+  return callback.reached_at
+
+def main() -> None:
+  print(f"Env steps to a {TARGET_WIN_RATE:.0%} win rate (max {MAX_STEPS})")
+  print(f"{'algorithm':>10} " + " ".join(f"{'seed ' + str(seed):>8}" for seed in SEEDS) + f" {'time (s)':>9}")
+  for algorithm in (DQN, MaskedDQN):
+    start: float = time.perf_counter()
+    steps = [steps_to_target(algorithm, seed) for seed in SEEDS]
+    cells: str = " ".join(f"{str(step) if step is not None else '-':>8}" for step in steps)
+    print(f"{algorithm.__name__:>10} {cells} {time.perf_counter() - start:>9.1f}")
+
+if __name__ == "__main__":
+  main()
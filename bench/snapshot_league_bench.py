@@ -0,0 +1,81 @@
+# Self-play training throughput in Tic-Tac-Toe: the old loop, which rebuilds
+# an env and calls set_env() every iteration to train each DQN against the
+# other live one, against league training, where each player's envs are built
+# once and play per-episode samples from a SnapshotLeague of the other player.
+# Both do one gradient step per env transition, so only those two rows compare
+# like for like - the league's gain there is small, as most of the time goes
+# on gradient steps. The last row does one gradient step per vec env step
+# (LEAGUE_ENVS times fewer updates), for reference only.
+#
+# Usage: PYTHONPATH=src python bench/snapshot_league_bench.py
+import contextlib
+import io
+import time
+from stable_baselines3 import DQN
+from c4.batched_opponent_vec_env import BatchedOpponentVecEnv
+from c4.c4_board import Color
+from c4.snapshot_league import LeagueCallback, SnapshotLeague
+from c4.ttt_2_play_env import Ttt2PlayEnv
+
+ITERATIONS: int = 5
+TIME_STEPS: int = 2000
+LEAGUE_ENVS: int = 8
+PARAMS = dict(
+  policy="MlpPolicy",
+  learning_rate=0.001,
+  buffer_size=10000,
+  learning_starts=500,
+  batch_size=64,
+  gamma=0.95,
+  train_freq=1,
+  target_update_interval=100,
+  exploration_fraction=0.5,
+  exploration_final_eps=0.1,
+  seed=0,
+)
+
+def live_models() -> float:
+  player1: DQN = DQN(env=Ttt2PlayEnv(None, Color.O), **PARAMS)
+  player2: DQN = DQN(env=Ttt2PlayEnv(None, Color.X), **PARAMS)
+  start: float = time.perf_counter()
+  for _ in range(ITERATIONS):
+    player1.set_env(Ttt2PlayEnv(player2, Color.O))
+    player1.learn(TIME_STEPS)
+    player2.set_env(Ttt2PlayEnv(player1, Color.X))
+    player2.learn(TIME_STEPS)
+  return time.perf_counter() - start
+
+def league(gradient_steps: int) -> tuple[float, int]:
+  league1: SnapshotLeague = SnapshotLeague(seed=0)
+  league2: SnapshotLeague = SnapshotLeague(seed=0)
+  env1: BatchedOpponentVecEnv = BatchedOpponentVecEnv(
+    [lambda: Ttt2PlayEnv(None, Color.O) for _ in range(LEAGUE_ENVS)], per_env_opponents=True)
+  env2: BatchedOpponentVecEnv = BatchedOpponentVecEnv(
+    [lambda: Ttt2PlayEnv(None, Color.X) for _ in range(LEAGUE_ENVS)], per_env_opponents=True)
+  player1: DQN = DQN(env=env1, gradient_steps=gradient_steps, **PARAMS)
+  player2: DQN = DQN(env=env2, gradient_steps=gradient_steps, **PARAMS)
+  env1.env_method("set_opponent", league2.opponent(league2.add(player2)))
+  env2.env_method("set_opponent", league1.opponent(league1.add(player1)))
+
+  peak: int = 0
+  start: float = time.perf_counter()
+  for _ in range(ITERATIONS):
+    player1.learn(TIME_STEPS, callback=LeagueCallback(league2), reset_num_timesteps=False)
+    league1.add(player1, player1.num_timesteps)
+    player2.learn(TIME_STEPS, callback=LeagueCallback(league1), reset_num_timesteps=False)
+    league2.add(player2, player2.num_timesteps)
+    peak = max(peak, league1.memory_usage(), league2.memory_usage())
+  return time.perf_counter() - start, peak
+
+if __name__ == "__main__":
+  steps: int = 2 * ITERATIONS * TIME_STEPS
+  with contextlib.redirect_stdout(io.StringIO()):  # The envs' progress lines
+    live: float = live_models()
+    full, peak = league(-1)
+    fewer, _ = league(1)
+
+  print(f"{steps} env steps per run")
+  print(f"live models, env rebuilt per iteration: {steps / live:8.0f} steps/s")
+  print(f"league, {LEAGUE_ENVS} envs, 1 update/transition:  {steps / full:8.0f} steps/s")
+  print(f"league, {LEAGUE_ENVS} envs, 1 update/vec step:    {steps / fewer:8.0f} steps/s ({LEAGUE_ENVS}x fewer updates)")
+  print(f"peak league memory: {peak / 1024:.0f} KiB (cap {SnapshotLeague().memory_cap / 2**20:.0f} MiB)")
@@ -0,0 +1,59 @@
+# Env steps/sec of SubprocVecEnv(ConnectFourEnv) against the number of worker
+# processes, with the opponent given as a ModelSpec so that each worker loads
+# its own copy. DummyVecEnv over as many envs, in this process, is the baseline.
+#
+# Usage: PYTHONPATH=src python bench/subproc_vec_env_bench.py
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from stable_baselines3 import DQN
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecEnv
+from c4.c4_board import Color
+from c4.c4_env import ConnectFourEnv
+from c4.opponent_spec import ModelSpec
+
+STEPS: int = 8_000  # Env steps per measurement
+
+def _quiet_env(spec: ModelSpec) -> ConnectFourEnv:
+  # Runs in the worker. ConnectFourEnv prints progress lines; keep them out of
+  # the table.
+  sys.stdout = open(os.devnull, "w")
+  return ConnectFourEnv(spec, Color.O)
+
+def _steps_per_second(vec_env: VecEnv) -> float:
+  rng: np.random.Generator = np.random.default_rng(0)
+  vec_env.reset()
+  vec_env.step(rng.integers(0, 7, vec_env.num_envs))  # Opponents load outside of the timing
+  vector_steps: int = STEPS // vec_env.num_envs
+  start: float = time.perf_counter()
+  for _ in range(vector_steps):
+    vec_env.step(rng.integers(0, 7, vec_env.num_envs))
+  return vector_steps * vec_env.num_envs / (time.perf_counter() - start)
+
+def main() -> None:
+  with tempfile.TemporaryDirectory() as directory:
+    path: str = os.path.join(directory, "opponent")
+    DQN("MlpPolicy", ConnectFourEnv(None, Color.O), seed=0).save(path)
+    spec: ModelSpec = ModelSpec(path)
+
+    # SubprocVecEnv runs one worker process per env
+    print(f"{'workers':>8} {'DummyVecEnv':>12} {'SubprocVecEnv':>14} {'speedup':>8}")
+    workers: int = 1
+    while workers <= max(2, multiprocessing.cpu_count()):
+      with contextlib.redirect_stdout(io.StringIO()):
+        dummy_rate: float = _steps_per_second(DummyVecEnv([lambda: ConnectFourEnv(spec, Color.O) for _ in range(workers)]))
+
+      vec_env: SubprocVecEnv = SubprocVecEnv([lambda: _quiet_env(spec) for _ in range(workers)])
+      subproc_rate: float = _steps_per_second(vec_env)
+      vec_env.close()
+
+      print(f"{workers:>8} {dummy_rate:>12.0f} {subproc_rate:>14.0f} {subproc_rate / dummy_rate:>7.1f}x")
+      workers *= 2
+
+if __name__ == "__main__":
+  main()
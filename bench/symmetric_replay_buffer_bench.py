@@ -0,0 +1,107 @@
+# Env steps for a DQN to reach a target win rate with the plain replay buffer
+# and with SymmetricReplayBuffer, in Tic-Tac-Toe (Ttt2PlayEnv) and Connect
+# Four (ConnectFourEnv), agent playing O against a random legal-move opponent.
+# Every EVAL_INTERVAL steps the greedy agent plays EVAL_GAMES games; illegal
+# moves count as losses. Also reports the best win rate within the budget.
+#
+# Usage: PYTHONPATH=src python bench/symmetric_replay_buffer_bench.py
+import contextlib
+import io
+import time
+from typing import Any, Callable
+import numpy as np
+from stable_baselines3 import DQN
+from stable_baselines3.common.buffers import ReplayBuffer
+from stable_baselines3.common.callbacks import BaseCallback
+from c4.c4_board import Color
+from c4.c4_env import ConnectFourEnv
+from c4.masked_dqn import random_legal_actions
+from c4.symmetric_replay_buffer import SymmetricReplayBuffer
+from c4.ttt_2_play_env import Ttt2PlayEnv
+
+EVAL_INTERVAL: int = 1_000
+EVAL_GAMES: int = 200
+SEEDS: list[int] = [0, 1, 2]
+GAMES: dict[str, tuple[Callable[[Any], Any], float, int]] = {
+  # Name: (env factory taking the opponent, target win rate, step budget)
+  "Tic-Tac-Toe": (lambda opponent: Ttt2PlayEnv(opponent, Color.O), 0.9, 40_000),
+  "Connect Four": (lambda opponent: ConnectFourEnv(opponent, Color.O), 0.75, 40_000),
+}
+
+class RandomOpponent:
+  def __init__(self, seed: int):
+    self.rng: np.random.Generator = np.random.default_rng(seed)
+
+  def predict(self, observation: np.ndarray, deterministic: bool=False):
+    action_count: int = 9 if observation.shape[-2:] == (3, 3) else observation.shape[-1]
+    return random_legal_actions(observation, action_count, self.rng), None
+
+def win_rate(model: DQN, make_env: Callable[[Any], Any], seed: int) -> float:
+  env = make_env(RandomOpponent(seed))
+  wins: int = 0
+  for _ in range(EVAL_GAMES):
+    obs, _ = env.reset()
+    while True:
+      action, _ = model.predict(obs, deterministic=True)
+      obs, _, done, _, info = env.step(int(action))
+      if done:
+        wins += info.get("winner") == str(Color.O)
+        break
+  return wins / EVAL_GAMES
+
+class WinRateCallback(BaseCallback):
+  # Evaluates every EVAL_INTERVAL steps, and stops training at the target
+  def __init__(self, make_env: Callable[[Any], Any], target: float, seed: int):
+    super().__init__()
+    self.make_env = make_env
+    self.target = target
+    self.seed = seed
+    self.reached_at: int | None = None
+    self.best: float = 0.0
+
+  def _on_step(self) -> bool:
+    if self.num_timesteps % EVAL_INTERVAL == 0:
+      self.best = max(self.best, win_rate(self.model, self.make_env, self.seed))
+      if self.best >= self.target:
+        self.reached_at = self.num_timesteps
+        return False
+    return True
+
+def steps_to_target(
+    make_env: Callable[[Any], Any],
+    target: float,
+    budget: int,
+    buffer_class: type[ReplayBuffer],
+    seed: int) -> WinRateCallback:
+  model: DQN = DQN(
+    "MlpPolicy",
+    make_env(RandomOpponent(seed)),
+    learning_rate=0.001,
+    buffer_size=10000,
+    learning_starts=500,
+    batch_size=64,
+    gamma=0.95,
+    train_freq=1,
+    target_update_interval=100,
+    exploration_fraction=0.5,
+    exploration_final_eps=0.1,
+    replay_buffer_class=buffer_class,
+    seed=seed,
+  )
+  callback: WinRateCallback = WinRateCallback(make_env, target, seed)
+  model.learn(budget, callback=callback)
+  return callback
+
+if __name__ == "__main__":
+  for game, (make_env, target, budget) in GAMES.items():
+    for buffer_class in (ReplayBuffer, SymmetricReplayBuffer):
+      start: float = time.perf_counter()
+      with contextlib.redirect_stdout(io.StringIO()):  # The envs' progress lines
+        results: list[WinRateCallback] = [
+          steps_to_target(make_env, target, budget, buffer_class, seed) for seed in SEEDS
+        ]
+      print(
+        f"{game:12} {buffer_class.__name__:22} steps to {target:.0%} wins: "
+        f"{' / '.join('-' if result.reached_at is None else str(result.reached_at) for result in results)}, "
+        f"best win rate: {' / '.join(f'{result.best:.2f}' for result in results)} "
+        f"({time.perf_counter() - start:.0f}s)")
@@ -0,0 +1,53 @@
+# Tabular Q-learning training speed, in games per second, one game at a time
+# (TttQLearning.train_one_game) and in lock step (train_lock_step), with the
+# time main.py's 2.5M training games take. Then policy quality after
+# QUALITY_GAMES games of each: the share of positions reachable in play where
+# the greedy move is optimal, per TttOptimalPlayer.
+#
+# Usage: PYTHONPATH=src python bench/ttt_q_learning_bench.py
+import contextlib
+import io
+import random
+import tempfile
+import time
+import numpy as np
+from c4.ttt_optimal_player import TttOptimalPlayer
+from c4.ttt_q_learning import TttQLearning
+
+GAMES: int = 20_000
+MAIN_GAMES: int = 2_500_000
+QUALITY_GAMES: int = MAIN_GAMES
+
+def optimal_rate(learner: TttQLearning, optimal: TttOptimalPlayer, states: np.ndarray) -> float:
+  moves: np.ndarray = learner.q_table[states].argmax(axis=1)
+  return float((optimal.move_scores[states, moves] == optimal.scores[states]).mean())
+
+if __name__ == "__main__":
+  random.seed(0)
+  learner: TttQLearning = TttQLearning()
+  start: float = time.perf_counter()
+  for _ in range(GAMES):
+    learner.train_one_game()
+  sequential_rate: float = GAMES / (time.perf_counter() - start)
+  print(f"train_one_game:  {sequential_rate:.0f} games/s, {MAIN_GAMES / sequential_rate:.1f}s for {MAIN_GAMES} games")
+
+  learner = TttQLearning()
+  start = time.perf_counter()
+  with contextlib.redirect_stdout(io.StringIO()):  # Progress lines
+    learner.train_lock_step(MAIN_GAMES, seed=0)
+  elapsed: float = time.perf_counter() - start
+  print(
+    f"train_lock_step: {MAIN_GAMES / elapsed:.0f} games/s, {elapsed:.1f}s for {MAIN_GAMES} games "
+    f"({MAIN_GAMES / elapsed / sequential_rate:.0f}x)")
+
+  directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+  optimal: TttOptimalPlayer = TttOptimalPlayer(f"{directory.name}/optimal.bin", tables=learner.tables)
+  states: np.ndarray = learner.tables.reachable_states
+  for name, train in (
+      ("train_one_game", lambda learner: learner.train_multiple_games(QUALITY_GAMES)),
+      ("train_lock_step", lambda learner: learner.train_lock_step(QUALITY_GAMES, seed=0))):
+    random.seed(0)
+    learner = TttQLearning()
+    with contextlib.redirect_stdout(io.StringIO()):
+      train(learner)
+    print(f"{name + ':':16} optimal greedy moves after {QUALITY_GAMES} games: {optimal_rate(learner, optimal, states):.1%}")
@@ -0,0 +1,55 @@
+# Shared-memory tabular Q-learning (TttQLearning.train_shared) against the
+# number of worker processes, 1, 2, 4, ... up to the core count:
+#  - games/sec over main.py's 2.5M training games
+#  - time to optimal play: training time until the greedy move is optimal in
+#    TARGET of the positions reachable in play (per TttOptimalPlayer),
+#    checked every EVAL_GAMES games
+#
+# Usage: PYTHONPATH=src python bench/ttt_q_learning_scaling_bench.py
+import contextlib
+import io
+import multiprocessing
+import tempfile
+import time
+import numpy as np
+from c4.ttt_optimal_player import TttOptimalPlayer
+from c4.ttt_q_learning import TttQLearning
+
+MAIN_GAMES: int = 2_500_000
+TARGET: float = 0.95
+EVAL_GAMES: int = 250_000
+GAME_BUDGET: int = 10_000_000
+
+def optimal_rate(learner: TttQLearning, optimal: TttOptimalPlayer) -> float:
+  states: np.ndarray = learner.tables.reachable_states
+  moves: np.ndarray = learner.q_table[states].argmax(axis=1)
+  return float((optimal.move_scores[states, moves] == optimal.scores[states]).mean())
+
+def time_to_target(workers: int, optimal: TttOptimalPlayer) -> tuple[float | None, int]:
+  learner: TttQLearning = TttQLearning()
+  elapsed: float = 0.0
+  for games in range(EVAL_GAMES, GAME_BUDGET + 1, EVAL_GAMES):
+    start: float = time.perf_counter()
+    learner.train_shared(EVAL_GAMES, workers=workers, seed=games)
+    elapsed += time.perf_counter() - start
+    if optimal_rate(learner, optimal) >= TARGET:
+      return elapsed, games
+  return None, GAME_BUDGET
+
+if __name__ == "__main__":
+  directory: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
+  optimal: TttOptimalPlayer = TttOptimalPlayer(f"{directory.name}/optimal.bin")
+  print(f"{'workers':>8} {'games/s':>9} {'speedup':>8} {f'time to {TARGET:.0%} optimal':>22}")
+  baseline: float = 0.0
+  workers: int = 1
+  while workers <= multiprocessing.cpu_count():
+    learner: TttQLearning = TttQLearning()
+    with contextlib.redirect_stdout(io.StringIO()):  # Progress lines
+      start: float = time.perf_counter()
+      learner.train_shared(MAIN_GAMES, workers=workers, seed=0)
+      rate: float = MAIN_GAMES / (time.perf_counter() - start)
+      elapsed, games = time_to_target(workers, optimal)
+    baseline = baseline or rate
+    reached: str = "-" if elapsed is None else f"{elapsed:.2f}s ({games} games)"
+    print(f"{workers:>8} {rate:>9.0f} {rate / baseline:>8.2f} {reached:>22}")
+    workers *= 2
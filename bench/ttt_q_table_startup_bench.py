@@ -0,0 +1,28 @@
+# main.py's startup: training TttQLearning on its 2.5M games (in lock step)
+# and saving the table, against loading the saved table.
+#
+# Usage: PYTHONPATH=src python bench/ttt_q_table_startup_bench.py
+import contextlib
+import io
+import os
+import tempfile
+import time
+from c4.ttt_q_learning import TttQLearning
+
+GAMES: int = 2_500_000
+LOADS: int = 100
+
+if __name__ == "__main__":
+  with tempfile.TemporaryDirectory() as directory:
+    path: str = os.path.join(directory, "q.bin")
+    start: float = time.perf_counter()
+    learner: TttQLearning = TttQLearning()
+    with contextlib.redirect_stdout(io.StringIO()):  # Progress lines
+      learner.train_lock_step(GAMES)
+    learner.save(path)
+    print(f"train and save: {time.perf_counter() - start:.2f}s ({os.path.getsize(path)} bytes)")
+
+    start = time.perf_counter()
+    for _ in range(LOADS):
+      TttQLearning.load(path, games=GAMES)
+    print(f"load:           {(time.perf_counter() - start) / LOADS * 1000:.2f}ms")
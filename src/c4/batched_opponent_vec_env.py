@@ -0,0 +1,124 @@
+from copy import deepcopy
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+import gymnasium as gym
+import numpy as np
+from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.common.vec_env.base_vec_env import VecEnvObs, VecEnvStepReturn
+from c4.c4_board import Color
+
+# A DummyVecEnv for self-play envs (ConnectFourEnv, Ttt2PlayEnv) which brokers
+# the opponent's inference: each step plays the agent moves in every env, then
+# collects the observations of the envs where the opponent is to reply and
+# gets all their replies from one batched predict() call. Opening moves for
+# envs where the agent plays X are predicted the same way, on reset.
+#
+# The opponent is the one passed in, which replies in every env in place of
+# the envs' own; else the envs' shared opponent (envs with different ones are
+# rejected). With per_env_opponents, each env keeps its own opponent (e.g.
+# one sampled from a SnapshotLeague), and there is one predict() call per
+# distinct opponent instead.
+#
+# The envs are driven through their step_agent()/step_opponent() halves, which
+# gym wrappers would never see, so wrapped envs are rejected: wrap the vector
+# env instead (e.g. in VecMonitor for episode stats).
+class BatchedOpponentVecEnv(DummyVecEnv):
+    def __init__(self, env_fns: List[Callable[[], gym.Env]], opponent: Any=None, per_env_opponents: bool=False):
+        super().__init__(env_fns)
+        for env_idx, env in enumerate(self.envs):
+            if env is not env.unwrapped:
+                raise Exception(f"Env {env_idx} is wrapped ({type(env).__name__}): wrap the vector env instead")
+
+        self.per_env_opponents = per_env_opponents
+        if opponent is None and not per_env_opponents:
+            if len({id(self._game(env_idx).opponent) for env_idx in range(self.num_envs)}) > 1:
+                raise Exception("The envs have different opponents: pass one, or use per_env_opponents")
+            opponent = self._game(0).opponent
+        self.opponent = opponent
+        self.predict_calls: int = 0
+
+        # Envs which support it write their observations straight into ours
+        for env_idx in range(self.num_envs):
+            if hasattr(self._game(env_idx), "use_obs_buffer"):
+                self._game(env_idx).use_obs_buffer(self.buf_obs[None][env_idx])
+
+    def reset(self) -> VecEnvObs:
+        openings: Dict[int, int] = self._opening_moves(range(self.num_envs))
+        for env_idx in range(self.num_envs):
+            obs, self.reset_infos[env_idx] = self.envs[env_idx].reset(
+                seed=self._seeds[env_idx], options=self._with_opening(self._options[env_idx], env_idx, openings))
+            self._save_obs(env_idx, obs)
+
+        # Seeds and options are only used once
+        self._reset_seeds()
+        self._reset_options()
+        return self._obs_from_buf()
+
+    def step_wait(self) -> VecEnvStepReturn:
+        # Agent moves, then one predict() for all the opponent replies
+        results: List[Tuple[np.ndarray, float, bool, bool, Dict[str, Any]] | None] = [
+            self._game(env_idx).step_agent(int(self.actions[env_idx])) for env_idx in range(self.num_envs)
+        ]
+        pending: List[int] = [env_idx for env_idx, result in enumerate(results) if result is None]
+        if len(pending) > 0:
+            replies: np.ndarray = self._predict(np.stack([self._game(env_idx)._obs() for env_idx in pending]), pending)
+            for env_idx, reply in zip(pending, replies):
+                results[env_idx] = self._game(env_idx).step_opponent(int(reply))
+
+        finished: List[int] = [env_idx for env_idx, result in enumerate(results) if result[2] or result[3]]
+        openings: Dict[int, int] = self._opening_moves(finished)
+
+        # As DummyVecEnv.step_wait()
+        for env_idx, (obs, reward, terminated, truncated, info) in enumerate(results):
+            self.buf_rews[env_idx] = reward
+            self.buf_dones[env_idx] = terminated or truncated
+            self.buf_infos[env_idx] = info
+            self.buf_infos[env_idx]["TimeLimit.truncated"] = truncated and not terminated
+
+            if self.buf_dones[env_idx]:
+                self.buf_infos[env_idx]["terminal_observation"] = obs
+                obs, self.reset_infos[env_idx] = self.envs[env_idx].reset(
+                    options=self._with_opening(None, env_idx, openings))
+            self._save_obs(env_idx, obs)
+
+        return (self._obs_from_buf(), np.copy(self.buf_rews), np.copy(self.buf_dones), deepcopy(self.buf_infos))
+
+    def _opening_moves(self, indices: Sequence[int]) -> Dict[int, int]:
+        # Opponent openings for the given envs which are about to be reset, and
+        # where the agent plays X. The board is empty, so so is the observation.
+        openers: List[int] = [env_idx for env_idx in indices if self._game(env_idx).agent_color == Color.X]
+        if len(openers) == 0:
+            return {}
+
+        obs: np.ndarray = np.zeros((len(openers), *self.observation_space.shape), dtype=np.float32)
+        return {env_idx: int(move) for env_idx, move in zip(openers, self._predict(obs, openers))}
+
+    def _predict(self, obs: np.ndarray, env_indices: Sequence[int]) -> np.ndarray:
+        # Opponent moves for the given envs, obs[i] being env_indices[i]'s
+        if not self.per_env_opponents:
+            return self._predict_with(self.opponent, obs)
+
+        groups: Dict[int, List[int]] = {}
+        for ii, env_idx in enumerate(env_indices):
+            groups.setdefault(id(self._game(env_idx).opponent), []).append(ii)
+        actions: np.ndarray = np.zeros(len(obs), dtype=np.int64)
+        for rows in groups.values():
+            actions[rows] = self._predict_with(self._game(env_indices[rows[0]]).opponent, obs[rows])
+        return actions
+
+    def _predict_with(self, opponent: Any, obs: np.ndarray) -> np.ndarray:
+        self.predict_calls += 1
+        actions, _ = opponent.predict(obs)
+        return np.asarray(actions).reshape(len(obs))
+
+    def _with_opening(
+            self,
+            options: Dict[str, Any] | None,
+            env_idx: int,
+            openings: Dict[int, int]) -> Dict[str, Any] | None:
+        options = dict(options or {})
+        if env_idx in openings:
+            options["opening_move"] = openings[env_idx]
+        return options if len(options) > 0 else None
+
+    def _game(self, env_idx: int) -> Any:
+        return self.envs[env_idx].unwrapped
@@ -1,5 +1,7 @@
 import numpy as np
+import random
 from enum import Enum
+from functools import lru_cache
 from typing import List
 
 class Color(Enum):
@@ -16,98 +18,311 @@ class Color(Enum):
       else:
           return Color.NONE
 
-WINNING_LENGTH: int = 4
+WINNING_LENGTH: int = 4  # Default; boards are Connect-N for any length
 
 DEFAULT_ROWS: int = 6
 DEFAULT_COLUMNS: int = 7
 
+# Zobrist hashing: every (cell, color) pair gets a fixed random 64-bit key, and
+# a position's hash is the XOR of the keys of its tokens. Seeded, so that
+# hashes are stable across processes and can be stored in files.
+ZOBRIST_SEED: int = 0x5EED_C4
+
+def zobrist_keys(count: int, seed: int=ZOBRIST_SEED) -> list[int]:
+  rng: random.Random = random.Random(seed)
+  return [rng.getrandbits(64) for _ in range(count)]
+
+# Optionally XOR-ed in when X is to move - see C4Board.key()
+ZOBRIST_X_TO_MOVE: int = zobrist_keys(1, ZOBRIST_SEED - 1)[0]
+
+# Lookup tables which depend only on the board size and winning length. Build
+# them through C4Geometry.geometry(), so that they are built on first use and
+# then shared by all boards of that geometry.
+class C4Geometry:
+  def __init__(self, rows: int, columns: int, winning_length: int):
+    if winning_length < 2:
+      raise Exception(f"Winning length must be at least 2, not {winning_length}")
+
+    self.rows = rows
+    self.columns = columns
+    self.winning_length = winning_length
+    self.stride: int = rows + 1
+
+    # For every cell (indexed by bit position), the bitmasks of all
+    # winning_length-long lines which pass through it
+    self.cell_lines: list[list[int]] = [[] for _ in range(columns * self.stride)]
+    line_cells: list[list[int]] = []
+
+    for col in range(columns):
+      for height in range(rows):
+        for d_col, d_height in ((0, 1), (1, 0), (1, 1), (1, -1)):
+          end_col: int = col + (winning_length - 1) * d_col
+          end_height: int = height + (winning_length - 1) * d_height
+          if end_col >= columns or end_height < 0 or end_height >= rows:
+            continue
+
+          cells: list[int] = [
+            (col + ii * d_col) * self.stride + height + ii * d_height
+            for ii in range(winning_length)
+          ]
+          line: int = sum(1 << cell for cell in cells)
+          for cell in cells:
+            self.cell_lines[cell].append(line)
+
+          line_cells.append([
+            (rows - 1 - height - ii * d_height) * columns + col + ii * d_col
+            for ii in range(winning_length)
+          ])
+
+    # Per column, the bits of all its cells (sentinel included); and the
+    # bottom cell of every column
+    self.column_masks: list[int] = [((1 << self.stride) - 1) << (col * self.stride) for col in range(columns)]
+    self.bottom: int = sum(1 << (col * self.stride) for col in range(columns))
+    self.board_mask: int = self.bottom * ((1 << rows) - 1)  # All cells, no sentinels
+
+    # Centre columns first - they take part in the most lines
+    self.move_order: list[int] = sorted(range(columns), key=lambda col: abs(2 * col - (columns - 1)))
+
+    # Zobrist keys per color, indexed by bit position
+    keys: list[int] = zobrist_keys(2 * columns * self.stride)
+    self.zobrist: dict[Color, list[int]] = {
+      Color.O: keys[:columns * self.stride],
+      Color.X: keys[columns * self.stride:],
+    }
+
+    # The same lines as indexes into a flattened (rows, columns) array, for
+    # vectorized win detection over NumPy boards
+    self.line_cells: np.ndarray = np.array(line_cells, dtype=np.intp).reshape(-1, winning_length)
+
+    # The lines through each flattened cell, as line_cells but laid out
+    # (position in line, cell, line) so sums over a line reduce the first axis.
+    # Every cell gets the same number of lines, padded by repeating its first.
+    flat_cell_lines: list[list[list[int]]] = [[] for _ in range(rows * columns)]
+    for cells in line_cells:
+      for cell in cells:
+        flat_cell_lines[cell].append(cells)
+    width: int = max(len(lines) for lines in flat_cell_lines)
+    cell_line_cells: np.ndarray = np.zeros((rows * columns, width, winning_length), dtype=np.intp)
+    for cell, lines in enumerate(flat_cell_lines):
+      if len(lines) > 0:
+        cell_line_cells[cell] = lines + [lines[0]] * (width - len(lines))
+    self.cell_line_cells: np.ndarray = np.ascontiguousarray(cell_line_cells.transpose(2, 0, 1))
+
+  @staticmethod
+  @lru_cache(maxsize=None)
+  def geometry(rows: int, columns: int, winning_length: int) -> "C4Geometry":
+    return C4Geometry(rows, columns, winning_length)
+
 class C4Board:
-  def __init__(self, rows: int=DEFAULT_ROWS, columns: int=DEFAULT_COLUMNS):
+  def __init__(self, rows: int=DEFAULT_ROWS, columns: int=DEFAULT_COLUMNS, winning_length: int=WINNING_LENGTH):
     self.rows = rows
     self.columns = columns
-    self.board = np.zeros((rows, columns), dtype=int)
+    self.winning_length = winning_length
     self.expected_next_move_color: Color = Color.O
     self.move_count = 0
 
+    # Bitboard representation: bit (column * stride + height) is set if the
+    # cell "height" rows from the bottom of "column" holds a token. Each column
+    # has one extra always-empty bit on top so that shifts never wrap.
+    self.geometry: C4Geometry = C4Geometry.geometry(rows, columns, winning_length)
+    self.stride: int = self.geometry.stride
+    self.o_bits: int = 0
+    self.x_bits: int = 0
+    self.heights: list[int] = [0] * columns
+    self.last_cell: int = -1  # Bit position of the most recent move, if any
+    self.hash: int = 0  # Zobrist hash, maintained by make_move()
+    self.history: list[int] = []  # Columns played, for unmake_move()
+
+    # Legal-move mask, updated in place as columns fill up. The read-only view
+    # is what action_mask() hands out, so callers never need a copy.
+    self._legal: np.ndarray = np.ones(columns, dtype=bool)
+    self._legal_view: np.ndarray = self._read_only_view(self._legal)
+
+    self._board: np.ndarray | None = None  # Lazily built NumPy view
+
+  @property
+  def board(self) -> np.ndarray:
+    if self._board is None:
+      board: np.ndarray = np.zeros((self.rows, self.columns), dtype=int)
+      for col in range(self.columns):
+        for height in range(self.heights[col]):
+          bit: int = 1 << (col * self.stride + height)
+          if self.o_bits & bit:
+            board[self.rows - 1 - height, col] = Color.O.value
+          elif self.x_bits & bit:
+            board[self.rows - 1 - height, col] = Color.X.value
+      board.flags.writeable = False
+      self._board = board
+
+    return self._board
+
+  @board.setter
+  def board(self, board: np.ndarray) -> None:
+    self.rows, self.columns = board.shape
+    self.geometry = C4Geometry.geometry(self.rows, self.columns, self.winning_length)
+    self.stride = self.geometry.stride
+    self.o_bits = 0
+    self.x_bits = 0
+    self.heights = [0] * self.columns
+    self.last_cell = -1
+    self.hash = 0
+    self.history = []
+
+    for row in range(self.rows):
+      for col in range(self.columns):
+        value: int = int(board[row, col])
+        if value == Color.NONE.value:
+          continue
+
+        height: int = self.rows - 1 - row
+        bit: int = 1 << (col * self.stride + height)
+        if value == Color.O.value:
+          self.o_bits |= bit
+        else:
+          self.x_bits |= bit
+        self.hash ^= self.geometry.zobrist[Color(value)][col * self.stride + height]
+        self.heights[col] = max(self.heights[col], height + 1)
+
+    self._legal = np.array([height < self.rows for height in self.heights], dtype=bool)
+    self._legal_view = self._read_only_view(self._legal)
+    self._board = None
+
+  def bits(self, color: Color) -> int:
+    return self.o_bits if color == Color.O else self.x_bits
+
+  @property
+  def playable(self) -> int:
+    # Lowest empty cell per column: adding the bottom row carries up each
+    # column's tokens into the cell above them
+    return ((self.o_bits | self.x_bits) + self.geometry.bottom) & self.geometry.board_mask
+
+  def threats(self, color: Color) -> int:
+    # Empty cells which would complete a line for "color", in the bitboard
+    # layout. Computed on demand, so that make_move() doesn't pay for it: the
+    # shift trick of C4OptimalPlayer._winning_position(), for any winning
+    # length. Along each direction, a cell is a threat if it has k tokens in
+    # a row behind it and winning_length - 1 - k ahead of it, for some k.
+    bits: int = self.bits(color)
+    length: int = self.winning_length
+    threats: int = 0
+    for shift in (1, self.stride, self.stride - 1, self.stride + 1):
+      behind: list[int] = [-1]  # behind[k]: k tokens in a row behind the cell
+      ahead: list[int] = [-1]
+      for k in range(1, length):
+        behind.append(behind[-1] & (bits << k * shift))
+        ahead.append(ahead[-1] & (bits >> k * shift))
+      for k in range(length):
+        threats |= behind[k] & ahead[length - 1 - k]
+    return threats & (self.geometry.board_mask ^ (self.o_bits | self.x_bits))
+
+  @property
+  def o_threats(self) -> int:
+    return self.threats(Color.O)
+
+  @property
+  def x_threats(self) -> int:
+    return self.threats(Color.X)
+
+  def immediate_wins(self, color: Color) -> int:
+    # Threat cells which can be played right now
+    return self.threats(color) & self.playable
+
+  def winning_columns(self, color: Color) -> list[int]:
+    wins: int = self.immediate_wins(color)
+    return [col for col in range(self.columns) if wins & self.geometry.column_masks[col]]
+
   def legal_moves(self) -> list[int]:
-    legal: list[int] = []
+    return [ii for ii in range(self.columns) if self.heights[ii] < self.rows]
 
-    for ii in range(self.columns):
-      if self.board[0, ii] == Color.NONE.value:
-        legal.append(ii)
+  def key(self, side_to_move: bool=False) -> int:
+    # Position key for caches and transposition tables. Side to move follows
+    # from the position in normal play, so it is only mixed in on request.
+    if side_to_move and self.expected_next_move_color == Color.X:
+      return self.hash ^ ZOBRIST_X_TO_MOVE
+    return self.hash
 
-    return legal
+  def action_mask(self) -> np.ndarray:
+    return self._legal_view
+
+  def is_illegal(self, column: int) -> bool:
+    return column < 0 or column >= self.columns or self.heights[column] >= self.rows
   
   def make_move(self, color: Color, column: int) -> None:
     if color != self.expected_next_move_color:
       raise Exception(f"Expected {self.expected_next_move_color}, but move is for {color}")
     
-    if column not in self.legal_moves():
+    if self.is_illegal(column):
       raise Exception(f"Illegal move - column: {column}")
     
     self.expected_next_move_color = Color.opposite(color)
     self.move_count += 1
 
-    for row in range(self.rows + 1):
-      if row == self.rows or self.board[row, column] != Color.NONE.value:
-        self.board[row - 1, column] = color.value
-        return
+    self.last_cell = column * self.stride + self.heights[column]
+    bit: int = 1 << self.last_cell
+    if color == Color.O:
+      self.o_bits |= bit
+    else:
+      self.x_bits |= bit
+    self.hash ^= self.geometry.zobrist[color][self.last_cell]
+    self.heights[column] += 1
+    if self.heights[column] == self.rows:
+      self._legal[column] = False
+    self.history.append(column)
+    self._board = None
+
+  def unmake_move(self) -> None:
+    # Takes back the most recent make_move(), so that searches can explore a
+    # move without copying the board
+    if len(self.history) == 0:
+      raise Exception("No move to unmake")
+
+    column: int = self.history.pop()
+    color: Color = Color.opposite(self.expected_next_move_color)
+    self.expected_next_move_color = color
+    self.move_count -= 1
+
+    self.heights[column] -= 1
+    cell: int = column * self.stride + self.heights[column]
+    if color == Color.O:
+      self.o_bits &= ~(1 << cell)
+    else:
+      self.x_bits &= ~(1 << cell)
+    self.hash ^= self.geometry.zobrist[color][cell]
+    self._legal[column] = True
+    self._board = None
+
+    if len(self.history) > 0:
+      previous: int = self.history[-1]
+      self.last_cell = previous * self.stride + self.heights[previous] - 1
+    else:
+      self.last_cell = -1
       
   def is_tie(self) -> bool:
     return self.move_count == self.rows * self.columns
   
   def is_winning(self, colorEnum: Color) -> bool:
-    color: int = colorEnum.value
+    bits: int = self.bits(colorEnum)
 
-    # Horizontal
-    for row in range(self.rows):
-      count: int = 0
-      for col in range(self.columns):
-        if self.board[row,col] == color:
-          count += 1
-          if count == WINNING_LENGTH:
-            return True
-        else:
-          count = 0 # Reset consecutive count
+    # Vertical, horizontal and both diagonals
+    for shift in (1, self.stride, self.stride - 1, self.stride + 1):
+      # After n iterations, a bit is set only if it starts a run of n+1 tokens
+      run: int = bits
+      for _ in range(self.winning_length - 1):
+        run &= run >> shift
+      if run:
+        return True
 
-    # Vertical
-    for row in range(self.columns):
-      count: int = 0
-      for col in range(self.rows):
-        if self.board[col,row] == color:
-          count += 1
-          if count == WINNING_LENGTH:
-            return True
-        else:
-          count = 0 # Reset consecutive count
+    return False
 
-    # Diagonal - \
-    start_incl: int = -(self.rows - WINNING_LENGTH)
-    end_excl: int = self.columns - WINNING_LENGTH + 1
-    for row in range(start_incl, end_excl):  # Iterate column on grid shifted like /
-      count: int = 0
-      for col in range(self.rows):
-        column: int = row + col
-        if column >= 0 and column < self.columns and self.board[col,column] == color:
-          count += 1
-          if count == WINNING_LENGTH:
-            return True
-        else:
-          count = 0 # Reset consecutive count
+  def wins_at_last_move(self) -> bool:
+    # Only lines through the most recent token can have been completed by it
+    if self.last_cell < 0:
+      return False
 
-    # Diagonal - /
-    start_incl: int = WINNING_LENGTH - 1
-    end_excl: int = self.columns + self.rows - WINNING_LENGTH
-    for row in range(start_incl, end_excl):  # Iterate column on grid shifted like \
-      count: int = 0
-      for col in range(self.rows):
-        column: int = row - col
-        if column >= 0 and column < self.columns and self.board[col,column] == color:
-          count += 1
-          if count == WINNING_LENGTH:
-            return True
-        else:
-          count = 0 # Reset consecutive count
+    bits: int = self.bits(Color.opposite(self.expected_next_move_color))
+    for line in self.geometry.cell_lines[self.last_cell]:
+      if bits & line == line:
+        return True
 
     return False
   
@@ -129,7 +344,7 @@ class C4Board:
     print(self.to_string(include_headers))
 
   @staticmethod
-  def from_string(string: str):
+  def from_string(string: str, winning_length: int=WINNING_LENGTH):
     mapping = {
       'O': 1,
       'X': -1,
@@ -148,51 +363,72 @@ class C4Board:
     rows_count = len(rows)
     cols_count = len(rows[0]) if rows_count > 0 else 0
 
-    board: C4Board = C4Board(columns=cols_count, rows=rows_count)
+    board: C4Board = C4Board(columns=cols_count, rows=rows_count, winning_length=winning_length)
     board.board = np.array(rows, dtype=int)
     return board
 
   def copy(self) -> "C4Board":
-    b: C4Board = C4Board(rows=self.rows, columns=self.columns)
+    b: C4Board = C4Board.__new__(C4Board)
 
-    b.board = self.board.copy()
+    b.rows = self.rows
+    b.columns = self.columns
+    b.winning_length = self.winning_length
     b.expected_next_move_color = self.expected_next_move_color
     b.move_count = self.move_count
+    b.geometry = self.geometry
+    b.stride = self.stride
+    b.o_bits = self.o_bits
+    b.x_bits = self.x_bits
+    b.heights = self.heights.copy()
+    b.last_cell = self.last_cell
+    b.hash = self.hash
+    b.history = self.history.copy()
+    b._legal = self._legal.copy()
+    b._legal_view = C4Board._read_only_view(b._legal)
+    b._board = self._board  # Read-only, so safe to share
 
     return b
   
+  @staticmethod
+  def _read_only_view(array: np.ndarray) -> np.ndarray:
+    view: np.ndarray = array.view()
+    view.flags.writeable = False
+    return view
+  
   def failing_to_block_column(self, move: int, color: Color) -> bool:
-    threatened_columns: List[int] = []
-    for ii in range(self.columns):
-      if self.needs_blocking(ii, color):
-        threatened_columns.append(ii)
+    # True if the opponent of "color" could win on their next move, and
+    # "move" does not take (one of) those cells
+    opponent_wins: int = self.immediate_wins(Color.opposite(color))
+    if opponent_wins == 0:
+      return False
 
-    if len(threatened_columns) > 0 and move not in threatened_columns:
-      return True
-    
-    return False
+    return not opponent_wins & self.geometry.column_masks[move]
+
+  def missed_win(self, move: int, color: Color) -> bool:
+    # True if "color" could win right now, but "move" does not
+    wins: int = self.immediate_wins(color)
+    if wins == 0:
+      return False
+
+    return not wins & self.geometry.column_masks[move]
   
   def needs_blocking(self, column: int, color: Color):
       # A column needs blocking if there is at least one air gap on top, and the
-      # top 3 tokens are of the opposite color
-      if self.board[0, column] != Color.NONE.value:
+      # top winning_length - 1 tokens are of the opposite color
+      if self.heights[column] >= self.rows:
         return False # Moot point - no room to block
       
       count: int = 0
-      opposite: int = Color.opposite(color).value
-      for row in range(self.rows):
-        token: int = self.board[row, column]
-        if token == Color.NONE.value:
+      opposite: int = self.bits(Color.opposite(color))
+      for height in range(self.heights[column] - 1, -1, -1):
+        bit: int = 1 << (column * self.stride + height)
+        if not (self.o_bits | self.x_bits) & bit:
           continue
-        elif token == opposite:
+        elif opposite & bit:
           count += 1
-          if count == 3:
-            return True # 3-in-a-row reached - this should be blocked
+          if count == self.geometry.winning_length - 1:
+            return True # One short of a win - this should be blocked
         else:
           return False # Encountered non-opposite color - no need to block
         
-      return False # Reach bottom of board without getting 3 in a row - no need to block
-          
-
-  
-
+      return False # Reach bottom of board one short of a win - no need to block
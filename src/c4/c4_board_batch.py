@@ -0,0 +1,83 @@
+import numpy as np
+from c4.c4_board import C4Board, C4Geometry, Color, DEFAULT_COLUMNS, DEFAULT_ROWS, WINNING_LENGTH
+
+# N Connect Four games stored as one (N, rows, columns) array, so that all of
+# them can be stepped together with vectorized NumPy operations. Cell values
+# and orientation are the same as C4Board.board (row 0 is the top).
+class C4BoardBatch:
+  def __init__(self, count: int, rows: int=DEFAULT_ROWS, columns: int=DEFAULT_COLUMNS, winning_length: int=WINNING_LENGTH):
+    self.count = count
+    self.rows = rows
+    self.columns = columns
+    self.winning_length = winning_length
+    self.geometry: C4Geometry = C4Geometry.geometry(rows, columns, winning_length)
+
+    self.boards: np.ndarray = np.zeros((count, rows, columns), dtype=np.int8)
+    self.heights: np.ndarray = np.zeros((count, columns), dtype=np.int8)
+    self.turns: np.ndarray = np.full(count, Color.O.value, dtype=np.int8)  # Color value of side to move
+    self.move_counts: np.ndarray = np.zeros(count, dtype=np.int16)
+
+  def reset(self, indices: np.ndarray | None=None) -> None:
+    if indices is None:
+      indices = np.arange(self.count)
+
+    self.boards[indices] = Color.NONE.value
+    self.heights[indices] = 0
+    self.turns[indices] = Color.O.value
+    self.move_counts[indices] = 0
+
+  def legal_mask(self) -> np.ndarray:
+    return self.heights < self.rows
+
+  def make_moves(self, actions: np.ndarray, indices: np.ndarray | None=None) -> np.ndarray:
+    # Plays actions[i] on board indices[i] (or on board i if no indices are
+    # given) for whichever color is next to move on that board. Returns the
+    # rows where the tokens landed.
+    if indices is None:
+      indices = np.arange(self.count)
+    actions = np.asarray(actions, dtype=np.intp)
+    indices = np.asarray(indices, dtype=np.intp)
+
+    if np.unique(indices).size != indices.size:
+      raise Exception(f"At most one move per board - indices: {indices}")
+
+    in_range: np.ndarray = (actions >= 0) & (actions < self.columns)
+    if not in_range.all() or (self.heights[indices, actions] >= self.rows).any():
+      raise Exception(f"Illegal move(s) - columns: {actions}")
+
+    rows: np.ndarray = self.rows - 1 - self.heights[indices, actions]
+    self.boards[indices, rows, actions] = self.turns[indices]
+    self.heights[indices, actions] += 1
+    self.turns[indices] = -self.turns[indices]
+    self.move_counts[indices] += 1
+    return rows
+
+  def winners(self) -> np.ndarray:
+    # Color value of the winner on each board, or Color.NONE.value if none.
+    # Sums each precomputed line, so a line is won iff its sum is +/- length.
+    cells: np.ndarray = self.boards.reshape(self.count, -1)
+    sums: np.ndarray = cells[:, self.geometry.line_cells].sum(axis=2, dtype=np.int16)
+
+    winners: np.ndarray = np.zeros(self.count, dtype=np.int8)
+    winners[(sums == -self.winning_length).any(axis=1)] = Color.X.value
+    winners[(sums == self.winning_length).any(axis=1)] = Color.O.value
+    return winners
+
+  def wins_at(self, indices: np.ndarray, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    # Whether the token at (rows[i], columns[i]) on board indices[i] - the one
+    # just played there - completes a line. Only the lines through that cell
+    # are summed.
+    lines: np.ndarray = self.geometry.cell_line_cells[:, rows * self.columns + columns]
+    flat: np.ndarray = lines + (indices * (self.rows * self.columns))[:, None]
+    sums: np.ndarray = self.boards.reshape(-1).take(flat).sum(axis=0, dtype=np.int16)
+    return (np.abs(sums) == self.winning_length).any(axis=1)
+
+  def ties(self) -> np.ndarray:
+    return self.move_counts == self.rows * self.columns
+
+  def get_board(self, index: int) -> C4Board:
+    board: C4Board = C4Board(rows=self.rows, columns=self.columns, winning_length=self.winning_length)
+    board.board = self.boards[index].astype(int)
+    board.expected_next_move_color = Color(int(self.turns[index]))
+    board.move_count = int(self.move_counts[index])
+    return board
@@ -2,31 +2,48 @@ from typing import Any, Tuple, Dict
 import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
-from c4.c4_board import Color, C4Board, DEFAULT_COLUMNS, DEFAULT_ROWS
+from c4.c4_board import Color, C4Board, DEFAULT_COLUMNS, DEFAULT_ROWS, WINNING_LENGTH
 from stable_baselines3.common.base_class import BaseAlgorithm
+from c4.c4_mcts_player import C4MctsOpponent
+from c4.opponent_spec import OpponentSpec, resolve_opponent
 
 class ConnectFourEnv(gym.Env[np.ndarray, int]):
     metadata = {"render_modes": ["human"]}
 
-    def __init__(self, opponent: BaseAlgorithm | None, agent_color: Color):
+    def __init__(
+            self,
+            opponent: BaseAlgorithm | C4MctsOpponent | OpponentSpec | None,
+            agent_color: Color,
+            rows: int=DEFAULT_ROWS,
+            columns: int=DEFAULT_COLUMNS,
+            winning_length: int=WINNING_LENGTH):
         super().__init__()
         assert agent_color in (Color.O, Color.X)
         self.agent_color = agent_color
         self.opponent_color = Color.opposite(agent_color)
-        self.opponent = opponent
+        self.opponent = resolve_opponent(opponent)
+        self.rows = rows
+        self.columns = columns
+        self.winning_length = winning_length
 
         self.move_count = 0
         self.illegal_count = 0
+        self.missed_win_count = 0
         self.missed_block_count = 0
 
         # Obs: (rows, col) -> board plane
         self.observation_space = spaces.Box(
             low=-1.0,
             high=1.0,
-            shape=(DEFAULT_ROWS, DEFAULT_COLUMNS),
+            shape=(rows, columns),
             dtype=np.float32,
         )
-        self.action_space = spaces.Discrete(DEFAULT_COLUMNS) # type: ignore
+        self.action_space = spaces.Discrete(columns) # type: ignore
+
+        # Observation, kept up to date in place as moves are made (see _play()).
+        # Bound to a vector env's array by use_obs_buffer().
+        self._obs_buffer: np.ndarray = np.zeros((rows, columns), dtype=np.float32)
+        self._obs_bound: bool = False
 
     def reset(
             self, 
@@ -35,19 +52,50 @@ class ConnectFourEnv(gym.Env[np.ndarray, int]):
             options: dict[str, Any] | None=None
             ) -> tuple[np.ndarray, dict[str, Any]]:
         super().reset(seed=seed)
-        self.board = C4Board()
+        self.board = C4Board(self.rows, self.columns, self.winning_length)
+        self._obs_buffer.fill(0.0)
 
-        # If X is being trained, make an opening move for O
+        # If X is being trained, make an opening move for O. It can be passed
+        # in as options["opening_move"] (see BatchedOpponentVecEnv).
         if self.agent_color == Color.X:
             assert self.board.expected_next_move_color == Color.O # Invariant
-            move, _ = self.opponent.predict(self._obs())
-            self.board.make_move(self.opponent_color, int(move))
+            if options is not None and "opening_move" in options:
+                move = options["opening_move"]
+            else:
+                move, _ = self.opponent.predict(self._obs())
+            self._play(self.opponent_color, int(move))
             assert self.board.expected_next_move_color == self.agent_color
             
-        return self._obs(), {}
+        return self._result_obs(), self._info({})
+
+    def action_masks(self) -> np.ndarray:
+        # Legal moves for the side to move; also in every step's info
+        return self.board.action_mask().copy()
+
+    def _info(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        info["action_mask"] = self.action_masks()
+        return info
+
+    def use_obs_buffer(self, buffer: np.ndarray) -> None:
+        # Makes the env keep its observation in "buffer" (e.g. its row of a
+        # vector env's observation array), so that it needs no copying out
+        buffer[...] = self._obs_buffer
+        self._obs_buffer = buffer
+        self._obs_bound = True
 
     def _obs(self) -> np.ndarray:
-        return ConnectFourEnv.obs(self.board)
+        # The buffer itself - valid until the next move. For the opponent's
+        # predictions; reset() and step() return _result_obs().
+        return self._obs_buffer
+
+    def _result_obs(self) -> np.ndarray:
+        # A copy which callers can keep, unless a vector env has bound the
+        # buffer to its own array: then the buffer, which it copies out itself.
+        # Terminal observations are always copies, see _terminal_obs().
+        return self._obs_buffer if self._obs_bound else self._obs_buffer.copy()
+
+    def _terminal_obs(self) -> np.ndarray:
+        return self._obs_buffer.copy()
     
     @staticmethod
     def obs(board: C4Board) -> np.ndarray:
@@ -58,13 +106,22 @@ class ConnectFourEnv(gym.Env[np.ndarray, int]):
         assert self.opponent is not None
 
         # Make agent move
-        result = self._make_move(hero_action, -10, +1)
-        if result[2]:
+        result = self.step_agent(hero_action)
+        if result is not None:
             return result
 
         # Make opponent move
         opponent_action_arr, _ = self.opponent.predict(self._obs())
-        opponent_action: int = int(opponent_action_arr)
+        return self.step_opponent(int(opponent_action_arr))
+
+    def step_agent(self, hero_action: int) -> Tuple[np.ndarray, float, bool, bool, Dict[str,str]] | None:
+        # First half of step(): the agent's move. Returns the step's result if
+        # the move ended the game, or None if the opponent is to reply - which
+        # step_opponent() then plays.
+        result = self._make_move(hero_action, -10, +1)
+        return result if result[2] else None
+
+    def step_opponent(self, opponent_action: int) -> Tuple[np.ndarray, float, bool, bool, Dict[str,str]]:
         return self._make_move(opponent_action, 0, -1)
 
     def _make_move(
@@ -77,33 +134,48 @@ class ConnectFourEnv(gym.Env[np.ndarray, int]):
         # print(f"Playing {action} by {color}")
 
         # Check for illegal moves
-        if action not in self.board.legal_moves():
+        if self.board.is_illegal(action):
             self.illegal_count += 1
             # print(f"Illegal action {action} by {color}")
-            return self._obs(), illegal_penalty, True, False, {f"illegal_move_by_{color}": "True"}
+            return self._terminal_obs(), illegal_penalty, True, False, self._info({f"illegal_move_by_{color}": "True"})
         
-        # Check for failing to block 3-token column
-        if self.board.failing_to_block_column(action, color):
+        # Check for missing a win, or failing to block one
+        if self.board.missed_win(action, color):
+            self.missed_win_count += 1
+        elif self.board.failing_to_block_column(action, color):
             self.missed_block_count += 1
         
         if self.move_count % 100 == 0:
-            print(f"Illegal/No Block: {self.illegal_count} / {self.missed_block_count} / {self.move_count} => {self.illegal_count / self.move_count:.4f} / {self.missed_block_count / self.move_count:.4f}")
+            print(f"Illegal/Missed Win/No Block: {self.illegal_count} / {self.missed_win_count} / {self.missed_block_count} / {self.move_count} => {self.illegal_count / self.move_count:.4f} / {self.missed_win_count / self.move_count:.4f} / {self.missed_block_count / self.move_count:.4f}")
 
-        self.board.make_move(color, action)
+        self._play(color, action)
         # print(f"Board after {color} move:")
         # self.board.print()
         # print(self._obs())
 
-        if self.board.is_winning(color):
+        if self.board.wins_at_last_move():
             # print(f"{color} wins!")
-            return self._obs(), win_reward, True, False, {"winner": str(color)}
+            return self._terminal_obs(), win_reward, True, False, self._info({"winner": str(color)})
 
         if self.board.is_tie():
             # print(f"Tie after {color} move")
-            return self._obs(), 0.0, True, False, {"tie": "True"}
+            return self._terminal_obs(), 0.0, True, False, self._info({"tie": "True"})
+
+        return self._result_obs(), 0.0, False, False, self._info({})  # No reward or punishment
+
+
+    def _play(self, color: Color, action: int) -> None:
+        self.board.make_move(color, action)
+        self._obs_buffer[self.rows - self.board.heights[action], action] = color.value
 
-        return self._obs(), 0.0, False, False, {}  # No reward or punishment
+    def set_opponent(self, opponent: BaseAlgorithm | C4MctsOpponent | OpponentSpec | None) -> None:
+        # E.g. through VecEnv.env_method(), to switch opponents inside workers
+        self.opponent = resolve_opponent(opponent)
 
+    def set_opponent_parameters(self, parameters: Dict[str, Any]) -> None:
+        # New weights for a model opponent (see BaseAlgorithm.get_parameters()),
+        # without rebuilding the env or restarting its worker
+        self.opponent.set_parameters(parameters)
 
     def render(self):
         if self.board:
@@ -1,28 +1,35 @@
 from typing import Tuple
 from c4.c4_board import C4Board, Color
+from c4.c4_mcts_player import C4MctsPlayer
+from c4.c4_optimal_player import C4OptimalPlayer
 
 class C4Game:
-  def __init__(self) -> None:
+  def __init__(self, opponent: C4OptimalPlayer | C4MctsPlayer | None=None) -> None:
     self.board = C4Board()
+    self.opponent = opponent
 
-  def start(self):
+  def start(self, human_player: Color=Color.O):
     while True:
       self.board.print(True)
 
       expected_color: Color = self.board.expected_next_move_color
 
       column: int
-      while True:
-        column_str: str = input(f"Enter Column: (0-6) for {expected_color.name}: ")
-        success, column = C4Game.try_parse(column_str) 
-        if not success or column < 0 or column > 6 or column not in self.board.legal_moves():
-          print("Invalid input " + column_str)
-        else:
-          break
+      if self.opponent is None or expected_color == human_player:
+        while True:
+          column_str: str = input(f"Enter Column: (0-6) for {expected_color.name}: ")
+          success, column = C4Game.try_parse(column_str)
+          if not success or self.board.is_illegal(column):
+            print("Invalid input " + column_str)
+          else:
+            break
+      else:
+        column = self.opponent.get_optimal_move(self.board)
+        print(f"{expected_color.name} plays {column}")
 
       self.board.make_move(expected_color, column)
 
-      if self.board.is_winning(expected_color):
+      if self.board.wins_at_last_move():
         print(f"{expected_color.name} WINS!!!")
         break
 
@@ -32,12 +39,10 @@ class C4Game:
 
     # Print final board state
     self.board.print(True)
-      
+
   @staticmethod
   def try_parse(s: str) -> Tuple[bool, int]:
     try:
       return (True, int(s))
     except ValueError:
       return (False, 0)
-      
-
@@ -0,0 +1,324 @@
+import math
+import random
+import time
+from array import array
+from typing import Any, List, Tuple
+import numpy as np
+import torch
+from stable_baselines3.common.base_class import BaseAlgorithm
+from c4.c4_board import C4Board, Color, WINNING_LENGTH
+
+# Terminal status of a node, known once the node has been reached
+UNKNOWN: int = -1
+NOT_TERMINAL: int = 0
+WIN: int = 1   # The move into the node won the game
+TIE: int = 2
+
+class MctsTree:
+  # Struct-of-arrays node store: node i is described by entry i of every
+  # array, and the children of a node occupy a contiguous block of indexes.
+  # Values are from the point of view of the player who made the move into
+  # the node.
+  def __init__(self):
+    self.parents: array = array("i")
+    self.first_children: array = array("i")
+    self.child_counts: array = array("b")
+    self.moves: array = array("b")
+    self.status: array = array("b")
+    self.visits: array = array("i")
+    self.values: array = array("d")
+    self.priors: array = array("f")
+    self.keys: array = array("Q")  # Zobrist key of the position at the node
+
+  def __len__(self) -> int:
+    return len(self.parents)
+
+  def add(self, parent: int, move: int, prior: float, key: int) -> int:
+    self.parents.append(parent)
+    self.first_children.append(-1)
+    self.child_counts.append(0)
+    self.moves.append(move)
+    self.status.append(UNKNOWN)
+    self.visits.append(0)
+    self.values.append(0.0)
+    self.priors.append(prior)
+    self.keys.append(key)
+    return len(self.parents) - 1
+
+  def children(self, node: int) -> range:
+    first: int = self.first_children[node]
+    return range(first, first + self.child_counts[node])
+
+  def subtree(self, root: int) -> "MctsTree":
+    # Copy of the subtree below "root", with "root" as node 0
+    tree: MctsTree = MctsTree()
+    tree._copy_node(self, root, -1)
+    pending: List[Tuple[int, int]] = [(root, 0)]
+    while pending:
+      old, new = pending.pop()
+      if self.child_counts[old] == 0:
+        continue
+
+      tree.first_children[new] = len(tree)
+      tree.child_counts[new] = self.child_counts[old]
+      for child in self.children(old):
+        pending.append((child, tree._copy_node(self, child, new)))
+
+    return tree
+
+  def _copy_node(self, other: "MctsTree", node: int, parent: int) -> int:
+    index: int = self.add(parent, other.moves[node], other.priors[node], other.keys[node])
+    self.status[index] = other.status[node]
+    self.visits[index] = other.visits[node]
+    self.values[index] = other.values[node]
+    return index
+
+class C4MctsPlayer:
+  def __init__(
+      self,
+      iterations: int=2000,
+      time_limit: float | None=None,
+      exploration: float=1.4,
+      policy: BaseAlgorithm | None=None,
+      seed: int | None=None):
+    # Search stops after "iterations" playouts, or after "time_limit" seconds
+    # if one is given. An optional SB3 Q-network model (e.g. DQN.load(...))
+    # supplies move priors and leaf values in place of random rollouts.
+    self.iterations = iterations
+    self.time_limit = time_limit
+    self.exploration = exploration
+    self.policy = policy
+    self.random: random.Random = random.Random(seed)
+
+    self.tree: MctsTree = MctsTree()
+    self.root_move_count: int = -1
+    self.playouts: int = 0  # Total, over all searches
+
+  # --------------------------------------------------------------------------
+  # Public API
+
+  def get_optimal_move(self, board: C4Board) -> int:
+    return int(np.argmax(self.search(board)))
+
+  def search(self, board: C4Board) -> np.ndarray:
+    # Grows the tree for "board" and returns the root visit count per column
+    if board.wins_at_last_move() or board.is_tie():
+      raise Exception("Game is already over")
+
+    self._set_root(board)
+    count: int = 0
+    if self.time_limit is None:
+      while count < self.iterations:
+        count += self._playout(board)
+    else:
+      deadline: float = time.perf_counter() + self.time_limit
+      while time.perf_counter() < deadline:
+        count += self._playout(board)
+    self.playouts += count
+
+    return self.root_visits(board.columns)
+
+  def root_visits(self, columns: int) -> np.ndarray:
+    visits: np.ndarray = np.zeros(columns, dtype=np.int64)
+    for child in self.tree.children(0):
+      visits[self.tree.moves[child]] = self.tree.visits[child]
+    return visits
+
+  # --------------------------------------------------------------------------
+  # Search
+
+  def _set_root(self, board: C4Board) -> None:
+    # Re-use the subtree for "board" if it is the current root, or is reachable
+    # from it by one or two moves (i.e. our move plus the opponent's reply)
+    tree: MctsTree = self.tree
+    key: int = board.key()
+    depth: int = board.move_count - self.root_move_count
+    if len(tree) > 0 and 0 <= depth <= 2:
+      level: List[int] = [0]
+      for _ in range(depth):
+        level = [child for node in level for child in tree.children(node)]
+      for node in level:
+        if tree.keys[node] == key:
+          self.tree = tree.subtree(node) if node != 0 else tree
+          self.tree.status[0] = NOT_TERMINAL
+          self.root_move_count = board.move_count
+          return
+
+    self.tree = MctsTree()
+    self.tree.add(-1, -1, 1.0, key)
+    self.tree.status[0] = NOT_TERMINAL
+    self.root_move_count = board.move_count
+
+  def _playout(self, root_board: C4Board) -> int:
+    # Returns the number of playouts done - always one here
+    tree: MctsTree = self.tree
+    node, depth = self._descend(root_board)
+
+    # Expansion and evaluation
+    value: float
+    if tree.status[node] == WIN:
+      value = 1.0
+    elif tree.status[node] == TIE:
+      value = 0.0
+    else:
+      value = self._expand(node, root_board)
+
+    self._ascend(root_board, depth)
+    self._backpropagate(node, value)
+    return 1
+
+  def _descend(self, board: C4Board) -> Tuple[int, int]:
+    # Selection: from the root down to a leaf or a terminal node. The moves
+    # are made on "board" itself - returns the node and the number of moves
+    # made, for _ascend() to take back.
+    tree: MctsTree = self.tree
+    node: int = 0
+    depth: int = 0
+    while tree.child_counts[node] > 0 and tree.status[node] == NOT_TERMINAL:
+      node = self._select(node)
+      board.make_move(board.expected_next_move_color, tree.moves[node])
+      depth += 1
+      if tree.status[node] == UNKNOWN:
+        tree.status[node] = WIN if board.wins_at_last_move() else TIE if board.is_tie() else NOT_TERMINAL
+
+    return node, depth
+
+  def _ascend(self, board: C4Board, depth: int) -> None:
+    for _ in range(depth):
+      board.unmake_move()
+
+  def _backpropagate(self, node: int, value: float) -> None:
+    # Each level up is the other player's point of view
+    tree: MctsTree = self.tree
+    while node >= 0:
+      tree.visits[node] += 1
+      tree.values[node] += value
+      value = -value
+      node = tree.parents[node]
+
+  def _select(self, node: int) -> int:
+    tree: MctsTree = self.tree
+    parent_visits: int = tree.visits[node]
+    log_visits: float = math.log(parent_visits) if parent_visits > 0 else 0.0
+    sqrt_visits: float = math.sqrt(parent_visits)
+
+    best: int = -1
+    best_score: float = float("-inf")
+    for child in tree.children(node):
+      visits: int = tree.visits[child]
+      if self.policy is None:
+        # UCT - unvisited children first
+        if visits == 0:
+          return child
+        score: float = tree.values[child] / visits + self.exploration * math.sqrt(log_visits / visits)
+      else:
+        # PUCT, with the policy's priors
+        q: float = tree.values[child] / visits if visits > 0 else 0.0
+        score = q + self.exploration * tree.priors[child] * sqrt_visits / (1 + visits)
+
+      if score > best_score:
+        best_score = score
+        best = child
+
+    return best
+
+  def _expand(self, node: int, board: C4Board) -> float:
+    # Adds the children of "node" and returns its value, from the point of
+    # view of the player who moved into it
+    legal: List[int] = board.legal_moves()
+
+    priors: List[float]
+    value: float
+    if self.policy is None:
+      priors = [1.0] * len(legal)
+      value = -self._rollout(board)
+    else:
+      evaluations: List[Tuple[List[float], float]] = self._evaluate([board])
+      priors, value = evaluations[0]
+      value = -value
+
+    self._add_children(node, board, legal, priors)
+    return value
+
+  def _add_children(self, node: int, board: C4Board, legal: List[int], priors: List[float]) -> None:
+    tree: MctsTree = self.tree
+    zobrist: List[int] = board.geometry.zobrist[board.expected_next_move_color]
+
+    tree.first_children[node] = len(tree)
+    tree.child_counts[node] = len(legal)
+    key: int = tree.keys[node]
+    for move, prior in zip(legal, priors):
+      cell: int = move * board.stride + board.heights[move]
+      tree.add(node, move, prior, key ^ zobrist[cell])
+
+  def _rollout(self, board: C4Board) -> float:
+    # Random playout; the result is from the point of view of the side to move
+    color: Color = board.expected_next_move_color
+    depth: int = 0
+    while True:
+      mover: Color = board.expected_next_move_color
+      board.make_move(mover, self.random.choice(board.legal_moves()))
+      depth += 1
+      if board.wins_at_last_move():
+        result: float = 1.0 if mover == color else -1.0
+        break
+      if board.is_tie():
+        result = 0.0
+        break
+
+    self._ascend(board, depth)
+    return result
+
+  def _evaluate(self, boards: List[C4Board]) -> List[Tuple[List[float], float]]:
+    # One forward pass for all boards. Per board: softmax of the Q-values over
+    # legal moves as priors, and the best legal Q-value (clipped to a game
+    # result) as the value for the side to move.
+    assert self.policy is not None
+    obs: np.ndarray = np.stack([board.board for board in boards]).astype(np.float32)
+    with torch.no_grad():
+      obs_tensor, _ = self.policy.policy.obs_to_tensor(obs)
+      q_values: np.ndarray = self.policy.q_net(obs_tensor).cpu().numpy()
+
+    evaluations: List[Tuple[List[float], float]] = []
+    for board, board_q in zip(boards, q_values):
+      legal_q: np.ndarray = board_q[board.action_mask()]
+      exp: np.ndarray = np.exp(legal_q - legal_q.max())
+      priors: np.ndarray = exp / exp.sum()
+      evaluations.append((priors.tolist(), float(np.clip(legal_q.max(), -1.0, 1.0))))
+
+    return evaluations
+
+class C4MctsOpponent:
+  # Adapter with the BaseAlgorithm.predict() signature, so that an MCTS player
+  # can be the opponent in ConnectFourEnv. The board is rebuilt from the
+  # observation, and the player's tree is re-used from one call to the next.
+  def __init__(self, player: C4MctsPlayer, winning_length: int=WINNING_LENGTH):
+    self.player = player
+    self.winning_length = winning_length
+
+  def predict(
+      self,
+      observation: np.ndarray,
+      state: Any=None,
+      episode_start: Any=None,
+      deterministic: bool=True) -> Tuple[np.ndarray, None]:
+    if observation.ndim == 3:
+      # A batch, e.g. from ConnectFourVecEnv - searched one board at a time
+      return np.array([int(self.predict(obs, deterministic=deterministic)[0]) for obs in observation]), None
+
+    board: C4Board = C4MctsOpponent.board_from_obs(observation, self.winning_length)
+    visits: np.ndarray = self.player.search(board)
+    if deterministic:
+      return np.array(int(np.argmax(visits))), None
+
+    return np.array(self.player.random.choices(range(len(visits)), weights=visits.tolist())[0]), None
+
+  @staticmethod
+  def board_from_obs(observation: np.ndarray, winning_length: int=WINNING_LENGTH) -> C4Board:
+    rows, columns = observation.shape
+    board: C4Board = C4Board(rows=rows, columns=columns, winning_length=winning_length)
+    board.board = np.rint(observation).astype(int)
+    board.move_count = int(np.count_nonzero(board.board))
+    # O always moves first, so equal token counts means O is to move
+    board.expected_next_move_color = Color.O if (board.board == Color.O.value).sum() == (board.board == Color.X.value).sum() else Color.X
+    return board
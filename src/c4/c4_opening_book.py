@@ -0,0 +1,137 @@
+import argparse
+import numpy as np
+from typing import List, Tuple
+from c4.c4_board import C4Board, DEFAULT_COLUMNS, DEFAULT_ROWS, WINNING_LENGTH
+
+# Opening book: solved (best move, score) for every position up to some ply,
+# stored as a sorted table of fixed-size records in a binary file. The file is
+# memory-mapped, so opening it costs nothing and many processes share one copy
+# through the page cache. Lookups are a binary search on the position key.
+#
+# Layout: a HEADER_DTYPE record, then count RECORD_DTYPE records sorted by key.
+# A book only holds for the geometry in its header.
+
+MAGIC: bytes = b"C4BOOK"
+VERSION: int = 2
+
+HEADER_DTYPE = np.dtype([
+  ("magic", "S6"),
+  ("version", "<u2"),
+  ("rows", "<u2"),
+  ("columns", "<u2"),
+  ("winning_length", "<u2"),
+  ("max_ply", "<u2"),
+  ("count", "<u8"),
+])
+
+RECORD_DTYPE = np.dtype([
+  ("key", "<u8"),
+  ("move", "i1"),
+  ("score", "i1"),
+])
+
+def position_key(board: C4Board) -> int:
+  # Unique per position: tokens of the side to move plus all tokens. Adding
+  # the mask sets a bit above each column, which encodes the column heights.
+  return board.bits(board.expected_next_move_color) + (board.o_bits | board.x_bits)
+
+class C4OpeningBook:
+  def __init__(
+      self,
+      path: str,
+      rows: int | None=None,
+      columns: int | None=None,
+      winning_length: int | None=None):
+    # The geometry, if given, must be the book's
+    header: np.ndarray = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) != 1 or header["magic"][0] != MAGIC or header["version"][0] != VERSION:
+      raise Exception(f"Not a version {VERSION} opening book: {path}")
+
+    self.rows: int = int(header["rows"][0])
+    self.columns: int = int(header["columns"][0])
+    self.winning_length: int = int(header["winning_length"][0])
+    self.max_ply: int = int(header["max_ply"][0])
+    for name, expected in (("rows", rows), ("columns", columns), ("winning_length", winning_length)):
+      if expected is not None and expected != getattr(self, name):
+        raise Exception(f"Opening book has {name} {getattr(self, name)}, not {expected}: {path}")
+    count: int = int(header["count"][0])
+
+    self.records: np.ndarray = np.memmap(
+      path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_DTYPE.itemsize, shape=(count,))
+    self.keys: np.ndarray = self.records["key"]
+
+  def __len__(self) -> int:
+    return len(self.records)
+
+  def lookup(self, board: C4Board) -> Tuple[int, int] | None:
+    # (best move, score) if the position is in the book
+    if (board.rows, board.columns, board.winning_length) != (self.rows, self.columns, self.winning_length):
+      return None
+    if board.move_count > self.max_ply:
+      return None
+
+    key: int = position_key(board)
+    index: int = int(np.searchsorted(self.keys, np.uint64(key)))
+    if index == len(self.keys) or int(self.keys[index]) != key:
+      return None
+
+    record = self.records[index]
+    return int(record["move"]), int(record["score"])
+
+  @staticmethod
+  def generate(
+      path: str,
+      max_ply: int,
+      rows: int=DEFAULT_ROWS,
+      columns: int=DEFAULT_COLUMNS,
+      verbose: bool=False,
+      winning_length: int=WINNING_LENGTH) -> int:
+    # Imported here, as the solver may itself be given a book
+    from c4.c4_optimal_player import C4OptimalPlayer
+
+    solver: C4OptimalPlayer = C4OptimalPlayer(rows=rows, columns=columns)
+    entries: List[Tuple[int, int, int]] = []
+
+    # Breadth-first, so every position is expanded once however it is reached
+    empty: C4Board = C4Board(rows, columns, winning_length)
+    level: dict[int, C4Board] = {position_key(empty): empty}
+    for ply in range(max_ply + 1):
+      next_level: dict[int, C4Board] = {}
+      for key, board in level.items():
+        entries.append((key, *solver.solve(board)))
+
+        if ply == max_ply:
+          continue
+        for move in board.legal_moves():
+          # Only positions which are kept for the next level are copied
+          board.make_move(board.expected_next_move_color, move)
+          child_key: int = position_key(board)
+          if child_key not in next_level and not board.wins_at_last_move() and not board.is_tie():
+            next_level[child_key] = board.copy()
+          board.unmake_move()
+
+      if verbose:
+        print(f"Ply {ply}: {len(level)} positions solved")
+      level = next_level
+
+    entries.sort()
+    records: np.ndarray = np.array(entries, dtype=RECORD_DTYPE)
+    header: np.ndarray = np.array(
+      [(MAGIC, VERSION, rows, columns, winning_length, max_ply, len(records))], dtype=HEADER_DTYPE)
+
+    with open(path, "wb") as file:
+      file.write(header.tobytes())
+      file.write(records.tobytes())
+
+    return len(records)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Generate a Connect Four opening book")
+  parser.add_argument("path")
+  parser.add_argument("--plies", type=int, default=4)
+  parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+  parser.add_argument("--columns", type=int, default=DEFAULT_COLUMNS)
+  args = parser.parse_args()
+
+  count: int = C4OpeningBook.generate(args.path, args.plies, args.rows, args.columns, verbose=True)
+  print(f"Wrote {count} positions to {args.path}")
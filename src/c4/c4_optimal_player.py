@@ -0,0 +1,276 @@
+from typing import List, Tuple
+from c4.c4_board import C4Board, C4Geometry, Color, DEFAULT_COLUMNS, DEFAULT_ROWS
+from c4.c4_opening_book import C4OpeningBook
+
+# Negamax solver for Connect Four, working directly on C4Board's bitboard
+# layout. Positions are (current, mask, moves): "current" holds the tokens of
+# the side to move, "mask" all tokens and "moves" the number played so far.
+#
+# Scores are from the point of view of the side to move: 0 is a draw, a
+# positive score is a win and a negative one a loss. The sooner the win, the
+# larger the score - a win with your last token scores 1, and a win with your
+# Nth-from-last token scores N.
+
+DEFAULT_TABLE_SIZE: int = 1_000_003  # Prime, so that keys spread over all slots
+
+class TranspositionTable:
+  # Fixed-size table of score bounds, keyed by position. On a collision the
+  # entry closer to the root (bigger subtree, so more expensive to recompute)
+  # is kept, unless it is left over from an earlier search.
+  def __init__(self, size: int=DEFAULT_TABLE_SIZE):
+    self.size = size
+    self.keys: List[int] = [0] * size
+    self.values: List[int] = [0] * size
+    self.moves: List[int] = [0] * size
+    self.generations: List[int] = [0] * size
+    self.generation: int = 0
+
+  def new_search(self) -> None:
+    self.generation += 1
+
+  def put(self, key: int, value: int, moves: int) -> None:
+    slot: int = key % self.size
+    if (self.keys[slot] != key and
+        self.generations[slot] == self.generation and
+        self.moves[slot] < moves):
+      return
+
+    self.keys[slot] = key
+    self.values[slot] = value
+    self.moves[slot] = moves
+    self.generations[slot] = self.generation
+
+  def get(self, key: int) -> int:
+    slot: int = key % self.size
+    return self.values[slot] if self.keys[slot] == key else 0
+
+  def clear(self) -> None:
+    self.keys = [0] * self.size
+    self.values = [0] * self.size
+    self.moves = [0] * self.size
+    self.generations = [0] * self.size
+    self.generation = 0
+
+class C4OptimalPlayer:
+  def __init__(
+      self,
+      rows: int=DEFAULT_ROWS,
+      columns: int=DEFAULT_COLUMNS,
+      table_size: int=DEFAULT_TABLE_SIZE,
+      book: C4OpeningBook | None=None):
+    self.rows = rows
+    self.columns = columns
+    self.stride: int = rows + 1
+    self.cells: int = rows * columns
+
+    self.min_score: int = -(self.cells // 2) + 3
+
+    self.bottom_mask: int = sum(1 << (col * self.stride) for col in range(columns))
+    self.board_mask: int = self.bottom_mask * ((1 << rows) - 1)
+    self.column_masks: List[int] = [((1 << rows) - 1) << (col * self.stride) for col in range(columns)]
+
+    self.move_order: List[int] = C4Geometry.geometry(rows, columns, 4).move_order
+
+    self.table: TranspositionTable = TranspositionTable(table_size)
+    self.node_count: int = 0
+    self.book: C4OpeningBook | None = book  # Consulted before searching
+    if book is not None and (book.rows, book.columns, book.winning_length) != (rows, columns, 4):
+      raise Exception(f"Opening book is for {book.rows}x{book.columns} connect-{book.winning_length}")
+
+  # --------------------------------------------------------------------------
+  # Public API
+
+  def score(self, board: C4Board) -> int:
+    current, mask = self._position(board)
+    if self.book is not None:
+      entry = self.book.lookup(board)
+      if entry is not None:
+        return entry[1]
+
+    self.table.new_search()
+    return self._solve(current, mask, board.move_count)
+
+  def get_optimal_move(self, board: C4Board) -> int:
+    return self._search(board, False)[0]
+
+  def solve(self, board: C4Board) -> Tuple[int, int]:
+    # The best move and the position's score from one search
+    move, score = self._search(board, True)
+    assert score is not None
+    return move, score
+
+  def _search(self, board: C4Board, need_score: bool) -> Tuple[int, int | None]:
+    current, mask = self._position(board)
+    moves: int = board.move_count
+    legal: List[int] = [col for col in self.move_order if not board.is_illegal(col)]
+    if len(legal) == 0:
+      raise Exception("No legal moves")
+
+    if self.book is not None:
+      entry = self.book.lookup(board)
+      if entry is not None:
+        return entry
+
+    possible: int = self._possible(mask)
+    winning: int = self._winning_position(current, mask) & possible
+    for col in legal:
+      if winning & self.column_masks[col]:
+        return col, (self.cells + 1 - moves) // 2
+
+    candidates: int = self._non_losing_moves(current, mask)
+    if candidates == 0:
+      return legal[0], -((self.cells - moves) // 2)  # Every move loses anyway
+    if moves + 1 == self.cells:
+      return legal[0], 0  # The last move draws
+
+    if candidates & (candidates - 1) == 0:
+      # Only one move does not lose at once (e.g. a forced block) - no search needed
+      # unless the score is wanted too
+      for col in legal:
+        if candidates & self.column_masks[col]:
+          if not need_score:
+            return col, None
+          self.table.new_search()
+          return col, self._solve(current, mask, moves)
+
+    # Find the score of the position, then pick the first move (in centre-first
+    # order) which achieves it - a null-window search around that score per move
+    self.table.new_search()
+    target: int = self._solve(current, mask, moves)
+    for col in legal:
+      move: int = candidates & self.column_masks[col]
+      if move and -self._negamax(current ^ mask, mask | move, moves + 1, -target, -target + 1) >= target:
+        return col, target
+
+    raise Exception("No move achieves the position's score")
+
+  # --------------------------------------------------------------------------
+  # Search
+
+  def _solve(self, current: int, mask: int, moves: int) -> int:
+    if self._winning_position(current, mask) & self._possible(mask):
+      return (self.cells + 1 - moves) // 2
+
+    # Iterative deepening on the score: a sequence of cheap null-window searches
+    # narrows [min, max] until the exact score is known
+    low: int = -((self.cells - moves) // 2)
+    high: int = (self.cells + 1 - moves) // 2
+    while low < high:
+      med: int = low + (high - low) // 2
+      if med <= 0 and low // 2 < med:
+        med = low // 2
+      elif med >= 0 and high // 2 > med:
+        med = high // 2
+
+      result: int = self._negamax(current, mask, moves, med, med + 1)
+      if result <= med:
+        high = result
+      else:
+        low = result
+
+    return low
+
+  def _negamax(self, current: int, mask: int, moves: int, alpha: int, beta: int) -> int:
+    # Assumes the side to move cannot win immediately
+    self.node_count += 1
+
+    candidates: int = self._non_losing_moves(current, mask)
+    if candidates == 0:
+      return -((self.cells - moves) // 2)  # Opponent wins with their next move
+
+    if moves >= self.cells - 2:
+      return 0  # Draw - the board fills up without a winner
+
+    lower: int = -((self.cells - 2 - moves) // 2)  # Opponent cannot win next move
+    if alpha < lower:
+      alpha = lower
+      if alpha >= beta:
+        return alpha
+
+    upper: int = (self.cells - 1 - moves) // 2  # We cannot win immediately
+    key: int = current + mask
+    stored: int = self.table.get(key)
+    if stored > 0:
+      upper = stored + self.min_score - 1
+    elif stored < 0:
+      lower = -stored + self.min_score - 1
+      if alpha < lower:
+        alpha = lower
+        if alpha >= beta:
+          return alpha
+    if beta > upper:
+      beta = upper
+      if alpha >= beta:
+        return beta
+
+    children: List[Tuple[int, int]] = []
+    for col in self.move_order:
+      move: int = candidates & self.column_masks[col]
+      if move:
+        threats: int = self._winning_position(current | move, mask).bit_count()
+        children.append((threats, move))
+    children.sort(key=lambda child: -child[0])  # Stable, so centre-first on ties
+
+    opponent: int = current ^ mask
+    for _, move in children:
+      score: int = -self._negamax(opponent, mask | move, moves + 1, -beta, -alpha)
+      if score >= beta:
+        self.table.put(key, -(score - self.min_score + 1), moves)  # Lower bound
+        return score
+      if score > alpha:
+        alpha = score
+
+    self.table.put(key, alpha - self.min_score + 1, moves)  # Upper bound
+    return alpha
+
+  # --------------------------------------------------------------------------
+  # Bitboard helpers
+
+  def _position(self, board: C4Board) -> Tuple[int, int]:
+    if board.rows != self.rows or board.columns != self.columns:
+      raise Exception(f"Solver is for {self.rows}x{self.columns}, board is {board.rows}x{board.columns}")
+    if board.winning_length != 4:
+      raise Exception(f"Solver only supports 4-in-a-row, not {board.winning_length}")
+    if board.is_winning(Color.O) or board.is_winning(Color.X):
+      raise Exception("Game is already won")
+
+    return board.bits(board.expected_next_move_color), board.o_bits | board.x_bits
+
+  def _possible(self, mask: int) -> int:
+    return (mask + self.bottom_mask) & self.board_mask
+
+  def _non_losing_moves(self, current: int, mask: int) -> int:
+    possible: int = self._possible(mask)
+    opponent_win: int = self._winning_position(current ^ mask, mask)
+    forced: int = possible & opponent_win
+    if forced:
+      if forced & (forced - 1):
+        return 0  # Two immediate threats - cannot block both
+      possible = forced
+
+    return possible & ~(opponent_win >> 1)  # Do not play right below a threat
+
+  def _winning_position(self, position: int, mask: int) -> int:
+    # Empty cells which would complete a line of four for "position"
+    # This is the solver's hot spot, hence the unrolled loop over directions
+    result: int = (position << 1) & (position << 2) & (position << 3)  # Vertical
+
+    shift: int = self.stride  # Horizontal
+    pair: int = (position << shift) & (position << 2 * shift)
+    result |= pair & ((position << 3 * shift) | (position >> shift))
+    pair = (position >> shift) & (position >> 2 * shift)
+    result |= pair & ((position << shift) | (position >> 3 * shift))
+
+    shift = self.stride - 1  # Diagonal, descending to the right
+    pair = (position << shift) & (position << 2 * shift)
+    result |= pair & ((position << 3 * shift) | (position >> shift))
+    pair = (position >> shift) & (position >> 2 * shift)
+    result |= pair & ((position << shift) | (position >> 3 * shift))
+
+    shift = self.stride + 1  # Diagonal, ascending to the right
+    pair = (position << shift) & (position << 2 * shift)
+    result |= pair & ((position << 3 * shift) | (position >> shift))
+    pair = (position >> shift) & (position >> 2 * shift)
+    result |= pair & ((position << shift) | (position >> 3 * shift))
+
+    return result & (self.board_mask ^ mask)
@@ -0,0 +1,149 @@
+import multiprocessing
+from array import array
+from multiprocessing.pool import Pool
+from typing import List, Tuple
+import numpy as np
+from stable_baselines3 import DQN
+from stable_baselines3.common.base_class import BaseAlgorithm
+from c4.c4_board import C4Board
+from c4.c4_mcts_player import C4MctsPlayer, MctsTree, TIE, WIN
+
+# Two ways of spending more than one core (or one NN call per playout) on an
+# MCTS move:
+#  - C4RootParallelMctsPlayer: each worker process grows its own tree from the
+#    same position, and the root visit counts are summed
+#  - C4LeafBatchedMctsPlayer: one tree, but pending leaves are collected (with
+#    virtual loss to spread them out) and evaluated in one batched forward pass
+
+# Per worker process: the policy, loaded once from its path
+_worker_policy: BaseAlgorithm | None = None
+
+def _init_worker(policy_path: str | None) -> None:
+  global _worker_policy
+  _worker_policy = DQN.load(policy_path) if policy_path is not None else None
+
+def _search_in_worker(
+    board: C4Board,
+    iterations: int,
+    time_limit: float | None,
+    exploration: float,
+    seed: int) -> Tuple[np.ndarray, int]:
+  player: C4MctsPlayer = C4MctsPlayer(iterations, time_limit, exploration, _worker_policy, seed)
+  visits: np.ndarray = player.search(board)
+  return visits, player.playouts
+
+class C4RootParallelMctsPlayer:
+  def __init__(
+      self,
+      workers: int | None=None,
+      iterations: int=2000,
+      time_limit: float | None=None,
+      exploration: float=1.4,
+      policy_path: str | None=None,
+      seed: int=0):
+    # "iterations" and "time_limit" are per worker, and there is one worker
+    # per core by default. The policy is given as a path (see DQN.load) so
+    # that each worker can load its own copy. Use the player in a with block,
+    # or call close(), to stop the workers.
+    self.workers: int = workers if workers is not None else multiprocessing.cpu_count()
+    self.iterations = iterations
+    self.time_limit = time_limit
+    self.exploration = exploration
+    self.policy_path = policy_path
+    self.seed = seed
+
+    self.pool: Pool | None = None  # Started on first search
+    self.playouts: int = 0
+
+  def get_optimal_move(self, board: C4Board) -> int:
+    return int(np.argmax(self.search(board)))
+
+  def search(self, board: C4Board) -> np.ndarray:
+    if self.pool is None:
+      self.pool = multiprocessing.Pool(self.workers, _init_worker, (self.policy_path,))
+
+    # A different seed per worker and per search, so that the trees differ
+    jobs = [
+      (board, self.iterations, self.time_limit, self.exploration, self.seed + ii)
+      for ii in range(self.workers)
+    ]
+    self.seed += self.workers
+    results: List[Tuple[np.ndarray, int]] = self.pool.starmap(_search_in_worker, jobs)
+
+    self.playouts += sum(playouts for _, playouts in results)
+    return np.sum([visits for visits, _ in results], axis=0)
+
+  def close(self) -> None:
+    if self.pool is not None:
+      self.pool.close()
+      self.pool.join()
+      self.pool = None
+
+  def __enter__(self) -> "C4RootParallelMctsPlayer":
+    return self
+
+  def __exit__(self, *exc_info) -> None:
+    self.close()
+
+  def __del__(self) -> None:
+    # Not closed: stop the workers without waiting for them
+    pool: Pool | None = getattr(self, "pool", None)
+    if pool is not None:
+      pool.terminate()
+
+class C4LeafBatchedMctsPlayer(C4MctsPlayer):
+  def __init__(
+      self,
+      policy: BaseAlgorithm,
+      batch_size: int=32,
+      iterations: int=2000,
+      time_limit: float | None=None,
+      exploration: float=1.4,
+      virtual_loss: float=1.0,
+      seed: int | None=None):
+    super().__init__(iterations, time_limit, exploration, policy, seed)
+    self.batch_size = batch_size
+    self.virtual_loss = virtual_loss
+
+  def _playout(self, root_board: C4Board) -> int:
+    status: array = self.tree.status
+    leaves: List[Tuple[int, C4Board]] = []
+    expanding: set[int] = set()
+    paths: List[int] = []  # Leaves whose path carries a virtual loss
+
+    for _ in range(self.batch_size):
+      node, depth = self._descend(root_board)
+      if status[node] == WIN:
+        self._backpropagate(node, 1.0)
+      elif status[node] == TIE:
+        self._backpropagate(node, 0.0)
+      else:
+        # Discourage the next selections in this batch from taking this path
+        self._add_virtual_loss(node, +1)
+        paths.append(node)
+        if node not in expanding:
+          # Only boards which wait for the batched evaluation are copied
+          expanding.add(node)
+          leaves.append((node, root_board.copy()))
+      self._ascend(root_board, depth)
+
+    # One forward pass for every new leaf
+    values: dict[int, float] = {}
+    if len(leaves) > 0:
+      evaluations = self._evaluate([board for _, board in leaves])
+      for (node, board), (priors, value) in zip(leaves, evaluations):
+        self._add_children(node, board, board.legal_moves(), priors)
+        values[node] = -value
+
+    for node in paths:
+      self._add_virtual_loss(node, -1)
+      self._backpropagate(node, values[node])
+
+    return self.batch_size
+
+  def _add_virtual_loss(self, node: int, sign: int) -> None:
+    tree: MctsTree = self.tree
+    while node >= 0:
+      tree.visits[node] += sign
+      tree.values[node] -= sign * self.virtual_loss
+      node = tree.parents[node]
@@ -3,7 +3,9 @@ from stable_baselines3 import PPO, DQN, A2C
 from stable_baselines3.common.base_class import BaseAlgorithm
 
 from c4.c4_board import Color, C4Board
+from c4.batched_opponent_vec_env import BatchedOpponentVecEnv
 from c4.c4_env import ConnectFourEnv
+from c4.snapshot_league import LeagueCallback, SnapshotLeague
 
 model_path_1 = "player1_dqn.zip"
 model_path_2 = "player2_dqn.zip"
@@ -13,10 +15,18 @@ if os.path.exists(model_path_1) and os.path.exists(model_path_2):
     player1 = DQN.load(model_path_1)
     player2 = DQN.load(model_path_2)
 else:
-    dummy_env: ConnectFourEnv = ConnectFourEnv(None, Color.O)
+    # Each player learns against a league of frozen snapshots of the other,
+    # sampled per episode, in envs which are built once
+    LEAGUE_ENVS: int = 8
+    league1: SnapshotLeague = SnapshotLeague()  # Snapshots of player 1 (O's)
+    league2: SnapshotLeague = SnapshotLeague()  # Snapshots of player 2 (X's)
+    env1: BatchedOpponentVecEnv = BatchedOpponentVecEnv(
+        [lambda: ConnectFourEnv(None, Color.O) for _ in range(LEAGUE_ENVS)], per_env_opponents=True)
+    env2: BatchedOpponentVecEnv = BatchedOpponentVecEnv(
+        [lambda: ConnectFourEnv(None, Color.X) for _ in range(LEAGUE_ENVS)], per_env_opponents=True)
+
     common_params = dict(
         policy="MlpPolicy",
-        env=dummy_env,
         learning_rate=0.1,
         buffer_size=2000,
         learning_starts=500,
@@ -24,6 +34,10 @@ else:
         tau=1.0,
         gamma=0.9,
         train_freq=1,
+        # One update per transition, from any number of envs, as with a single env.
+        # gradient_steps=1 runs several times faster, but makes LEAGUE_ENVS times
+        # fewer updates
+        gradient_steps=-1,
         target_update_interval=500,
         exploration_fraction=0.4,
         exploration_final_eps=0.1,
@@ -31,8 +45,12 @@ else:
     )
 
     # Two agents using the same settings
-    player1 = DQN(**common_params)
-    player2 = DQN(**common_params)
+    player1 = DQN(env=env1, **common_params)
+    player2 = DQN(env=env2, **common_params)
+
+    # Until their first episodes end, the envs play the initial snapshots
+    env1.env_method("set_opponent", league2.opponent(league2.add(player2)))
+    env2.env_method("set_opponent", league1.opponent(league1.add(player1)))
 
     LEARNING_ITERATIONS: int = 50
     TIME_STEPS: int = 2000
@@ -40,15 +58,13 @@ else:
     for iteration in range(LEARNING_ITERATIONS):
         # Learn for Player 1 (O's)
         print(f"Iteration {iteration} for Player O")
-        env1: ConnectFourEnv = ConnectFourEnv(player2, Color.O)
-        player1.set_env(env1)
-        player1.learn(TIME_STEPS)
+        player1.learn(TIME_STEPS, callback=LeagueCallback(league2), reset_num_timesteps=False)
+        league1.add(player1, player1.num_timesteps)
 
         # Learn for Player 2 (X's)
         print(f"Iteration {iteration} for Player X")
-        env2: ConnectFourEnv = ConnectFourEnv(player1, Color.X)
-        player2.set_env(env2)
-        player2.learn(TIME_STEPS)
+        player2.learn(TIME_STEPS, callback=LeagueCallback(league1), reset_num_timesteps=False)
+        league2.add(player2, player2.num_timesteps)
 
     player1.save("player1_dqn")
     player2.save("player2_dqn")
@@ -0,0 +1,187 @@
+from typing import Any, Dict, List
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.common.vec_env import VecEnv
+from stable_baselines3.common.vec_env.base_vec_env import VecEnvIndices, VecEnvObs, VecEnvStepReturn
+from c4.c4_board import Color, DEFAULT_COLUMNS, DEFAULT_ROWS, WINNING_LENGTH
+from c4.c4_board_batch import C4BoardBatch
+from c4.c4_mcts_player import C4MctsOpponent
+
+# ConnectFourEnv's game logic for N games at once, as an SB3 VecEnv. All boards
+# live in one C4BoardBatch, agent and opponent moves are applied to all of them
+# in one vectorized pass, and the opponent gets one batched predict() call per
+# step. Finished games are reset automatically (the last observation is in
+# info["terminal_observation"], as with DummyVecEnv).
+class ConnectFourVecEnv(VecEnv):
+    ILLEGAL_PENALTY: float = -10.0
+    WIN_REWARD: float = 1.0
+    LOSS_REWARD: float = -1.0
+
+    def __init__(
+            self,
+            num_envs: int,
+            opponent: BaseAlgorithm | C4MctsOpponent | None,
+            agent_color: Color,
+            rows: int=DEFAULT_ROWS,
+            columns: int=DEFAULT_COLUMNS,
+            winning_length: int=WINNING_LENGTH):
+        assert agent_color in (Color.O, Color.X)
+        self.agent_color = agent_color
+        self.opponent_color = Color.opposite(agent_color)
+        self.opponent = opponent
+        self.rows = rows
+        self.columns = columns
+        self.winning_length = winning_length
+
+        observation_space = spaces.Box(
+            low=-1.0,
+            high=1.0,
+            shape=(rows, columns),
+            dtype=np.float32,
+        )
+        action_space = spaces.Discrete(columns)
+        self.render_mode = None
+        super().__init__(num_envs, observation_space, action_space)
+
+        self.batch: C4BoardBatch = C4BoardBatch(num_envs, rows, columns, winning_length)
+        self.actions: np.ndarray = np.zeros(num_envs, dtype=np.intp)
+        # Observations of all games, updated in place move by move
+        self._obs_buffer: np.ndarray = np.zeros((num_envs, rows, columns), dtype=np.float32)
+        self.illegal_count = 0
+        self.move_count = 0
+
+    def reset(self) -> VecEnvObs:
+        self.batch.reset()
+        self._obs_buffer.fill(0.0)
+        self._opening_moves(np.arange(self.num_envs))
+        self.reset_infos = [{"action_mask": mask} for mask in self.action_masks()]
+        return self._obs()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self.actions = np.asarray(actions, dtype=np.intp).reshape(self.num_envs)
+
+    def step_wait(self) -> VecEnvStepReturn:
+        rewards: np.ndarray = np.zeros(self.num_envs, dtype=np.float32)
+        dones: np.ndarray = np.zeros(self.num_envs, dtype=bool)
+        infos: List[Dict[str, Any]] = [{} for _ in range(self.num_envs)]
+
+        # Agent moves
+        everyone: np.ndarray = np.arange(self.num_envs)
+        self._play(everyone, self.actions, self.ILLEGAL_PENALTY, self.WIN_REWARD, rewards, dones, infos)
+
+        # Opponent replies, for the games which are still going
+        pending: np.ndarray = np.flatnonzero(~dones)
+        if len(pending) > 0:
+            replies: np.ndarray = self._predict(pending)
+            self._play(pending, replies, 0.0, self.LOSS_REWARD, rewards, dones, infos)
+
+        # As ConnectFourEnv: the legal moves at the end of the step, before any
+        # reset
+        for info, mask in zip(infos, self.action_masks()):
+            info["action_mask"] = mask
+
+        # Auto-reset
+        finished: np.ndarray = np.flatnonzero(dones)
+        if len(finished) > 0:
+            terminal_obs: np.ndarray = self._obs_buffer[finished]
+            for ii, index in enumerate(finished):
+                infos[index]["terminal_observation"] = terminal_obs[ii]
+            self.batch.reset(finished)
+            self._obs_buffer[finished] = 0.0
+            self._opening_moves(finished)
+
+        return self._obs(), rewards, dones, infos
+
+    def action_masks(self) -> np.ndarray:
+        # One row of legal moves per game
+        return self.batch.legal_mask()
+
+    def _play(
+            self,
+            indices: np.ndarray,
+            actions: np.ndarray,
+            illegal_penalty: float,
+            win_reward: float,
+            rewards: np.ndarray,
+            dones: np.ndarray,
+            infos: List[Dict[str, Any]]) -> None:
+        # Plays actions[i] on board indices[i], and records the outcome of the
+        # games which it ends
+        self.move_count += len(indices)
+        in_range: np.ndarray = (actions >= 0) & (actions < self.columns)
+        legal: np.ndarray = in_range.copy()
+        legal[in_range] = self.batch.heights[indices[in_range], actions[in_range]] < self.rows
+
+        for index in indices[~legal]:
+            color: Color = Color(int(self.batch.turns[index]))
+            infos[index][f"illegal_move_by_{color}"] = "True"
+        self.illegal_count += int((~legal).sum())
+        rewards[indices[~legal]] = illegal_penalty
+        dones[indices[~legal]] = True
+
+        moved: np.ndarray = indices[legal]
+        if len(moved) == 0:
+            return
+        colors: np.ndarray = self.batch.turns[moved].copy()
+        columns: np.ndarray = actions[legal]
+        rows: np.ndarray = self._make_moves(columns, moved)
+
+        # Only the boards which just moved can have been won, and only through
+        # the cell just played
+        won: np.ndarray = self.batch.wins_at(moved, rows, columns)
+        tied: np.ndarray = ~won & (self.batch.move_counts[moved] == self.rows * self.columns)
+        for index, color_value in zip(moved[won], colors[won]):
+            infos[index]["winner"] = str(Color(int(color_value)))
+        for index in moved[tied]:
+            infos[index]["tie"] = "True"
+        rewards[moved[won]] = win_reward
+        dones[moved[won | tied]] = True
+
+    def _opening_moves(self, indices: np.ndarray) -> None:
+        # If X is being trained, O (the opponent) opens on the given boards
+        if self.agent_color == Color.X and len(indices) > 0:
+            self._make_moves(self._predict(indices), indices)
+
+    def _make_moves(self, actions: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        colors: np.ndarray = self.batch.turns[indices]
+        rows: np.ndarray = self.batch.make_moves(actions, indices)
+        self._obs_buffer[indices, rows, actions] = colors
+        return rows
+
+    def _predict(self, indices: np.ndarray) -> np.ndarray:
+        # One predict() call for all the given boards
+        assert self.opponent is not None
+        actions, _ = self.opponent.predict(self._obs_buffer[indices])
+        return np.asarray(actions, dtype=np.intp).reshape(len(indices))
+
+    def _obs(self) -> np.ndarray:
+        # A copy: SB3 keeps the previous observation until the next step
+        return self._obs_buffer.copy()
+
+    def close(self) -> None:
+        pass
+
+    def get_attr(self, attr_name: str, indices: VecEnvIndices=None) -> List[Any]:
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value: Any, indices: VecEnvIndices=None) -> None:
+        # All games share one set of attributes
+        setattr(self, attr_name, value)
+
+    def env_method(
+            self,
+            method_name: str,
+            *method_args,
+            indices: VecEnvIndices=None,
+            **method_kwargs) -> List[Any]:
+        if method_name == "action_masks":
+            # Per-game rows of the batched mask, as VecEnv users expect
+            masks: np.ndarray = self.action_masks()
+            return [masks[index] for index in self._get_indices(indices)]
+
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class: type, indices: VecEnvIndices=None) -> List[bool]:
+        return [False for _ in self._get_indices(indices)]
@@ -0,0 +1,14 @@
+import os
+
+# Where tables which are built once and reused (TTT tables, perfect-play and
+# Q-tables) are kept: the directory named by $C4_CACHE_DIR, else ~/.cache/c4.
+# Looked up on every call, not at import, so that it can be pointed elsewhere
+# at run time (the tests use a temporary directory).
+
+CACHE_DIR_VARIABLE: str = "C4_CACHE_DIR"
+
+def cache_dir() -> str:
+  return os.environ.get(CACHE_DIR_VARIABLE) or os.path.join(os.path.expanduser("~"), ".cache", "c4")
+
+def cache_path(name: str) -> str:
+  return os.path.join(cache_dir(), name)
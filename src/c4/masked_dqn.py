@@ -0,0 +1,96 @@
+from typing import Any, Tuple
+import numpy as np
+import torch
+from stable_baselines3 import DQN
+from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.dqn.policies import DQNPolicy, QNetwork
+
+# DQN which never picks an illegal move. The legal moves follow from the
+# observation itself (a board plane, empty cells are 0):
+#  - one action per column (Connect Four): the column's top cell is empty
+#  - one action per cell (Tic-Tac-Toe): the cell is empty
+# so the mask needs no plumbing through SB3 - it is applied to the Q-values,
+# which masks greedy moves and the max over next states in the TD target, and
+# to the random moves of epsilon-greedy exploration and the warm-up phase.
+
+ILLEGAL_Q: float = -1e9  # Finite, so that 0 * ILLEGAL_Q is 0 for terminal states
+
+def legal_action_mask(obs: np.ndarray | torch.Tensor, action_count: int) -> np.ndarray | torch.Tensor:
+  # Works on NumPy arrays and tensors, for one board or a batch of them
+  rows, columns = obs.shape[-2:]
+  if action_count == columns:
+    return obs[..., 0, :] == 0
+  if action_count == rows * columns:
+    return obs.reshape(*obs.shape[:-2], rows * columns) == 0
+  raise Exception(f"No action mask for {action_count} actions on a {rows}x{columns} board")
+
+def random_legal_actions(obs: np.ndarray, action_count: int, rng: Any=np.random) -> np.ndarray:
+  # Uniformly random legal action per board (action 0 if a board has none)
+  mask: np.ndarray = legal_action_mask(obs, action_count)
+  return np.argmax(rng.random(mask.shape) * mask, axis=-1)
+
+class MaskedQNetwork(QNetwork):
+  def forward(self, obs: torch.Tensor) -> torch.Tensor:
+    q_values: torch.Tensor = super().forward(obs)
+    return q_values.masked_fill(~legal_action_mask(obs, int(self.action_space.n)), ILLEGAL_Q)
+
+class MaskedDQNPolicy(DQNPolicy):
+  def make_q_net(self) -> QNetwork:
+    net_args = self._update_features_extractor(self.net_args, features_extractor=None)
+    return MaskedQNetwork(**net_args).to(self.device)
+
+class MaskedDQN(DQN):
+  policy_aliases = {**DQN.policy_aliases, "MlpPolicy": MaskedDQNPolicy}
+
+  def predict(
+      self,
+      observation: np.ndarray,
+      state: Tuple[np.ndarray, ...] | None=None,
+      episode_start: np.ndarray | None=None,
+      deterministic: bool=False) -> Tuple[np.ndarray, Tuple[np.ndarray, ...] | None]:
+    # As DQN.predict(), but explores over legal moves only
+    if not deterministic and np.random.rand() < self.exploration_rate:
+      return self._random_legal(observation), state
+    return self.policy.predict(observation, state, episode_start, deterministic)
+
+  def _sample_action(self, learning_starts: int, action_noise: Any=None, n_envs: int=1) -> Tuple[np.ndarray, np.ndarray]:
+    if self.num_timesteps < learning_starts:
+      # Warm-up phase
+      action: np.ndarray = self._random_legal(self._last_obs)
+      return action, action
+    return super()._sample_action(learning_starts, action_noise, n_envs)
+
+  def _random_legal(self, observation: np.ndarray) -> np.ndarray:
+    # The global NumPy generator, as SB3 uses for exploration
+    return random_legal_actions(np.asarray(observation), int(self.action_space.n))
+
+class MaskedOpponent:
+  # Wraps a trained model (e.g. a plain DQN) so that, as an env's opponent, it
+  # only plays legal moves: a DQN picks its best legal Q-value, and any other
+  # model's illegal picks are replaced by random legal moves.
+  def __init__(self, model: BaseAlgorithm, seed: int | None=None):
+    self.model = model
+    self.rng: np.random.Generator = np.random.default_rng(seed)
+
+  def predict(
+      self,
+      observation: np.ndarray,
+      state: Any=None,
+      episode_start: Any=None,
+      deterministic: bool=False) -> Tuple[np.ndarray, None]:
+    action_count: int = int(self.model.action_space.n)
+    mask: np.ndarray = legal_action_mask(observation, action_count)
+
+    if isinstance(self.model, DQN):
+      if not deterministic and self.rng.random() < self.model.exploration_rate:
+        return random_legal_actions(observation, action_count, self.rng), None
+
+      obs_tensor, _ = self.model.policy.obs_to_tensor(observation)
+      with torch.no_grad():
+        q_values: np.ndarray = self.model.q_net(obs_tensor).cpu().numpy().reshape(mask.shape)
+      return np.argmax(np.where(mask, q_values, -np.inf), axis=-1), None
+
+    action, _ = self.model.predict(observation, state, episode_start, deterministic)
+    action = np.asarray(action)
+    legal: np.ndarray = np.take_along_axis(mask.reshape(-1, action_count), action.reshape(-1, 1), axis=1).reshape(action.shape)
+    return np.where(legal, action, random_legal_actions(observation, action_count, self.rng)), None
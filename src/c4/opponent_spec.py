@@ -0,0 +1,56 @@
+from typing import Any, Callable
+from stable_baselines3 import DQN
+from stable_baselines3.common.base_class import BaseAlgorithm
+
+# Picklable descriptions of an env's opponent, for envs which are built in
+# SubprocVecEnv workers. Only the spec crosses the process boundary; each
+# worker loads its own opponent from it, the first time the opponent is used.
+
+class ModelSpec:
+  # An SB3 model saved at "path" (see BaseAlgorithm.save)
+  def __init__(self, path: str, algorithm: type[BaseAlgorithm]=DQN, device: str="cpu"):
+    self.path = path
+    self.algorithm = algorithm
+    self.device = device
+
+  def load(self) -> BaseAlgorithm:
+    return self.algorithm.load(self.path, device=self.device)
+
+class SolverSpec:
+  # A solver or player built by calling "factory" (e.g. a class) with "params"
+  def __init__(self, factory: Callable[..., Any], **params: Any):
+    self.factory = factory
+    self.params = params
+
+  def load(self) -> Any:
+    return self.factory(**self.params)
+
+OpponentSpec = ModelSpec | SolverSpec
+
+class LazyOpponent:
+  # Stands in for the opponent described by "spec": loads it on first use and
+  # then forwards every attribute to it. Pickles as the spec alone, so a
+  # loaded opponent is never shipped between processes.
+  def __init__(self, spec: OpponentSpec):
+    self.spec = spec
+    self._opponent: Any = None
+
+  @property
+  def opponent(self) -> Any:
+    if self._opponent is None:
+      self._opponent = self.spec.load()
+    return self._opponent
+
+  def __getattr__(self, name: str) -> Any:
+    if name.startswith("_") or name == "spec":
+      raise AttributeError(name)
+    return getattr(self.opponent, name)
+
+  def __getstate__(self) -> dict[str, Any]:
+    return {"spec": self.spec, "_opponent": None}
+
+def resolve_opponent(opponent: Any) -> Any:
+  # Specs become lazily loaded opponents; anything else is used as it is
+  if isinstance(opponent, (ModelSpec, SolverSpec)):
+    return LazyOpponent(opponent)
+  return opponent
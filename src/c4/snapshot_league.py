@@ -0,0 +1,192 @@
+import io
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Any, Callable, Dict, List
+import numpy as np
+import torch
+from stable_baselines3.common.base_class import BaseAlgorithm
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.policies import BasePolicy
+
+# A league of frozen snapshots of a learning policy, to train against instead
+# of a live model. Snapshots are kept as compressed, half precision parameter
+# blobs and only become policies again when they are sampled; at most
+# "cache_size" such policies are kept, least recently used first out. The pool
+# holds at most "max_snapshots" snapshots and "memory_cap" bytes (blobs plus
+# cached policies): the oldest snapshots make way for new ones.
+
+class Snapshot:
+  def __init__(self, snapshot_id: int, blob: bytes, step: int):
+    self.snapshot_id = snapshot_id
+    self.blob = blob
+    self.step = step
+
+    # The learner's results against this snapshot (a tie is half a loss)
+    self.games: int = 0
+    self.losses: float = 0.0
+
+  def loss_rate(self) -> float:
+    # Smoothed, so that a new snapshot starts at 1/2
+    return (self.losses + 1.0) / (self.games + 2.0)
+
+Prioritisation = Callable[[Snapshot], float]
+
+PRIORITISATIONS: Dict[str, Prioritisation] = {
+  "uniform": lambda snapshot: 1.0,
+  # Prioritised fictitious self-play: favours the snapshots the learner loses to
+  "loss_rate": lambda snapshot: snapshot.loss_rate() ** 2,
+}
+
+class SnapshotLeague:
+  def __init__(
+      self,
+      max_snapshots: int=20,
+      memory_cap: int=16 * 2**20,
+      cache_size: int=4,
+      prioritisation: str | Prioritisation="loss_rate",
+      dtype: type=np.float16,
+      seed: int | None=None):
+    self.max_snapshots = max_snapshots
+    self.memory_cap = memory_cap
+    self.cache_size = cache_size
+    self.prioritisation: Prioritisation = (
+      PRIORITISATIONS[prioritisation] if isinstance(prioritisation, str) else prioritisation)
+    self.dtype = dtype
+    self.rng: np.random.Generator = np.random.default_rng(seed)
+
+    self.snapshots: OrderedDict[int, Snapshot] = OrderedDict()  # Oldest first
+    self._policies: OrderedDict[int, BasePolicy] = OrderedDict()  # Least recently used first
+    self._template: BasePolicy | None = None
+    self._next_id: int = 0
+    self.loads: int = 0
+
+  def add(self, model: BaseAlgorithm | BasePolicy, step: int=0) -> int:
+    # Freezes the model's current policy into the league
+    policy: BasePolicy = model.policy if isinstance(model, BaseAlgorithm) else model
+    if self._template is None:
+      self._template = deepcopy(policy).to("cpu")
+      self._template.set_training_mode(False)
+      if hasattr(self._template, "q_net_target"):
+        # Not used to play, so the loaded copies share the Q-network's weights
+        self._template.q_net_target = self._template.q_net
+
+    snapshot_id: int = self._next_id
+    self._next_id += 1
+    self.snapshots[snapshot_id] = Snapshot(snapshot_id, self._pack(policy), step)
+    self._make_room(snapshot_id)
+    return snapshot_id
+
+  def sample(self) -> int:
+    # A snapshot id, drawn according to the prioritisation
+    if len(self.snapshots) == 0:
+      raise Exception("The league has no snapshots")
+    ids: List[int] = list(self.snapshots)
+    weights: np.ndarray = np.array([self.prioritisation(self.snapshots[snapshot_id]) for snapshot_id in ids])
+    return ids[self.rng.choice(len(ids), p=weights / weights.sum())]
+
+  def opponent(self, snapshot_id: int) -> BasePolicy:
+    # The snapshot as a policy, loaded on first use
+    if snapshot_id in self._policies:
+      self._policies.move_to_end(snapshot_id)
+      return self._policies[snapshot_id]
+
+    policy: BasePolicy = self._unpack(self.snapshots[snapshot_id].blob)
+    self.loads += 1
+    self._policies[snapshot_id] = policy
+    self._make_room(snapshot_id)
+    return policy
+
+  def record(self, snapshot_id: int, score: float) -> None:
+    # The learner's score in a game against the snapshot: 1 win, 1/2 tie,
+    # 0 loss. Results against snapshots which are gone are dropped.
+    if snapshot_id in self.snapshots:
+      snapshot: Snapshot = self.snapshots[snapshot_id]
+      snapshot.games += 1
+      snapshot.losses += 1.0 - score
+
+  def memory_usage(self) -> int:
+    blobs: int = sum(len(snapshot.blob) for snapshot in self.snapshots.values())
+    policies: int = sum(
+      sum(parameter.numel() * parameter.element_size() for parameter in policy.parameters())
+      for policy in self._policies.values()
+    )
+    return blobs + policies
+
+  def _make_room(self, keep: int) -> None:
+    # Back within the caps, without dropping snapshot "keep" or its policy.
+    # Cached policies can be reloaded, so they go first (least recently used
+    # first), then the oldest snapshots.
+    for snapshot_id in list(self._policies):
+      if len(self._policies) <= self.cache_size and self.memory_usage() <= self.memory_cap:
+        break
+      if snapshot_id != keep:
+        del self._policies[snapshot_id]
+    for snapshot_id in list(self.snapshots):
+      if len(self.snapshots) <= self.max_snapshots and self.memory_usage() <= self.memory_cap:
+        break
+      if snapshot_id != keep:
+        del self.snapshots[snapshot_id]
+        self._policies.pop(snapshot_id, None)
+
+  def _pack(self, policy: BasePolicy) -> bytes:
+    # A DQN's target network is only needed for learning, so it is left out
+    arrays: Dict[str, np.ndarray] = {
+      name: tensor.detach().cpu().numpy().astype(self.dtype)
+      for name, tensor in policy.state_dict().items()
+      if not name.startswith("q_net_target.")
+    }
+    stream: io.BytesIO = io.BytesIO()
+    np.savez_compressed(stream, **arrays)
+    return stream.getvalue()
+
+  def _unpack(self, blob: bytes) -> BasePolicy:
+    assert self._template is not None
+    policy: BasePolicy = deepcopy(self._template)
+    with np.load(io.BytesIO(blob)) as arrays:
+      state: Dict[str, torch.Tensor] = {name: torch.as_tensor(arrays[name].astype(np.float32)) for name in arrays.files}
+    policy.load_state_dict(state, strict=False)
+    return policy
+
+class LeagueCallback(BaseCallback):
+  # Gives each env of the training VecEnv an opponent sampled from the league
+  # for every episode - through set_opponent(), so that no env is rebuilt - and
+  # records the learner's results. As envs reset automatically, a new opponent
+  # only takes over after the opening move of its first episode, if any.
+  # Optionally adds a snapshot of the learner every "snapshot_interval" steps.
+  def __init__(self, league: SnapshotLeague, snapshot_interval: int | None=None, verbose: int=0):
+    super().__init__(verbose)
+    self.league = league
+    self.snapshot_interval = snapshot_interval
+    self.current: List[int] = []
+    self.agent_colors: List[Any] = []
+    self._last_snapshot: int = 0
+
+  def _on_training_start(self) -> None:
+    self.agent_colors = self.training_env.get_attr("agent_color")
+    self.current = [self._assign(env_idx) for env_idx in range(self.training_env.num_envs)]
+    self._last_snapshot = self.num_timesteps
+
+  def _on_step(self) -> bool:
+    for env_idx, (done, info) in enumerate(zip(self.locals["dones"], self.locals["infos"])):
+      if done:
+        self.league.record(self.current[env_idx], self._score(info, self.agent_colors[env_idx]))
+        self.current[env_idx] = self._assign(env_idx)
+
+    if self.snapshot_interval is not None and self.num_timesteps - self._last_snapshot >= self.snapshot_interval:
+      self.league.add(self.model, self.num_timesteps)
+      self._last_snapshot = self.num_timesteps
+    return True
+
+  def _assign(self, env_idx: int) -> int:
+    snapshot_id: int = self.league.sample()
+    self.training_env.env_method("set_opponent", self.league.opponent(snapshot_id), indices=[env_idx])
+    return snapshot_id
+
+  @staticmethod
+  def _score(info: Dict[str, Any], agent_color: Any) -> float:
+    if info.get("winner") == str(agent_color) or any(
+        key.startswith("illegal_move_by_") and key != f"illegal_move_by_{agent_color}" for key in info):
+      return 1.0
+    if "tie" in info:
+      return 0.5
+    return 0.0
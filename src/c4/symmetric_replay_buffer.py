@@ -0,0 +1,55 @@
+from typing import Any, Tuple
+import numpy as np
+import torch
+from gymnasium import spaces
+from stable_baselines3.common.buffers import ReplayBuffer
+from stable_baselines3.common.type_aliases import ReplayBufferSamples
+from stable_baselines3.common.vec_env import VecNormalize
+
+# Replay buffer for the board envs which replays each transition under a
+# random symmetry of the board, drawn per sampled transition: observation and
+# next observation are transformed alike, and the action is remapped. Connect
+# Four (one action per column) has the left-right mirror, Tic-Tac-Toe (one
+# action per cell of a square board) the 8 rotations and reflections. So every
+# stored transition stands for 2 or 8, at no extra env steps or memory.
+#
+# This assumes the opponent is symmetric too (e.g. random, or a perfect player
+# which picks at random among its best moves), as the transitions include its
+# replies. Use as DQN(..., replay_buffer_class=SymmetricReplayBuffer).
+
+def board_symmetries(rows: int, columns: int, action_count: int) -> Tuple[np.ndarray, np.ndarray]:
+  # Returns (cells, actions): symmetry s maps a flat board b to b[cells[s]],
+  # and action a to actions[s, a]. The identity is symmetry 0.
+  board: np.ndarray = np.arange(rows * columns).reshape(rows, columns)
+  if action_count == columns:
+    images: list[np.ndarray] = [board, board[:, ::-1]]
+    cells: np.ndarray = np.array([image.reshape(-1) for image in images])
+    actions: np.ndarray = np.array([np.argsort(image[0]) for image in images])
+    return cells, actions
+  if action_count == rows * columns and rows == columns:
+    images = [np.rot90(image, turns) for image in (board, board.T) for turns in range(4)]
+    cells = np.array([image.reshape(-1) for image in images])
+    return cells, np.argsort(cells, axis=1)
+  raise Exception(f"No symmetries for {action_count} actions on a {rows}x{columns} board")
+
+class SymmetricReplayBuffer(ReplayBuffer):
+  def __init__(self, buffer_size: int, observation_space: spaces.Space, action_space: spaces.Space, *args: Any, **kwargs: Any):
+    super().__init__(buffer_size, observation_space, action_space, *args, **kwargs)
+    rows, columns = observation_space.shape[-2:]
+    cells, actions = board_symmetries(rows, columns, int(action_space.n))
+    self.cells: torch.Tensor = torch.as_tensor(cells, device=self.device)
+    self.action_maps: torch.Tensor = torch.as_tensor(actions, device=self.device)
+
+  def _get_samples(self, batch_inds: np.ndarray, env: VecNormalize | None=None) -> ReplayBufferSamples:
+    samples: ReplayBufferSamples = super()._get_samples(batch_inds, env)
+    symmetries: torch.Tensor = torch.randint(len(self.cells), (len(batch_inds),), device=self.device)
+    cells: torch.Tensor = self.cells[symmetries]
+    return samples._replace(
+      observations=self._transform(samples.observations, cells),
+      actions=torch.gather(self.action_maps[symmetries], 1, samples.actions.long()).to(samples.actions.dtype),
+      next_observations=self._transform(samples.next_observations, cells),
+    )
+
+  @staticmethod
+  def _transform(boards: torch.Tensor, cells: torch.Tensor) -> torch.Tensor:
+    return torch.gather(boards.reshape(len(boards), -1), 1, cells).reshape(boards.shape)
@@ -3,19 +3,21 @@ import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 from c4.ttt_board import Color, TttBoard
+from c4.ttt_tables import TttTables, ttt_tables
 from stable_baselines3.common.base_class import BaseAlgorithm
 from stable_baselines3.common.callbacks import BaseCallback
 
 from c4.ttt_optimal_player import TttOptimalPlayer
+from c4.opponent_spec import OpponentSpec, resolve_opponent
 
 class Ttt1PlayEnv(gym.Env[np.ndarray, int]):
     metadata = {"render_modes": ["human"]}
 
-    def __init__(self, opponent: TttOptimalPlayer, agent_color: Color):
+    def __init__(self, opponent: TttOptimalPlayer | OpponentSpec, agent_color: Color):
         super().__init__()
         assert agent_color in (Color.O, Color.X)
         self.agent_color = agent_color
-        self.opponent: TttOptimalPlayer = opponent
+        self.opponent = resolve_opponent(opponent)
 
         # Obs: (rows, col) -> board plane
         self.observation_space = spaces.Box(
@@ -26,6 +28,12 @@ class Ttt1PlayEnv(gym.Env[np.ndarray, int]):
         )
         self.action_space = spaces.Discrete(9) # type: ignore
 
+        # Observation, kept up to date in place as moves are made (see _play()).
+        # Bound to a vector env's array by use_obs_buffer().
+        self._obs_buffer: np.ndarray = np.zeros((3, 3), dtype=np.float32)
+        self._obs_bound: bool = False
+        self.tables: TttTables = ttt_tables()  # Legality and outcome lookups
+
     def reset(
             self, 
             *, 
@@ -34,11 +42,39 @@ class Ttt1PlayEnv(gym.Env[np.ndarray, int]):
             ) -> tuple[np.ndarray, dict[str, Any]]:
         super().reset(seed=seed)
         self.board = TttBoard()
+        self._obs_buffer.fill(0.0)
             
-        return self._obs(), {}
+        return self._result_obs(), self._info({})
+
+    def action_masks(self) -> np.ndarray:
+        # Legal moves for the side to move; also in every step's info. A
+        # read-only row of the TTT tables.
+        return self.tables.legal[self.board.index]
+
+    def _info(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        info["action_mask"] = self.action_masks()
+        return info
+
+    def use_obs_buffer(self, buffer: np.ndarray) -> None:
+        # Makes the env keep its observation in "buffer" (e.g. its row of a
+        # vector env's observation array), so that it needs no copying out
+        buffer[...] = self._obs_buffer
+        self._obs_buffer = buffer
+        self._obs_bound = True
 
     def _obs(self) -> np.ndarray:
-        return Ttt1PlayEnv.obs(self.board)
+        # The buffer itself - valid until the next move. For the opponent's
+        # predictions; reset() and step() return _result_obs().
+        return self._obs_buffer
+
+    def _result_obs(self) -> np.ndarray:
+        # A copy which callers can keep, unless a vector env has bound the
+        # buffer to its own array: then the buffer, which it copies out itself.
+        # Terminal observations are always copies, see _terminal_obs().
+        return self._obs_buffer if self._obs_bound else self._obs_buffer.copy()
+
+    def _terminal_obs(self) -> np.ndarray:
+        return self._obs_buffer.copy()
     
     @staticmethod
     def obs(board: TttBoard) -> np.ndarray:
@@ -64,18 +100,27 @@ class Ttt1PlayEnv(gym.Env[np.ndarray, int]):
         color: Color = self.board.expected_next_move_color
 
         # Check for illegal moves
-        if action not in self.board.legal_moves():
-            return self._obs(), illegal_penalty, True, False, {f"illegal_move_by_{color}": "True"}
+        tables: TttTables = self.tables
+        if not 0 <= action < 9 or not tables.legal[self.board.index, action]:
+            return self._terminal_obs(), illegal_penalty, True, False, self._info({f"illegal_move_by_{color}": "True"})
 
-        self.board.make_move(color, action)
+        self._play(color, action)
+
+        if tables.winner[self.board.index] != Color.NONE.value:
+            return self._terminal_obs(), win_reward, True, False, self._info({"winner": str(color)})
 
-        if self.board.is_winning(color):
-            return self._obs(), win_reward, True, False, {"winner": str(color)}
+        if tables.terminal[self.board.index]:
+            return self._terminal_obs(), 1, True, False, self._info({"tie": "True"})
 
-        if self.board.is_tie():
-            return self._obs(), 1, True, False, {"tie": "True"}
+        return self._result_obs(), +0.1, False, False, self._info({})  # Reward for longer game
+
+    def _play(self, color: Color, action: int) -> None:
+        self.board.make_move(color, action)
+        self._obs_buffer[action // 3, action % 3] = color.value
 
-        return self._obs(), +0.1, False, False, {}  # Reward for longer game
+    def set_opponent(self, opponent: TttOptimalPlayer | OpponentSpec) -> None:
+        # E.g. through VecEnv.env_method(), to switch opponents inside workers
+        self.opponent = resolve_opponent(opponent)
 
     def render(self):
         if self.board:
@@ -116,7 +161,7 @@ class EvaluateCallback(BaseCallback):
                 self.steps += 1
                 move_x: int = self.opponent.get_optimal_move_for_X(board)
                 board.make_move(board.expected_next_move_color, move_x)
-                if board.is_tie() or board.is_winning(board.expected_next_move_color):
+                if board.is_tie() or board.wins_at_last_move():
                     break
 
             # Print stats
@@ -143,4 +188,4 @@ class EvaluateCallback(BaseCallback):
         color: Color = board.expected_next_move_color
         board.make_move(color, action)
         
-        return board.is_tie() or board.is_winning(color)
+        return board.is_tie() or board.wins_at_last_move()
@@ -3,18 +3,20 @@ import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 from c4.ttt_board import Color, TttBoard
+from c4.ttt_tables import TttTables, ttt_tables
 from stable_baselines3.common.base_class import BaseAlgorithm
 from stable_baselines3.common.callbacks import BaseCallback
+from c4.opponent_spec import OpponentSpec, resolve_opponent
 
 class Ttt2PlayEnv(gym.Env[np.ndarray, int]):
     metadata = {"render_modes": ["human"]}
 
-    def __init__(self, opponent: BaseAlgorithm, agent_color: Color):
+    def __init__(self, opponent: BaseAlgorithm | OpponentSpec | None, agent_color: Color):
         super().__init__()
         assert agent_color in (Color.O, Color.X)
         self.agent_color = agent_color
         self.opponent_color = Color.opposite(agent_color)
-        self.opponent: BaseAlgorithm = opponent
+        self.opponent = resolve_opponent(opponent)
 
         self.move_count = 0
         self.illegal_count = 0
@@ -29,6 +31,12 @@ class Ttt2PlayEnv(gym.Env[np.ndarray, int]):
         )
         self.action_space = spaces.Discrete(9) # type: ignore
 
+        # Observation, kept up to date in place as moves are made (see _play()).
+        # Bound to a vector env's array by use_obs_buffer().
+        self._obs_buffer: np.ndarray = np.zeros((3, 3), dtype=np.float32)
+        self._obs_bound: bool = False
+        self.tables: TttTables = ttt_tables()  # Legality and outcome lookups
+
     def reset(
             self, 
             *, 
@@ -37,18 +45,50 @@ class Ttt2PlayEnv(gym.Env[np.ndarray, int]):
             ) -> tuple[np.ndarray, dict[str, Any]]:
         super().reset(seed=seed)
         self.board = TttBoard()
+        self._obs_buffer.fill(0.0)
 
-        # If X is being trained, make an opening move for O
+        # If X is being trained, make an opening move for O. It can be passed
+        # in as options["opening_move"] (see BatchedOpponentVecEnv).
         if self.agent_color == Color.X:
             assert self.board.expected_next_move_color == Color.O # Invariant
-            move, _ = self.opponent.predict(self._obs())
-            self.board.make_move(self.opponent_color, int(move))
+            if options is not None and "opening_move" in options:
+                move = options["opening_move"]
+            else:
+                move, _ = self.opponent.predict(self._obs())
+            self._play(self.opponent_color, int(move))
             assert self.board.expected_next_move_color == self.agent_color
             
-        return self._obs(), {}
+        return self._result_obs(), self._info({})
+
+    def action_masks(self) -> np.ndarray:
+        # Legal moves for the side to move; also in every step's info. A
+        # read-only row of the TTT tables.
+        return self.tables.legal[self.board.index]
+
+    def _info(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        info["action_mask"] = self.action_masks()
+        return info
+
+    def use_obs_buffer(self, buffer: np.ndarray) -> None:
+        # Makes the env keep its observation in "buffer" (e.g. its row of a
+        # vector env's observation array), so that it needs no copying out
+        buffer[...] = self._obs_buffer
+        self._obs_buffer = buffer
+        self._obs_bound = True
 
     def _obs(self) -> np.ndarray:
-        return Ttt2PlayEnv.obs(self.board)
+        # The buffer itself - valid until the next move. For the opponent's
+        # predictions; reset() and step() return _result_obs().
+        return self._obs_buffer
+
+    def _result_obs(self) -> np.ndarray:
+        # A copy which callers can keep, unless a vector env has bound the
+        # buffer to its own array: then the buffer, which it copies out itself.
+        # Terminal observations are always copies, see _terminal_obs().
+        return self._obs_buffer if self._obs_bound else self._obs_buffer.copy()
+
+    def _terminal_obs(self) -> np.ndarray:
+        return self._obs_buffer.copy()
     
     @staticmethod
     def obs(board: TttBoard) -> np.ndarray:
@@ -59,13 +99,22 @@ class Ttt2PlayEnv(gym.Env[np.ndarray, int]):
         assert self.opponent is not None
 
         # Make agent move
-        result = self._make_move(action, -2, +1)
-        if result[2]:
+        result = self.step_agent(action)
+        if result is not None:
             return result
 
         # Make opponent move
         opponent_action_arr, _ = self.opponent.predict(self._obs())
-        opponent_action: int = int(opponent_action_arr)
+        return self.step_opponent(int(opponent_action_arr))
+
+    def step_agent(self, action: int) -> Tuple[np.ndarray, float, bool, bool, Dict[str,str]] | None:
+        # First half of step(): the agent's move. Returns the step's result if
+        # the move ended the game, or None if the opponent is to reply - which
+        # step_opponent() then plays.
+        result = self._make_move(action, -2, +1)
+        return result if result[2] else None
+
+    def step_opponent(self, opponent_action: int) -> Tuple[np.ndarray, float, bool, bool, Dict[str,str]]:
         return self._make_move(opponent_action, 0, -1)
 
     def _make_move(
@@ -77,22 +126,36 @@ class Ttt2PlayEnv(gym.Env[np.ndarray, int]):
         color: Color = self.board.expected_next_move_color
 
         # Check for illegal moves
-        if action not in self.board.legal_moves():
+        tables: TttTables = self.tables
+        if not 0 <= action < 9 or not tables.legal[self.board.index, action]:
             self.illegal_count += 1
-            return self._obs(), illegal_penalty, True, False, {f"illegal_move_by_{color}": "True"}
+            return self._terminal_obs(), illegal_penalty, True, False, self._info({f"illegal_move_by_{color}": "True"})
         
         # if self.move_count % 1000 == 0:
         #     print(f"Illegal: {self.illegal_count} / {self.move_count} => {self.illegal_count / self.move_count:.4f}")
 
-        self.board.make_move(color, action)
+        self._play(color, action)
+
+        if tables.winner[self.board.index] != Color.NONE.value:
+            return self._terminal_obs(), win_reward, True, False, self._info({"winner": str(color)})
 
-        if self.board.is_winning(color):
-            return self._obs(), win_reward, True, False, {"winner": str(color)}
+        if tables.terminal[self.board.index]:
+            return self._terminal_obs(), 0.0, True, False, self._info({"tie": "True"})
+
+        return self._result_obs(), +0.1, False, False, self._info({})  # Reward for longer game
+
+    def _play(self, color: Color, action: int) -> None:
+        self.board.make_move(color, action)
+        self._obs_buffer[action // 3, action % 3] = color.value
 
-        if self.board.is_tie():
-            return self._obs(), 0.0, True, False, {"tie": "True"}
+    def set_opponent(self, opponent: BaseAlgorithm | OpponentSpec | None) -> None:
+        # E.g. through VecEnv.env_method(), to switch opponents inside workers
+        self.opponent = resolve_opponent(opponent)
 
-        return self._obs(), +0.1, False, False, {}  # Reward for longer game
+    def set_opponent_parameters(self, parameters: Dict[str, Any]) -> None:
+        # New weights for a model opponent (see BaseAlgorithm.get_parameters()),
+        # without rebuilding the env or restarting its worker
+        self.opponent.set_parameters(parameters)
 
     def render(self):
         if self.board:
@@ -173,4 +236,4 @@ class EvaluateCallback(BaseCallback):
         color: Color = board.expected_next_move_color
         board.make_move(color, action)
         
-        return board.is_tie() or board.is_winning(color)
+        return board.is_tie() or board.wins_at_last_move()
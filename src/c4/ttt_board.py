@@ -1,19 +1,72 @@
 from typing import List, Tuple
 import random
 import numpy as np
-from c4.c4_board import Color
+from c4.c4_board import Color, ZOBRIST_X_TO_MOVE, zobrist_keys
 
 TttBoardState = Tuple[int, ...]
 
+LINES: List[Tuple[int, int, int]] = [
+  (0, 1, 2), (3, 4, 5), (6, 7, 8),  # Horizontal
+  (0, 3, 6), (1, 4, 7), (2, 5, 8),  # Vertical
+  (0, 4, 8), (2, 4, 6),             # Diagonal
+]
+
+# For each cell, the (up to four) lines which pass through it
+CELL_LINES: List[List[Tuple[int, int, int]]] = [
+  [line for line in LINES if cell in line] for cell in range(9)
+]
+
+# Zobrist keys per color, indexed by cell
+_ZOBRIST_KEYS: List[int] = zobrist_keys(18)
+ZOBRIST: dict[Color, List[int]] = {
+  Color.O: _ZOBRIST_KEYS[:9],
+  Color.X: _ZOBRIST_KEYS[9:],
+}
+
+# Base-3 state index: cell i holds digit 0 (empty), 1 (O) or 2 (X) at 3**i,
+# so that every board maps to one of STATE_COUNT dense indices
+STATE_COUNT: int = 3 ** 9
+STATE_DIGITS: dict[Color, List[int]] = {
+  Color.O: [3 ** cell for cell in range(9)],
+  Color.X: [2 * 3 ** cell for cell in range(9)],
+}
+
 class TttBoard:
   def __init__(self):
     self.board: np.ndarray = np.zeros((3, 3), dtype=int)
     self.expected_next_move_color: Color = Color.O
     self.move_count = 0
+    self.last_move: int = -1
+    self.hash: int = 0  # Zobrist hash, maintained by make_move()
+    self.index: int = 0  # Base-3 state index, maintained by make_move()
+    self.history: List[int] = []  # Moves played, for unmake_move()
 
   def state(self) -> TttBoardState:
     return tuple(self.board.reshape(-1).tolist())
 
+  def key(self, side_to_move: bool=False) -> int:
+    # Position key for caches and Q-tables. Side to move follows from the
+    # position in normal play, so it is only mixed in on request.
+    if side_to_move and self.expected_next_move_color == Color.X:
+      return self.hash ^ ZOBRIST_X_TO_MOVE
+    return self.hash
+
+  @staticmethod
+  def compute_index(board: np.ndarray) -> int:
+    index: int = 0
+    for cell, value in enumerate(board.reshape(-1).tolist()):
+      if value != Color.NONE.value:
+        index += STATE_DIGITS[Color(value)][cell]
+    return index
+
+  @staticmethod
+  def compute_hash(board: np.ndarray) -> int:
+    hash: int = 0
+    for cell, value in enumerate(board.reshape(-1).tolist()):
+      if value != Color.NONE.value:
+        hash ^= ZOBRIST[Color(value)][cell]
+    return hash
+
   def legal_moves(self) -> list[int]:
     legal: list[int] = []
 
@@ -37,13 +90,33 @@ class TttBoard:
     if color != self.expected_next_move_color:
       raise Exception(f"Expected {self.expected_next_move_color}, but move is for {color}")
     
-    if move not in self.legal_moves():
+    if move < 0 or move > 8 or self.is_illegal(move):
       raise Exception(f"Illegal move: {move}")
     
     self.expected_next_move_color = Color.opposite(color)
     self.move_count += 1
+    self.last_move = move
+    self.hash ^= ZOBRIST[color][move]
+    self.index += STATE_DIGITS[color][move]
+    self.history.append(move)
 
     self.set_at(move, color)
+
+  def unmake_move(self) -> None:
+    # Takes back the most recent make_move(), so that searches can explore a
+    # move without copying the board
+    if len(self.history) == 0:
+      raise Exception("No move to unmake")
+
+    move: int = self.history.pop()
+    color: Color = Color(self.get_at(move))
+    self.expected_next_move_color = color
+    self.move_count -= 1
+    self.last_move = self.history[-1] if len(self.history) > 0 else -1
+    self.hash ^= ZOBRIST[color][move]
+    self.index -= STATE_DIGITS[color][move]
+
+    self.set_at(move, Color.NONE)
   
   def is_illegal(self, action: int) -> bool:
     return self.get_at(action) != 0
@@ -84,6 +157,19 @@ class TttBoard:
         return True
 
     return False
+
+  def wins_at_last_move(self) -> bool:
+    # Only lines through the most recent move can have been completed by it
+    if self.last_move < 0:
+      return False
+
+    cells: np.ndarray = self.board.reshape(-1)
+    color: int = cells[self.last_move]
+    for a, b, c in CELL_LINES[self.last_move]:
+      if cells[a] == color and cells[b] == color and cells[c] == color:
+        return True
+
+    return False
   
 
 
@@ -121,6 +207,8 @@ class TttBoard:
 
     board: TttBoard = TttBoard()
     board.board = np.array(rows, dtype=int)
+    board.hash = TttBoard.compute_hash(board.board)
+    board.index = TttBoard.compute_index(board.board)
     return board
 
   def copy(self) -> "TttBoard":
@@ -129,6 +217,10 @@ class TttBoard:
     b.board = self.board.copy()
     b.expected_next_move_color = self.expected_next_move_color
     b.move_count = self.move_count
+    b.last_move = self.last_move
+    b.hash = self.hash
+    b.index = self.index
+    b.history = self.history.copy()
 
     return b
 
@@ -140,27 +232,30 @@ class TttBoard:
     return random.choice(legal)
   
   def missed_win(self, move: int) -> bool:
+    color: Color = self.expected_next_move_color
     possible_wins: List[int] = []
     for legal_move in self.legal_moves():
-      copy: "TttBoard" = self.copy()
-      copy.make_move(self.expected_next_move_color, legal_move)
-      if copy.is_winning(self.expected_next_move_color):
+      self.make_move(color, legal_move)
+      if self.wins_at_last_move():
         possible_wins.append(legal_move)
+      self.unmake_move()
 
     return len(possible_wins) > 0 and move not in possible_wins
 
 
   def failed_to_block(self, move: int) -> bool:
-    opponent_color: Color = Color.opposite(self.expected_next_move_color)
+    color: Color = self.expected_next_move_color
+    opponent_color: Color = Color.opposite(color)
 
     # Are any moves immediately winning for opponent?
     threats: List[int] = []
     for legal_move in self.legal_moves():
-      copy: "TttBoard" = self.copy()
-      copy.expected_next_move_color = opponent_color
-      copy.make_move(opponent_color, legal_move)
-      if copy.is_winning(opponent_color):
+      self.expected_next_move_color = opponent_color
+      self.make_move(opponent_color, legal_move)
+      if self.wins_at_last_move():
         threats.append(legal_move)
+      self.unmake_move()
+    self.expected_next_move_color = color
 
     # If there are multiple threats, we can't really blame the player for 
     # what happens next, since no matter what they play, the will lose
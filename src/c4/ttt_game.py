@@ -43,7 +43,7 @@ class TttGame:
       self.board.make_move(expected_color, move)
       print("-----")
 
-      if self.board.is_winning(expected_color):
+      if self.board.wins_at_last_move():
         print(f"{expected_color.name} WINS!!!")
         break
 
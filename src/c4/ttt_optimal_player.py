@@ -1,51 +1,120 @@
+import os
+import numpy as np
 from c4.c4_board import Color
-from c4.ttt_board import TttBoard
+from c4.cache import cache_path
+from c4.ttt_board import STATE_COUNT, TttBoard
+from c4.ttt_tables import CACHE_NAME as TABLES_CACHE_NAME, TttTables, ttt_tables
 
+# Perfect play for either side, from a table with one record per state index
+# (TttBoard.index): the score of every move for the side to move (+1 win,
+# 0 draw, -1 loss, ILLEGAL for taken cells), the best move and its score.
+# The table is solved once, backwards from full boards over the TTT tables,
+# and kept in a binary file (by default CACHE_NAME in the cache directory,
+# see c4.cache) which is memory-mapped on construction.
+#
+# Layout: a HEADER_DTYPE record, then STATE_COUNT RECORD_DTYPE records.
+
+MAGIC: bytes = b"TTTBEST"
+VERSION: int = 1
+CACHE_NAME: str = f"ttt_optimal_v{VERSION}.bin"
+ILLEGAL: int = -128
+
+HEADER_DTYPE = np.dtype([
+  ("magic", "S7"),
+  ("version", "<u2"),
+  ("count", "<u4"),
+])
+
+RECORD_DTYPE = np.dtype([
+  ("move", "i1"),
+  ("score", "i1"),
+  ("move_scores", "i1", (9,)),
+])
 
 class TttOptimalPlayer:
-  def __init__(self):
-    self.cache: dict[tuple[int, ...], tuple[int, int]] = {}
-    self.solve(TttBoard(), Color.O)  # Precompute from empty board
-
-  def solve(self, board: TttBoard, player: Color) -> int:
-    key = self._hash(board)
-
-    if key in self.cache:
-      return self.cache[key][0]
-
-    legal = board.legal_moves()
-    if not legal:
-      self.cache[key] = (0, -1)
-      return 0
-
-    best_score = -2 if player == Color.X else 2
-    best_move = -1
-
-    for move in legal:
-      b = board.copy()
-      b.make_move(player, move)
-
-      if b.is_winning(player):
-        score = +1 if player == Color.X else -1
-      else:
-        next_player = Color.O if player == Color.X else Color.X
-        score = self.solve(b, next_player)
-
-      if player == Color.X:
-        if score > best_score:
-          best_score = score
-          best_move = move
-      else:
-        if score < best_score:
-          best_score = score
-          best_move = move
-
-    self.cache[key] = (best_score, best_move)
-    return best_score
+  def __init__(
+      self,
+      path: str | None=None,
+      random_ties: bool=False,
+      seed: int | None=None,
+      tables: TttTables | None=None):
+    # With random_ties, moves are drawn among all the optimal ones. "tables"
+    # are only needed to solve a missing table.
+    self.path: str = path or cache_path(CACHE_NAME)
+    self.random_ties = random_ties
+    self.rng: np.random.Generator = np.random.default_rng(seed)
+    try:
+      self.records: np.ndarray = TttOptimalPlayer.load(self.path)
+    except Exception:
+      self.records = TttOptimalPlayer.generate(self.path, tables)
+    # Plain array views of the mapped file index faster than np.memmap's
+    self.moves: np.ndarray = np.asarray(self.records["move"])
+    self.scores: np.ndarray = np.asarray(self.records["score"])
+    self.move_scores: np.ndarray = np.asarray(self.records["move_scores"])
+
+  def get_optimal_move(self, board: TttBoard) -> int:
+    # For the side to move, O or X
+    state: int = board.index
+    if self.random_ties:
+      best: np.ndarray = np.flatnonzero(self.move_scores[state] == self.scores[state])
+      return int(self.rng.choice(best))
+    return int(self.moves[state])
 
   def get_optimal_move_for_X(self, board: TttBoard) -> int:
-    return self.cache[self._hash(board)][1]
+    return self.get_optimal_move(board)
+
+  def score(self, board: TttBoard) -> int:
+    # +1 if the side to move wins with perfect play, -1 if it loses, else 0
+    return int(self.scores[board.index])
+
+  @staticmethod
+  def load(path: str) -> np.ndarray:
+    header: np.ndarray = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) != 1 or header["magic"][0] != MAGIC or header["version"][0] != VERSION or header["count"][0] != STATE_COUNT:
+      raise Exception(f"Not a version {VERSION} TTT perfect-play table: {path}")
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_DTYPE.itemsize, shape=(STATE_COUNT,))
+
+  @staticmethod
+  def solve(tables: TttTables) -> np.ndarray:
+    # Negamax over all states at once, layer by layer from full boards down
+    # to the empty one: a move scores minus the value of the state it leads to
+    stones: np.ndarray = 9 - tables.legal.sum(axis=1)
+    values: np.ndarray = np.zeros(STATE_COUNT, dtype=np.int8)
+    move_scores: np.ndarray = np.full((STATE_COUNT, 9), ILLEGAL, dtype=np.int8)
+
+    won: np.ndarray = tables.winner != Color.NONE.value
+    values[won] = np.where(tables.winner[won] == tables.to_move[won], 1, -1)
+    for count in range(8, -1, -1):
+      states: np.ndarray = np.flatnonzero((stones == count) & ~tables.terminal)
+      legal: np.ndarray = tables.legal[states]
+      scores: np.ndarray = -values[tables.next_state[states].astype(np.intp)]
+      move_scores[states] = np.where(legal, scores, ILLEGAL)
+      values[states] = move_scores[states].max(axis=1)
+
+    records: np.ndarray = np.zeros(STATE_COUNT, dtype=RECORD_DTYPE)
+    records["move_scores"] = move_scores
+    records["score"] = values
+    records["move"] = np.where(tables.terminal, -1, move_scores.argmax(axis=1))
+    return records
 
   @staticmethod
-  def _hash(board: TttBoard) -> tuple[int, ...]:
-    return tuple(board.board.reshape(-1))
+  def generate(path: str, tables: TttTables | None=None) -> np.ndarray:
+    # Solves the table and saves it to "path", if possible. Without "tables",
+    # the TTT tables are cached next to "path".
+    if tables is None:
+      tables = ttt_tables(os.path.join(os.path.dirname(path), TABLES_CACHE_NAME))
+    records: np.ndarray = TttOptimalPlayer.solve(tables)
+    header: np.ndarray = np.array([(MAGIC, VERSION, STATE_COUNT)], dtype=HEADER_DTYPE)
+
+    # Written next to the target and then renamed, so that readers never see
+    # a partial file
+    try:
+      os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+      temporary: str = f"{path}.{os.getpid()}.tmp"
+      with open(temporary, "wb") as file:
+        file.write(header.tobytes())
+        file.write(records.tobytes())
+      os.replace(temporary, path)
+    except OSError:
+      pass  # E.g. a read-only home directory: just don't cache
+    return records
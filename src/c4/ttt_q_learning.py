@@ -1,123 +1,337 @@
+import multiprocessing
+import os
 import random
-from typing import Tuple, Dict
-from c4.ttt_board import TttBoard, TttBoardState
+import time
+import zlib
+from multiprocessing import shared_memory
+from multiprocessing.sharedctypes import Synchronized
+import numpy as np
+from c4.cache import cache_path
+from c4.ttt_board import STATE_COUNT, TttBoard
+from c4.ttt_tables import TttTables, ttt_tables
 from c4.c4_board import Color
 
 TRAINING_RUNS: int = 100_000
+PARALLEL_GAMES: int = 16384
+SYNC_GAMES: int = 50_000
 REWARD_WIN = +1.0
 REWARD_LOSS = -1.0
 REWARD_TIE = 0.0
 REWARD_CONTINUE = 0.0
 
-QKey = Tuple[TttBoardState, int]
+# Saved Q-tables: a HEADER_DTYPE record, with the hyperparameters they were
+# trained with and a CRC-32 of the table, then the STATE_COUNT x 9 float32
+# Q-values, memory-mapped on load. By default CACHE_NAME in the cache
+# directory (see c4.cache).
+MAGIC: bytes = b"TTTQTAB"
+VERSION: int = 1
+CACHE_NAME: str = f"ttt_q_table_v{VERSION}.bin"
+
+HEADER_DTYPE = np.dtype([
+  ("magic", "S7"),
+  ("version", "<u2"),
+  ("count", "<u4"),
+  ("checksum", "<u4"),
+  ("games", "<u8"),
+  ("epsilon", "<f8"),
+  ("learning_rate", "<f8"),
+  ("gamma", "<f8"),
+  ("reserved", "V15"),  # Puts the table at a 64-byte offset
+])
+
+class QTableFileError(Exception):
+  # A saved Q-table which is missing, corrupt, or not trained as asked
+  pass
 
 class TttQLearning:
   def __init__(self) -> None:
-    self.q_table: Dict[QKey, float] = {}
+    self.tables: TttTables = ttt_tables()
+    # Q-values, indexed by [TttBoard.index, move]. Illegal moves are -inf, so
+    # that the max and argmax of a row only ever see legal moves.
+    self.q_table: np.ndarray = np.where(self.tables.legal, 0.0, -np.inf).astype(np.float32)
     self.epsilon: float = 0.2
     self.learning_rate = 0.1
     self.gamma = 0.95
+    self.games: int = 0  # Trained on
 
   def train_multiple_games(self, iterations: int=TRAINING_RUNS) -> None:
     for ii in range(iterations):
       self.train_one_game()
       if ii % 1000 == 0:
-        print(f"Iteration {ii}: Dict size: {len(self.q_table)}")
+        print(f"Iteration {ii}: Nonzero Q-values: {np.count_nonzero(self.q_table[self.tables.legal])}")
+
+  def train_lock_step(
+      self,
+      iterations: int=TRAINING_RUNS,
+      parallel_games: int=PARALLEL_GAMES,
+      seed: int | np.random.Generator | None=None,
+      report_every: int | None=100_000) -> None:
+    # As train_multiple_games(), with "parallel_games" games advanced a move
+    # at a time together, over state indices: epsilon-greedy moves, TD targets
+    # and Q updates are whole-array operations. All the moves of a round see
+    # the Q-values from before it. No progress lines without "report_every".
+    rng: np.random.Generator = np.random.default_rng(seed)
+    tables: TttTables = self.tables
+    # Flat [state * 9 + move] lookups index faster than 2-D ones
+    next_states: np.ndarray = tables.next_state.astype(np.intp).reshape(-1)
+    # Each state's legal cells first, so that one draw picks a random one
+    legal_cells: np.ndarray = np.argsort(~tables.legal, axis=1, kind="stable").reshape(-1)
+    legal_counts: np.ndarray = tables.legal.sum(axis=1)
+    # The TD target of a move into each state, as in update_q_table(): the
+    # reward of a final move, else the next mover's best Q-value, negated.
+    # Refreshed, with the greedy moves, for the rows each round updates.
+    arrival_targets: np.ndarray = np.where(
+      tables.terminal,
+      np.where(tables.winner != Color.NONE.value, REWARD_WIN, REWARD_TIE),
+      REWARD_CONTINUE - self.gamma * self.q_table.max(axis=1))
+    greedy_moves: np.ndarray = self.q_table.argmax(axis=1)
+
+    states: np.ndarray = np.zeros(min(parallel_games, iterations), dtype=np.intp)
+    started: int = len(states)
+    finished: int = 0
+    while len(states) > 0:
+      # Epsilon-greedy, ties going to the lowest cell as in select_move(). A
+      # draw below epsilon also picks the random move.
+      moves: np.ndarray = greedy_moves[states]
+      draws: np.ndarray = rng.random(len(states))
+      explore: np.ndarray = draws < self.epsilon
+      explorers: np.ndarray = states[explore]
+      moves[explore] = legal_cells[explorers * 9 + (draws[explore] / self.epsilon * legal_counts[explorers]).astype(np.intp)]
+
+      # Moves into the same entry share a target, so k of them compound to
+      # (1 - lr)**k * q + (1 - (1 - lr)**k) * target whatever their order
+      keys: np.ndarray = states * 9 + moves
+      after: np.ndarray = next_states[keys]
+      ended: np.ndarray = tables.terminal[after]
+      entries, counts = TttQLearning._count_entries(keys)
+      self._apply_updates(entries, counts, arrival_targets[next_states[entries]])
+      updated: np.ndarray = entries // 9
+      rows: np.ndarray = self.q_table[updated]
+      arrival_targets[updated] = REWARD_CONTINUE - self.gamma * TttQLearning._row_max(rows)
+      greedy_moves[updated] = rows.argmax(axis=1)
+
+      # Finished games make way for new ones
+      states = after
+      done: int = int(ended.sum())
+      if done > 0:
+        restarts: int = min(done, iterations - started)
+        states = np.concatenate([after[~ended], np.zeros(restarts, dtype=np.intp)])
+        started += restarts
+        if report_every is not None and (finished + done) // report_every > finished // report_every:
+          print(f"Iteration {finished + done}: Nonzero Q-values: {np.count_nonzero(self.q_table[tables.legal])}")
+        finished += done
+    self.games += iterations
+
+  def train_shared(
+      self,
+      iterations: int=TRAINING_RUNS,
+      workers: int | None=None,
+      parallel_games: int=PARALLEL_GAMES,
+      sync_games: int=SYNC_GAMES,
+      seed: int | None=None,
+      report_every: int=100_000) -> None:
+    # train_lock_step() in "workers" processes at once, on one Q-table in
+    # shared memory that they all update without locks (Hogwild), so an
+    # update racing another of the same entry can be lost. A worker sees
+    # the others' updates as it reads Q-values, and refreshes its greedy
+    # moves and TD targets every "sync_games" games. Progress lines count
+    # the games of all the workers. One worker per core by default.
+    if workers is None:
+      workers = multiprocessing.cpu_count()
+    memory: shared_memory.SharedMemory = shared_memory.SharedMemory(create=True, size=self.q_table.nbytes)
+    processes: list[multiprocessing.Process] = []
+    try:
+      shared: np.ndarray = np.ndarray(self.q_table.shape, dtype=self.q_table.dtype, buffer=memory.buf)
+      shared[:] = self.q_table
+      finished: Synchronized = multiprocessing.Value("q", 0)
+      seeds: list[np.random.SeedSequence] = np.random.SeedSequence(seed).spawn(workers)
+      settings: tuple[float, float, float] = (self.epsilon, self.learning_rate, self.gamma)
+      for ii in range(workers):
+        games: int = iterations // workers + (ii < iterations % workers)
+        processes.append(multiprocessing.Process(
+          target=_train_shared_worker,
+          args=(memory.name, games, settings, parallel_games, sync_games, seeds[ii], finished)))
+      for process in processes:
+        process.start()
+
+      reported: int = 0
+      while True:
+        running: bool = any(process.is_alive() for process in processes)
+        games_done: int = finished.value
+        if games_done // report_every > reported // report_every:
+          print(f"Iteration {games_done}: Nonzero Q-values: {np.count_nonzero(shared[self.tables.legal])}")
+        reported = games_done
+        if not running:
+          break
+        time.sleep(0.05)
+      for process in processes:
+        process.join()
+        if process.exitcode != 0:
+          raise Exception(f"Training worker failed with exit code {process.exitcode}")
+
+      self.q_table[:] = shared
+      self.games += iterations
+      del shared  # Before close(): the buffer can't be released while viewed
+    finally:
+      for process in processes:
+        if process.is_alive():
+          process.terminate()
+      memory.close()
+      memory.unlink()
+
+  def save(self, path: str | None=None) -> None:
+    # Written next to the target and then renamed, so that readers never see
+    # a partial file
+    path = path or cache_path(CACHE_NAME)
+    table: np.ndarray = np.ascontiguousarray(self.q_table, dtype="<f4")
+    header: np.ndarray = np.zeros(1, dtype=HEADER_DTYPE)
+    header[0] = (
+      MAGIC, VERSION, STATE_COUNT, zlib.crc32(table), self.games,
+      self.epsilon, self.learning_rate, self.gamma, bytes(15))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary: str = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+      file.write(header.tobytes())
+      file.write(table.tobytes())
+    os.replace(temporary, path)
+
+  @staticmethod
+  def load(path: str | None=None, games: int | None=None) -> "TttQLearning":
+    # A learner with the table saved at "path", which must have been trained
+    # with this code's hyperparameters (and on "games" games, if given), else
+    # QTableFileError. The table is mapped copy-on-write: further training
+    # leaves the file as is.
+    path = path or cache_path(CACHE_NAME)
+    learner: TttQLearning = TttQLearning()
+    try:
+      size: int = os.path.getsize(path)
+    except OSError as error:
+      raise QTableFileError(f"No TTT Q-table: {path}") from error
+    if size != HEADER_DTYPE.itemsize + learner.q_table.nbytes:
+      raise QTableFileError(f"Not a version {VERSION} TTT Q-table: {path}")
+    header: np.ndarray = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if header["magic"][0] != MAGIC or header["version"][0] != VERSION or header["count"][0] != STATE_COUNT:
+      raise QTableFileError(f"Not a version {VERSION} TTT Q-table: {path}")
+    settings: tuple[float, float, float] = (learner.epsilon, learner.learning_rate, learner.gamma)
+    if (header["epsilon"][0], header["learning_rate"][0], header["gamma"][0]) != settings:
+      raise QTableFileError(f"TTT Q-table trained with other hyperparameters: {path}")
+    if games is not None and header["games"][0] != games:
+      raise QTableFileError(f"TTT Q-table trained on {header['games'][0]} games, not {games}: {path}")
+
+    table: np.ndarray = np.memmap(path, dtype="<f4", mode="c", offset=HEADER_DTYPE.itemsize, shape=learner.q_table.shape)
+    if zlib.crc32(table) != header["checksum"][0]:
+      raise QTableFileError(f"Corrupt TTT Q-table: {path}")
+    learner.q_table = np.asarray(table)  # Indexes faster than np.memmap
+    learner.games = int(header["games"][0])
+    return learner
+
+  def _apply_updates(self, entries: np.ndarray, counts: np.ndarray, targets: np.ndarray) -> None:
+    # "counts" updates of update_q_table() toward the same target, for every
+    # flat entry (state * 9 + move)
+    keeps: np.ndarray = (1.0 - self.learning_rate) ** counts
+    q_values: np.ndarray = self.q_table.reshape(-1)
+    q_values[entries] = keeps * q_values[entries] + (1.0 - keeps) * targets
+
+  @staticmethod
+  def _count_entries(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # The distinct keys, ascending, and how often each occurs
+    keys = np.sort(keys)
+    starts: np.ndarray = np.empty(len(keys), dtype=bool)
+    starts[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=starts[1:])
+    first: np.ndarray = np.flatnonzero(starts)
+    return keys[first], np.diff(first, append=len(keys))
+
+  @staticmethod
+  def _row_max(rows: np.ndarray) -> np.ndarray:
+    # Column by column: faster than max(axis=1) over 9-wide rows
+    result: np.ndarray = rows[:, 0].copy()
+    for column in range(1, rows.shape[1]):
+      np.maximum(result, rows[:, column], out=result)
+    return result
 
-  
   def train_one_game(self) -> None:
-    board: TttBoard = TttBoard()
-    while True:
-      color: Color = board.expected_next_move_color
-      move: int = self.select_move(board)
+    # Played on state indices, through the TTT tables
+    next_states: np.ndarray = self.tables.next_state
+    winner: np.ndarray = self.tables.winner
+    terminal: np.ndarray = self.tables.terminal
 
-      state_before = board.state()
-      board.make_move(color, move)
+    state: int = 0
+    while True:
+      move: int = self.select_move(state)
+      next_state: int = int(next_states[state, move])
 
-      if board.is_winning(color):
-        self.update_q_table(state_before, board, move, REWARD_WIN, True)
+      if winner[next_state] != Color.NONE.value:
+        self.update_q_table(state, next_state, move, REWARD_WIN, True)
         break
-      elif board.is_tie():
-        self.update_q_table(state_before, board, move, REWARD_TIE, True)
+      elif terminal[next_state]:
+        self.update_q_table(state, next_state, move, REWARD_TIE, True)
         break
       else:
-        self.update_q_table(state_before, board, move, REWARD_CONTINUE, False)
+        self.update_q_table(state, next_state, move, REWARD_CONTINUE, False)
+      state = next_state
+    self.games += 1
 
   def update_q_table(
     self,
-    state: TttBoardState,
-    board_after: TttBoard,
+    state: int,
+    next_state: int,
     action: int,
     reward: float,
     terminal: bool
   ) -> None:
-    key: QKey = (state, action)
-    next_state: TttBoardState = board_after.state()
-    old_q: float = self.q_table[key] if key in self.q_table else 0.0
+    old_q: float = float(self.q_table[state, action])
 
     if terminal:
       target: float = reward
     else:
-      next_q_max: float = float("-inf")
-      legal_moves: list[int] = board_after.legal_moves()
-
-      for a in legal_moves:
-        k: QKey = (next_state, a)
-        val: float = self.q_table[k] if k in self.q_table else 0.0
-        next_q_max = val if val > next_q_max else next_q_max
+      next_q_max: float = float(self.q_table[next_state].max())
 
       # alternate perspective
       target = reward + self.gamma * (-next_q_max)
 
-    self.q_table[key] = old_q + self.learning_rate * (target - old_q)
-
+    self.q_table[state, action] = old_q + self.learning_rate * (target - old_q)
 
-  def select_move(self, board: TttBoard) -> int:
-    legal_moves: list[int] = board.legal_moves()
-    assert len(legal_moves) > 0
 
+  def select_move(self, state: int) -> int:
     # Exploration
     if random.random() < self.epsilon:
-      return random.choice(legal_moves)
+      return random.choice(self.tables.legal_moves[state])
     
     # Exploitation
-    best_score: float = -1
-    best_move: int = legal_moves[0]
-
-    # TODO: By picking the first legal move if there are no previous table entries,
-    # we are under-exploring the state-space
-    for move in legal_moves:
-      key: QKey = (board.state(), move)
-      score: float = 0.0
-      if key in self.q_table:
-        score = self.q_table[key]
-
-      if score > best_score:
-        best_score = score
-        best_move = move
-
-    return best_move
+    return self._greedy_move(state)
   
   def best_move(self, board: TttBoard) -> int:
-    q_max: float = float("-inf")
-    best_move: int = -100
-    state: TttBoardState = board.state()
-
-    legal_moves: list[int] = board.legal_moves()
-    assert len(legal_moves) > 0
-
-    for a in legal_moves:
-      k: QKey = (state, a)
-      val: float = self.q_table[k] if k in self.q_table else 0.0
-      if val > q_max:
-        q_max = val
-        best_move = a
-
-    if best_move == -100:
-      return random.choice(legal_moves)
+    assert not self.tables.terminal[board.index]
+    return self._greedy_move(board.index)
 
-    return best_move
+  def _greedy_move(self, state: int) -> int:
+    # Best legal move; ties go to the lowest cell
+    return int(self.q_table[state].argmax())
 
+def _train_shared_worker(
+    memory_name: str,
+    games: int,
+    settings: tuple[float, float, float],
+    parallel_games: int,
+    sync_games: int,
+    seed: np.random.SeedSequence,
+    finished: Synchronized) -> None:
+  memory: shared_memory.SharedMemory = shared_memory.SharedMemory(name=memory_name)
+  try:
+    learner: TttQLearning = TttQLearning()
+    learner.epsilon, learner.learning_rate, learner.gamma = settings
+    learner.q_table = np.ndarray(learner.q_table.shape, dtype=learner.q_table.dtype, buffer=memory.buf)
+    rng: np.random.Generator = np.random.default_rng(seed)
+    while games > 0:
+      chunk: int = min(sync_games, games)
+      learner.train_lock_step(chunk, parallel_games, rng, report_every=None)
+      games -= chunk
+      with finished.get_lock():
+        finished.value += chunk
+    del learner
+  finally:
+    memory.close()
 
 # learn: TttQLearning = TttQLearning()
 # learn.train_multiple_games()
@@ -0,0 +1,133 @@
+import os
+from functools import cached_property, lru_cache
+from typing import List
+import numpy as np
+from c4.c4_board import Color
+from c4.cache import cache_path
+from c4.ttt_board import LINES, STATE_COUNT
+
+# Tic-Tac-Toe as lookup tables over the base-3 state index (TttBoard.index),
+# so that playing a move, or a move in any number of games at once, is
+# integer indexing:
+#  - next_state[state, move]: the state after the side to move plays move,
+#    or -1 if the cell is taken
+#  - legal[state]: the empty cells, as TttBoard.legal_moves()
+#  - winner[state]: Color value of the side with three in a row, else 0
+#  - terminal[state]: won or full
+#  - to_move[state]: Color value of the side to move (O if the counts match)
+# All STATE_COUNT indices have entries, unreachable ones too, so no lookup
+# needs a reachability check. The tables are built on first use and cached
+# on disk (see c4.cache), and are read-only.
+
+VERSION: int = 1
+CACHE_NAME: str = f"ttt_tables_v{VERSION}.npz"
+
+_SHAPES: dict[str, tuple[tuple[int, ...], np.dtype]] = {
+  "next_state": ((STATE_COUNT, 9), np.dtype(np.int16)),
+  "legal": ((STATE_COUNT, 9), np.dtype(bool)),
+  "winner": ((STATE_COUNT,), np.dtype(np.int8)),
+  "terminal": ((STATE_COUNT,), np.dtype(bool)),
+  "to_move": ((STATE_COUNT,), np.dtype(np.int8)),
+}
+
+class TttTables:
+  def __init__(self, next_state: np.ndarray, legal: np.ndarray, winner: np.ndarray, terminal: np.ndarray, to_move: np.ndarray):
+    self.next_state = next_state
+    self.legal = legal
+    self.winner = winner
+    self.terminal = terminal
+    self.to_move = to_move
+    for table in (next_state, legal, winner, terminal, to_move):
+      table.setflags(write=False)
+
+  def play(self, states: np.ndarray | int, moves: np.ndarray | int) -> np.ndarray:
+    # Next states (-1 for illegal moves), for one game or many
+    return self.next_state[states, moves]
+
+  @cached_property
+  def legal_moves(self) -> List[List[int]]:
+    # legal as lists of moves, for picking one at random
+    return [np.flatnonzero(row).tolist() for row in self.legal]
+
+  @cached_property
+  def reachable_states(self) -> np.ndarray:
+    # The non-terminal states that play from the empty board can reach
+    reached: np.ndarray = np.zeros(STATE_COUNT, dtype=bool)
+    reached[0] = True
+    frontier: np.ndarray = np.array([0])
+    while len(frontier) > 0:
+      following: np.ndarray = np.unique(self.next_state[frontier][self.legal[frontier]].astype(np.intp))
+      following = following[~reached[following]]
+      reached[following] = True
+      frontier = following[~self.terminal[following]]
+    return np.flatnonzero(reached & ~self.terminal)
+
+  @staticmethod
+  def build() -> "TttTables":
+    states: np.ndarray = np.arange(STATE_COUNT)
+    powers: np.ndarray = 3 ** np.arange(9)
+    digits: np.ndarray = (states[:, None] // powers) % 3  # 0 empty, 1 O, 2 X
+
+    o_count: np.ndarray = (digits == 1).sum(axis=1)
+    x_count: np.ndarray = (digits == 2).sum(axis=1)
+    o_to_move: np.ndarray = o_count == x_count
+    to_move: np.ndarray = np.where(o_to_move, Color.O.value, Color.X.value)
+
+    legal: np.ndarray = digits == 0
+    mover_digits: np.ndarray = np.where(o_to_move, 1, 2)
+    next_state: np.ndarray = np.where(legal, states[:, None] + mover_digits[:, None] * powers, -1)
+
+    winner: np.ndarray = np.zeros(STATE_COUNT, dtype=int)
+    for digit, color in ((2, Color.X), (1, Color.O)):  # O wins if both do
+      for line in LINES:
+        winner[(digits[:, list(line)] == digit).all(axis=1)] = color.value
+    terminal: np.ndarray = (winner != 0) | ~legal.any(axis=1)
+
+    return TttTables(
+      next_state.astype(np.int16),
+      legal,
+      winner.astype(np.int8),
+      terminal,
+      to_move.astype(np.int8),
+    )
+
+  @staticmethod
+  def load(path: str) -> "TttTables":
+    with np.load(path) as arrays:
+      if int(arrays["version"]) != VERSION:
+        raise Exception(f"Not version {VERSION} TTT tables: {path}")
+      tables: dict[str, np.ndarray] = {}
+      for name, (shape, dtype) in _SHAPES.items():
+        if arrays[name].shape != shape or arrays[name].dtype != dtype:
+          raise Exception(f"Bad {name} table in {path}")
+        tables[name] = arrays[name]
+    return TttTables(**tables)
+
+  def save(self, path: str) -> None:
+    # Written next to the target and then renamed, so that readers never see
+    # a partial file
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary: str = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+      np.savez(
+        file, version=np.array(VERSION),
+        **{name: getattr(self, name) for name in _SHAPES})
+    os.replace(temporary, path)
+
+def ttt_tables(path: str | None=None) -> TttTables:
+  # The tables from "path", by default CACHE_NAME in the cache directory
+  return load_ttt_tables(path or cache_path(CACHE_NAME))
+
+@lru_cache(maxsize=None)
+def load_ttt_tables(path: str) -> TttTables:
+  # The tables from the cache file, which is (re)built if it is missing or
+  # unreadable
+  try:
+    return TttTables.load(path)
+  except Exception:
+    tables: TttTables = TttTables.build()
+    try:
+      tables.save(path)
+    except OSError:
+      pass  # E.g. a read-only home directory: just don't cache
+    return tables
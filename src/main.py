@@ -5,13 +5,25 @@
 
 from c4.ttt_game import TttGame
 from c4.ttt_board import Color
-from c4.ttt_q_learning import TttQLearning
+from c4.ttt_q_learning import QTableFileError, TttQLearning
+
+TRAINING_GAMES: int = 2_500_000
 
 # game: C4Game = C4Game()
 # opponent: TttOptimalPlayer = TttOptimalPlayer()
 # opponent = player1 = DQN.load(model_path)
-opponent: TttQLearning = TttQLearning()
-opponent.train_multiple_games(2_500_000)
+# Trained once, then loaded from the saved table (in $C4_CACHE_DIR, see
+# c4.cache). A missing, corrupt or outdated table is trained again.
+opponent: TttQLearning
+try:
+  opponent = TttQLearning.load(games=TRAINING_GAMES)
+except QTableFileError:
+  opponent = TttQLearning()
+  opponent.train_lock_step(TRAINING_GAMES)
+  try:
+    opponent.save()
+  except OSError:
+    pass  # E.g. a read-only home directory: just don't cache
 
 while True:
   game: TttGame = TttGame(opponent)
@@ -0,0 +1,86 @@
+import random
+import numpy as np
+import pytest
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv, VecMonitor
+from c4.batched_opponent_vec_env import BatchedOpponentVecEnv
+from c4.c4_board import Color
+from c4.c4_env import ConnectFourEnv
+from c4.ttt_2_play_env import Ttt2PlayEnv
+
+class _CountingOpponent:
+  # Deterministic stand-in for a model: plays the first empty cell (TTT) or
+  # the leftmost non-full column (C4), and counts its predict() calls
+  def __init__(self):
+    self.calls: int = 0
+
+  def predict(self, observation: np.ndarray, deterministic: bool=False):
+    self.calls += 1
+    batch: np.ndarray = observation.reshape(-1, *observation.shape[-2:])
+    if batch.shape[1:] == (3, 3):
+      actions: np.ndarray = np.argmax(batch.reshape(len(batch), -1) == 0, axis=1)
+    else:
+      actions = np.argmax(batch[:, 0, :] == 0, axis=1)
+    return (actions if observation.ndim == 3 else actions[0]), None
+
+def _compare(make_env, count: int, steps: int) -> None:
+  # make_env(opponent) builds an env; the brokered envs share one opponent
+  rng = random.Random(11)
+  reference: DummyVecEnv = DummyVecEnv([lambda: make_env(_CountingOpponent()) for _ in range(count)])
+  opponent: _CountingOpponent = _CountingOpponent()
+  brokered: BatchedOpponentVecEnv = BatchedOpponentVecEnv([lambda: make_env(opponent) for _ in range(count)])
+  assert brokered.opponent is opponent
+
+  assert (reference.reset() == brokered.reset()).all()
+  assert opponent.calls <= 1
+
+  for _ in range(steps):
+    actions: np.ndarray = np.array([rng.randrange(reference.action_space.n) for _ in range(count)])
+    calls: int = opponent.calls
+    obs, rewards, dones, infos = reference.step(actions)
+    brokered_obs, brokered_rewards, brokered_dones, brokered_infos = brokered.step(actions)
+
+    assert (obs == brokered_obs).all()
+    assert (rewards == brokered_rewards).all()
+    assert (dones == brokered_dones).all()
+    for info, brokered_info in zip(infos, brokered_infos):
+      assert info.keys() == brokered_info.keys()
+      if "terminal_observation" in info:
+        assert (info["terminal_observation"] == brokered_info["terminal_observation"]).all()
+    # The in-place observations stay in sync with the boards
+    for env_idx in range(count):
+      game = brokered.envs[env_idx].unwrapped
+      assert (brokered_obs[env_idx] == game.obs(game.board)).all()
+    # One batch of replies, plus at most one of opening moves
+    assert opponent.calls - calls <= 2
+
+def test_connect_four_matches_dummy_vec_env():
+  for color in (Color.O, Color.X):
+    _compare(lambda opponent: ConnectFourEnv(opponent, color), 8, 100)
+
+def test_ttt_matches_dummy_vec_env():
+  for color in (Color.O, Color.X):
+    _compare(lambda opponent: Ttt2PlayEnv(opponent, color), 8, 100)
+
+def test_opponents_and_wrappers():
+  # One opponent for all the envs: the one passed in, else the envs' shared one
+  first: _CountingOpponent = _CountingOpponent()
+  passed: _CountingOpponent = _CountingOpponent()
+  vec_env: BatchedOpponentVecEnv = BatchedOpponentVecEnv(
+    [lambda: Ttt2PlayEnv(_CountingOpponent(), Color.X) for _ in range(2)], opponent=passed)
+  vec_env.reset()
+  assert vec_env.opponent is passed and passed.calls == 1
+  with pytest.raises(Exception, match="different opponents"):
+    BatchedOpponentVecEnv([lambda: Ttt2PlayEnv(_CountingOpponent(), Color.X) for _ in range(2)])
+  BatchedOpponentVecEnv([lambda: Ttt2PlayEnv(first, Color.X) for _ in range(2)])
+
+  # Wrappers would miss the steps; VecMonitor around the vector env sees them
+  with pytest.raises(Exception, match="wrapped"):
+    BatchedOpponentVecEnv([lambda: Monitor(Ttt2PlayEnv(first, Color.X)) for _ in range(2)])
+  monitored: VecMonitor = VecMonitor(BatchedOpponentVecEnv([lambda: Ttt2PlayEnv(first, Color.O) for _ in range(2)]))
+  monitored.reset()
+  episodes: int = 0
+  for _ in range(20):
+    _, _, _, infos = monitored.step(np.array([8, 8]))
+    episodes += sum("episode" in info for info in infos)
+  assert episodes > 0
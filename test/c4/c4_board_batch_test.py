@@ -0,0 +1,76 @@
+import random
+import numpy as np
+import pytest
+from c4.c4_board import C4Board, Color
+from c4.c4_board_batch import C4BoardBatch
+
+def test_batch_matches_board_on_random_games():
+  rng = random.Random(42)
+  count: int = 32
+  batch: C4BoardBatch = C4BoardBatch(count)
+  boards: list[C4Board] = [C4Board() for _ in range(count)]
+
+  for _ in range(500):
+    actions: list[int] = [rng.choice(board.legal_moves()) for board in boards]
+    for board, action in zip(boards, actions):
+      board.make_move(board.expected_next_move_color, action)
+    rows: np.ndarray = batch.make_moves(np.array(actions))
+
+    winners: np.ndarray = batch.winners()
+    ties: np.ndarray = batch.ties()
+    # Finished games restart below, so any win came from the move just made
+    wins: np.ndarray = batch.wins_at(np.arange(count), rows, np.array(actions))
+    assert wins.tolist() == (winners != Color.NONE.value).tolist()
+    for ii, board in enumerate(boards):
+      assert (batch.boards[ii] == board.board).all()
+      assert batch.legal_mask()[ii].tolist() == board.action_mask().tolist()
+      expected_winner: int = Color.NONE.value
+      if board.is_winning(Color.O):
+        expected_winner = Color.O.value
+      elif board.is_winning(Color.X):
+        expected_winner = Color.X.value
+      assert winners[ii] == expected_winner
+      assert ties[ii] == board.is_tie()
+
+    # Restart finished games on both sides
+    done: np.ndarray = np.flatnonzero((winners != Color.NONE.value) | ties)
+    batch.reset(done)
+    for ii in done:
+      boards[ii] = C4Board()
+
+def test_make_moves_on_subset():
+  batch: C4BoardBatch = C4BoardBatch(3)
+  batch.make_moves(np.array([3]), np.array([1]))
+
+  assert batch.move_counts.tolist() == [0, 1, 0]
+  assert batch.turns.tolist() == [Color.O.value, Color.X.value, Color.O.value]
+  assert batch.get_board(1).to_string().splitlines()[-1] == ". . . O . . ."
+
+def test_make_moves_illegal():
+  batch: C4BoardBatch = C4BoardBatch(1)
+  for _ in range(6):
+    batch.make_moves(np.array([0]))
+
+  assert batch.legal_mask()[0].tolist() == [False] + [True] * 6
+  with pytest.raises(Exception, match="Illegal"):
+    batch.make_moves(np.array([0]))
+
+def test_make_moves_duplicate_indices():
+  batch: C4BoardBatch = C4BoardBatch(2)
+  with pytest.raises(Exception, match="one move per board"):
+    batch.make_moves(np.array([3, 4]), np.array([0, 0]))
+
+  assert batch.move_counts.tolist() == [0, 0]
+
+def test_winners_connect_three():
+  batch: C4BoardBatch = C4BoardBatch(2, rows=5, columns=4, winning_length=3)
+  batch.make_moves(np.array([0, 0]))
+  batch.make_moves(np.array([3, 1]))
+  batch.make_moves(np.array([0, 0]))
+  batch.make_moves(np.array([3, 1]))
+  assert batch.winners().tolist() == [Color.NONE.value, Color.NONE.value]
+
+  rows: np.ndarray = batch.make_moves(np.array([0, 2]))
+  assert batch.winners().tolist() == [Color.O.value, Color.NONE.value]
+  assert batch.wins_at(np.arange(2), rows, np.array([0, 2])).tolist() == [True, False]
+  assert batch.get_board(0).is_winning(Color.O)
@@ -1,3 +1,4 @@
+import random
 from c4.c4_board import C4Board, Color
 
 def test_board_legal_moves():
@@ -176,3 +177,221 @@ def test_needs_blocking_multiple():
   assert board.failing_to_block_column(5, Color.X) == False
   assert board.failing_to_block_column(6, Color.X) == False
   
+
+def _is_winning_by_scan(board: C4Board, color: Color) -> bool:
+  cells = board.board
+  length: int = board.winning_length
+  for row in range(board.rows):
+    for col in range(board.columns):
+      for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        end_row: int = row + (length - 1) * d_row
+        end_col: int = col + (length - 1) * d_col
+        if end_row >= board.rows or end_col < 0 or end_col >= board.columns:
+          continue
+        if all(cells[row + ii * d_row, col + ii * d_col] == color.value for ii in range(length)):
+          return True
+  return False
+
+def test_bitboard_matches_scan_on_random_games():
+  rng = random.Random(1234)
+  for _ in range(200):
+    board: C4Board = C4Board()
+    while True:
+      color: Color = board.expected_next_move_color
+      board.make_move(color, rng.choice(board.legal_moves()))
+      for c in (Color.O, Color.X):
+        assert board.is_winning(c) == _is_winning_by_scan(board, c)
+      if board.is_winning(color) or board.is_tie():
+        break
+
+def test_copy_is_independent():
+  board: C4Board = C4Board()
+  board.make_move(Color.O, 3)
+  copy: C4Board = board.copy()
+  copy.make_move(Color.X, 3)
+
+  assert board.board[4, 3] == Color.NONE.value
+  assert copy.board[4, 3] == Color.X.value
+  assert board.legal_moves() == copy.legal_moves()
+  assert board.heights[3] == 1 and copy.heights[3] == 2
+
+def test_wins_at_last_move_matches_is_winning():
+  rng = random.Random(99)
+  for _ in range(200):
+    board: C4Board = C4Board()
+    while True:
+      color: Color = board.expected_next_move_color
+      board.make_move(color, rng.choice(board.legal_moves()))
+      assert board.wins_at_last_move() == board.is_winning(color)
+      if board.is_winning(color) or board.is_tie():
+        break
+
+def test_wins_at_last_move_no_moves():
+  input: str = """
+. . . . . . .
+. . . . . . .
+. . . . . . .
+. . . . . . .
+O O O O . . .
+"""
+  assert not C4Board.from_string(input).wins_at_last_move()
+
+def test_action_mask_tracks_full_columns():
+  board: C4Board = C4Board()
+  mask = board.action_mask()
+  assert mask.tolist() == [True] * 7
+
+  for _ in range(6):
+    board.make_move(board.expected_next_move_color, 2)
+
+  # Same (read-only) array, updated in place
+  assert mask is board.action_mask()
+  assert mask.tolist() == [True, True, False, True, True, True, True]
+  assert not mask.flags.writeable
+  assert board.is_illegal(2) and board.is_illegal(-1) and board.is_illegal(7)
+  assert not board.is_illegal(3)
+
+  copy: C4Board = board.copy()
+  copy.make_move(copy.expected_next_move_color, 3)
+  assert copy.action_mask().tolist() == mask.tolist()
+
+def test_action_mask_from_string():
+  input: str = """
+. . . . X . .
+. . . . O . .
+. . . . X . .
+. . . . O . .
+. . . . X . .
+. . . . O . .
+"""
+  board: C4Board = C4Board.from_string(input)
+  assert board.action_mask().tolist() == [True, True, True, True, False, True, True]
+  assert board.legal_moves() == [0, 1, 2, 3, 5, 6]
+
+def test_zobrist_key_transpositions():
+  board1: C4Board = C4Board()
+  for move in [3, 2, 4, 2]:
+    board1.make_move(board1.expected_next_move_color, move)
+
+  board2: C4Board = C4Board()
+  for move in [4, 2, 3, 2]:
+    board2.make_move(board2.expected_next_move_color, move)
+
+  board3: C4Board = C4Board()
+  for move in [3, 2, 2, 4]:
+    board3.make_move(board3.expected_next_move_color, move)
+
+  assert board1.key() == board2.key()
+  assert board1.key() != board3.key()
+  assert board1.key() == C4Board.from_string(board1.to_string()).key()
+  assert board1.copy().key() == board1.key()
+
+def test_zobrist_key_side_to_move():
+  board: C4Board = C4Board()
+  board.make_move(Color.O, 3)
+
+  assert board.key() != board.key(side_to_move=True)
+  board.make_move(Color.X, 3)
+  assert board.key() == board.key(side_to_move=True)
+
+def test_unmake_move_restores_state():
+  rng: random.Random = random.Random(3)
+  board: C4Board = C4Board()
+  snapshots = []
+  while not board.is_tie() and not board.wins_at_last_move():
+    snapshots.append((board.to_string(), board.key(), board.heights.copy(), board.action_mask().copy(), board.last_cell, board.expected_next_move_color))
+    board.make_move(board.expected_next_move_color, rng.choice(board.legal_moves()))
+
+  while snapshots:
+    board.unmake_move()
+    string, key, heights, mask, last_cell, color = snapshots.pop()
+    assert board.to_string() == string
+    assert board.key() == key
+    assert board.heights == heights
+    assert (board.action_mask() == mask).all()
+    assert board.last_cell == last_cell
+    assert board.expected_next_move_color == color
+
+  assert board.move_count == 0
+
+def test_unmake_move_without_history():
+  board: C4Board = C4Board()
+  try:
+    board.unmake_move()
+    assert False
+  except Exception:
+    pass
+
+def _threats_by_scan(board: C4Board, color: Color) -> int:
+  threats: int = 0
+  for move in board.legal_moves():
+    for height in range(board.heights[move], board.rows):
+      cell: int = move * board.stride + height
+      bits: int = board.bits(color) | (1 << cell)
+      if any(bits & line == line for line in board.geometry.cell_lines[cell]):
+        threats |= 1 << cell
+  return threats
+
+def test_threats_match_scan_on_random_games():
+  rng = random.Random(99)
+  for _ in range(30):
+    board: C4Board = C4Board()
+    while not board.wins_at_last_move() and not board.is_tie():
+      for color in (Color.O, Color.X):
+        assert board.threats(color) == _threats_by_scan(board, color)
+      board.make_move(board.expected_next_move_color, rng.choice(board.legal_moves()))
+
+    rebuilt: C4Board = C4Board.from_string(board.to_string())
+    while board.move_count > 0:
+      board.unmake_move()
+      for color in (Color.O, Color.X):
+        assert board.threats(color) == _threats_by_scan(board, color)
+    assert rebuilt.o_threats == _threats_by_scan(rebuilt, Color.O)
+
+def test_failing_to_block_horizontal_and_missed_win():
+  input: str = """
+. . . . . . .
+. . . . . . .
+. . . . X . .
+. . . . X . .
+. O O O X . .
+"""
+
+  board: C4Board = C4Board.from_string(input)
+  assert board.winning_columns(Color.O) == [0]
+  assert board.winning_columns(Color.X) == [4]
+  assert board.failing_to_block_column(6, Color.X) == True
+  assert board.failing_to_block_column(0, Color.X) == False
+  assert board.missed_win(0, Color.X) == True
+  assert board.missed_win(4, Color.X) == False
+
+def test_other_geometries_match_scan():
+  rng = random.Random(5)
+  for rows, columns, length in [(4, 5, 3), (5, 4, 4), (10, 12, 5), (3, 3, 3)]:
+    for _ in range(20):
+      board: C4Board = C4Board(rows, columns, length)
+      while True:
+        color: Color = board.expected_next_move_color
+        board.make_move(color, rng.choice(board.legal_moves()))
+        assert board.wins_at_last_move() == _is_winning_by_scan(board, color)
+        assert board.is_winning(color) == _is_winning_by_scan(board, color)
+        assert board.threats(color) == _threats_by_scan(board, color)
+        if board.wins_at_last_move() or board.is_tie():
+          break
+
+def test_geometry_is_shared_and_centre_first():
+  assert C4Board(5, 4, 3).geometry is C4Board(5, 4, 3).geometry
+  assert C4Board(5, 4, 3).geometry is not C4Board(5, 4, 4).geometry
+  assert C4Board().geometry.move_order == [3, 2, 4, 1, 5, 0, 6]
+  assert C4Board(4, 4).geometry.move_order[:2] == [1, 2]
+
+def test_needs_blocking_follows_winning_length():
+  input: str = """
+. . . . .
+. . . . .
+. . . O .
+. . . O .
+"""
+
+  assert C4Board.from_string(input, winning_length=3).needs_blocking(3, Color.X) == True
+  assert C4Board.from_string(input).needs_blocking(3, Color.X) == False
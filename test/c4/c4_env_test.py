@@ -1,5 +1,30 @@
 import numpy as np
+from c4.c4_board import Color
 from c4.c4_env import ConnectFourEnv
+from c4.ttt_1_play_env import Ttt1PlayEnv
+from c4.ttt_2_play_env import Ttt2PlayEnv
+
+class FirstLegalOpponent:
+    # Plays the first legal move: for SB3-style predict() and for Ttt1PlayEnv
+    def predict(self, observation: np.ndarray, deterministic: bool=False):
+        if observation.shape == (3, 3):
+            return int(np.flatnonzero(observation.reshape(-1) == 0)[0]), None
+        return int(np.flatnonzero(observation[0] == 0)[0]), None
+
+    def get_optimal_move_for_X(self, board) -> int:
+        return board.legal_moves()[0]
+
+def test_returned_observations_are_not_overwritten():
+    for env in (ConnectFourEnv(FirstLegalOpponent(), Color.O), Ttt1PlayEnv(FirstLegalOpponent(), Color.O), Ttt2PlayEnv(FirstLegalOpponent(), Color.X)):
+        obs, info = env.reset()
+        kept: list[tuple[np.ndarray, np.ndarray]] = [(obs, obs.copy())]
+        done: bool = False
+        while not done:
+            obs, _, done, _, info = env.step(int(np.flatnonzero(info["action_mask"])[-1]))
+            kept.append((obs, obs.copy()))
+        for obs, snapshot in kept:
+            assert (obs == snapshot).all()
+        assert not (kept[0][0] == kept[-1][0]).all()
 
 if __name__ == "__main__":
     env = ConnectFourEnv()
@@ -0,0 +1,56 @@
+import numpy as np
+from c4.c4_board import C4Board, Color
+from c4.c4_env import ConnectFourEnv
+from c4.c4_mcts_player import C4MctsOpponent, C4MctsPlayer
+
+def _board(moves: str) -> C4Board:
+  board: C4Board = C4Board()
+  for move in moves:
+    board.make_move(board.expected_next_move_color, int(move))
+  return board
+
+def test_takes_win_and_blocks():
+  player: C4MctsPlayer = C4MctsPlayer(iterations=1000, seed=1)
+  assert player.get_optimal_move(_board("010101")) == 0
+  assert player.get_optimal_move(_board("01010")) == 0
+
+def test_tree_reuse():
+  player: C4MctsPlayer = C4MctsPlayer(iterations=500, seed=2)
+  board: C4Board = _board("33")
+  player.search(board)
+  size: int = len(player.tree)
+
+  # After our move and the reply, the matching grandchild becomes the root
+  move: int = player.get_optimal_move(board)
+  board.make_move(board.expected_next_move_color, move)
+  board.make_move(board.expected_next_move_color, 2)
+  player._set_root(board)
+  reused_visits: int = player.tree.visits[0]
+  assert reused_visits > 0
+  assert len(player.tree) < size
+
+  visits: np.ndarray = player.search(board)
+  assert visits.sum() == reused_visits + 500 - 1
+
+def test_unrelated_position_rebuilds_tree():
+  player: C4MctsPlayer = C4MctsPlayer(iterations=200, seed=3)
+  player.search(_board("33"))
+  player._set_root(_board("0011"))
+  assert len(player.tree) == 1
+
+def test_board_from_obs():
+  board: C4Board = _board("3324")
+  rebuilt: C4Board = C4MctsOpponent.board_from_obs(ConnectFourEnv.obs(board))
+  assert rebuilt.to_string() == board.to_string()
+  assert rebuilt.key() == board.key()
+  assert rebuilt.move_count == 4
+  assert rebuilt.expected_next_move_color == Color.O
+
+def test_opponent_in_env():
+  opponent: C4MctsOpponent = C4MctsOpponent(C4MctsPlayer(iterations=50, seed=4))
+  env: ConnectFourEnv = ConnectFourEnv(opponent, Color.X)
+  env.reset()
+  done: bool = False
+  while not done:
+    _, _, done, _, info = env.step(int(np.flatnonzero(env.board.action_mask())[0]))
+  assert "illegal_move_by_Color.O" not in info
@@ -0,0 +1,52 @@
+import os
+import pytest
+from c4.c4_board import C4Board
+from c4.c4_opening_book import C4OpeningBook
+from c4.c4_optimal_player import C4OptimalPlayer
+
+def _board(moves: str) -> C4Board:
+  board: C4Board = C4Board(rows=4, columns=4)
+  for move in moves:
+    board.make_move(board.expected_next_move_color, int(move))
+  return board
+
+def test_generate_and_lookup(tmp_path):
+  path: str = os.path.join(tmp_path, "book.bin")
+  count: int = C4OpeningBook.generate(path, 2, rows=4, columns=4)
+
+  book: C4OpeningBook = C4OpeningBook(path)
+  assert len(book) == count
+  assert (book.rows, book.columns, book.winning_length, book.max_ply) == (4, 4, 4, 2)
+  assert count == 1 + 4 + 16
+
+  solver: C4OptimalPlayer = C4OptimalPlayer(rows=4, columns=4)
+  for moves in ["", "2", "21", "01", "10", "33"]:
+    board: C4Board = _board(moves)
+    entry = book.lookup(board)
+    assert entry is not None
+    assert entry[1] == solver.score(board)
+
+  # Deeper or differently sized boards miss
+  assert book.lookup(_board("012")) is None
+  assert book.lookup(C4Board()) is None
+  assert book.lookup(C4Board(rows=4, columns=4, winning_length=3)) is None
+
+def test_rejects_other_geometries(tmp_path):
+  path: str = os.path.join(tmp_path, "book.bin")
+  C4OpeningBook.generate(path, 1, rows=4, columns=4)
+  C4OpeningBook(path, rows=4, columns=4, winning_length=4)
+  for geometry in ({"rows": 6}, {"columns": 7}, {"winning_length": 3}):
+    with pytest.raises(Exception, match=list(geometry)[0]):
+      C4OpeningBook(path, **geometry)
+  with pytest.raises(Exception, match="Opening book"):
+    C4OptimalPlayer(book=C4OpeningBook(path))
+
+def test_solver_uses_book(tmp_path):
+  path: str = os.path.join(tmp_path, "book.bin")
+  C4OpeningBook.generate(path, 2, rows=4, columns=4)
+
+  solver: C4OptimalPlayer = C4OptimalPlayer(rows=4, columns=4, book=C4OpeningBook(path))
+  board: C4Board = _board("2")
+  solver.score(board)
+  solver.get_optimal_move(board)
+  assert solver.node_count == 0
@@ -0,0 +1,87 @@
+import random
+from c4.c4_board import C4Board, Color
+from c4.c4_optimal_player import C4OptimalPlayer
+
+def _board(moves: str, rows: int=6, columns: int=7) -> C4Board:
+  board: C4Board = C4Board(rows=rows, columns=columns)
+  for move in moves:
+    board.make_move(board.expected_next_move_color, int(move))
+  return board
+
+def _score_by_minimax(board: C4Board) -> int:
+  cells: int = board.rows * board.columns
+  best: int = -cells
+  for move in board.legal_moves():
+    child: C4Board = board.copy()
+    child.make_move(child.expected_next_move_color, move)
+    if child.wins_at_last_move():
+      score: int = (cells + 1 - board.move_count) // 2
+    elif child.is_tie():
+      score = 0
+    else:
+      score = -_score_by_minimax(child)
+    best = max(best, score)
+  return best
+
+def test_immediate_win_and_block():
+  player: C4OptimalPlayer = C4OptimalPlayer()
+
+  # O has three in column 0 and wins at once
+  board: C4Board = _board("010101")
+  assert player.get_optimal_move(board) == 0
+  assert player.score(board) == (42 + 1 - 6) // 2
+  assert player.solve(board) == (0, (42 + 1 - 6) // 2)
+
+  # X has to block column 0 - the only move which does not lose at once
+  board = _board("01010")
+  assert player.get_optimal_move(board) == 0
+
+def test_matches_minimax_near_end_of_game():
+  rng = random.Random(7)
+  player: C4OptimalPlayer = C4OptimalPlayer()
+  checked: int = 0
+  while checked < 10:
+    board: C4Board = C4Board()
+    for _ in range(33):
+      board.make_move(board.expected_next_move_color, rng.choice(board.legal_moves()))
+      if board.wins_at_last_move():
+        break
+    if board.wins_at_last_move():
+      continue
+
+    expected: int = _score_by_minimax(board)
+    assert player.score(board) == expected
+
+    # The chosen move must achieve the position's score
+    move: int = player.get_optimal_move(board)
+    child: C4Board = board.copy()
+    child.make_move(child.expected_next_move_color, move)
+    if child.wins_at_last_move():
+      assert expected == (42 + 1 - board.move_count) // 2
+    else:
+      assert -_score_by_minimax(child) == expected
+    assert player.solve(board) == (move, expected)
+    checked += 1
+
+def test_mid_game_position():
+  assert C4OptimalPlayer().score(_board("52056346446301462513")) == -11
+
+def test_small_board():
+  # Smaller boards use the same solver
+  player: C4OptimalPlayer = C4OptimalPlayer(rows=4, columns=5)
+  board: C4Board = _board("2213314004", rows=4, columns=5)
+  assert not board.is_winning(Color.O) and not board.is_winning(Color.X)
+  assert player.score(board) == _score_by_minimax(board)
+
+def test_solve_when_no_search_is_needed():
+  player: C4OptimalPlayer = C4OptimalPlayer(rows=4, columns=5)
+
+  # Every move lets the opponent win next
+  board: C4Board = _board("031331242030142", rows=4, columns=5)
+  assert player.solve(board) == (2, -2)
+  assert player.score(board) == _score_by_minimax(board) == -2
+
+  # The last move draws
+  board = _board("3341211320301442042", rows=4, columns=5)
+  assert player.solve(board) == (0, 0)
+  assert player.score(board) == 0
@@ -0,0 +1,36 @@
+import multiprocessing
+import numpy as np
+from stable_baselines3 import DQN
+from c4.c4_board import C4Board, Color
+from c4.c4_env import ConnectFourEnv
+from c4.c4_parallel_mcts import C4LeafBatchedMctsPlayer, C4RootParallelMctsPlayer
+
+def _board(moves: str) -> C4Board:
+  board: C4Board = C4Board()
+  for move in moves:
+    board.make_move(board.expected_next_move_color, int(move))
+  return board
+
+def test_root_parallel_merges_visits():
+  with C4RootParallelMctsPlayer(workers=2, iterations=300) as player:
+    visits: np.ndarray = player.search(_board("010101"))
+    assert int(np.argmax(visits)) == 0
+    assert visits.sum() == 2 * (300 - 1)
+    assert player.playouts == 600
+  assert player.pool is None
+
+def test_root_parallel_defaults_to_one_worker_per_core(monkeypatch):
+  monkeypatch.setattr(multiprocessing, "cpu_count", lambda: 3)
+  assert C4RootParallelMctsPlayer().workers == 3
+  assert C4RootParallelMctsPlayer(workers=1).workers == 1
+
+def test_leaf_batched_search():
+  policy: DQN = DQN("MlpPolicy", ConnectFourEnv(None, Color.O), seed=0)
+  player: C4LeafBatchedMctsPlayer = C4LeafBatchedMctsPlayer(policy, batch_size=16, iterations=320, seed=0)
+  visits: np.ndarray = player.search(_board("33"))
+
+  # Every playout is accounted for, and virtual losses are all undone. The
+  # whole first batch stops at the root, as it is not expanded yet.
+  assert player.playouts == 320
+  assert player.tree.visits[0] == 320
+  assert visits.sum() == 320 - 16
@@ -0,0 +1,51 @@
+import random
+import numpy as np
+from c4.c4_board import Color
+from c4.c4_env import ConnectFourEnv
+from c4.c4_vec_env import ConnectFourVecEnv
+
+class _LeftmostOpponent:
+  # Deterministic stand-in for a model: plays the leftmost non-full column
+  def predict(self, observation: np.ndarray, deterministic: bool=False):
+    batch: np.ndarray = observation.reshape(-1, *observation.shape[-2:])
+    actions: np.ndarray = np.argmax(batch[:, 0, :] == 0, axis=1)
+    return (actions if observation.ndim == 3 else actions[0]), None
+
+def test_matches_single_envs():
+  rng = random.Random(7)
+  count: int = 8
+  for agent_color in (Color.O, Color.X):
+    vec_env: ConnectFourVecEnv = ConnectFourVecEnv(count, _LeftmostOpponent(), agent_color)
+    envs: list[ConnectFourEnv] = [ConnectFourEnv(_LeftmostOpponent(), agent_color) for _ in range(count)]
+
+    obs: np.ndarray = vec_env.reset()
+    for ii, env in enumerate(envs):
+      assert (obs[ii] == env.reset()[0]).all()
+
+    for _ in range(200):
+      # Mostly legal moves, with the odd illegal one
+      actions: list[int] = [
+        rng.choice(env.board.legal_moves()) if rng.random() < 0.95 else env.board.columns
+        for env in envs
+      ]
+      obs, rewards, dones, infos = vec_env.step(np.array(actions))
+
+      for ii, env in enumerate(envs):
+        env_obs, env_reward, env_done, _, env_info = env.step(actions[ii])
+        assert rewards[ii] == env_reward
+        assert dones[ii] == env_done
+        if env_done:
+          assert (infos[ii]["terminal_observation"] == env_obs).all()
+          infos[ii].pop("terminal_observation")
+          env_obs, _ = env.reset()
+        assert (infos[ii].pop("action_mask") == env_info.pop("action_mask")).all()
+        assert infos[ii] == env_info
+        assert (obs[ii] == env_obs).all()
+
+def test_spaces_follow_board_size():
+  vec_env: ConnectFourVecEnv = ConnectFourVecEnv(3, _LeftmostOpponent(), Color.O, rows=5, columns=4, winning_length=3)
+  assert vec_env.observation_space.shape == (5, 4)
+  assert vec_env.action_space.n == 4
+  assert vec_env.reset().shape == (3, 5, 4)
+  assert vec_env.action_masks().shape == (3, 4)
+  assert len(vec_env.env_method("action_masks")) == 3
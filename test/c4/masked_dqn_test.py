@@ -0,0 +1,64 @@
+import os
+import numpy as np
+import torch
+from stable_baselines3 import DQN, PPO
+from c4.c4_board import Color
+from c4.c4_env import ConnectFourEnv
+from c4.masked_dqn import MaskedDQN, MaskedOpponent, MaskedQNetwork, legal_action_mask
+from c4.ttt_2_play_env import Ttt2PlayEnv
+
+def _random_boards(count: int, shape: tuple, seed: int) -> np.ndarray:
+  return np.random.default_rng(seed).integers(-1, 2, size=(count, *shape)).astype(np.float32)
+
+def _assert_legal(actions: np.ndarray, boards: np.ndarray, action_count: int) -> None:
+  mask: np.ndarray = legal_action_mask(boards, action_count)
+  for ii, action in enumerate(actions):
+    assert mask[ii, action] or not mask[ii].any()
+
+def test_legal_action_mask():
+  boards: np.ndarray = _random_boards(5, (6, 7), 0)
+  assert (legal_action_mask(boards, 7) == (boards[:, 0, :] == 0)).all()
+  assert (legal_action_mask(torch.as_tensor(boards), 7).numpy() == (boards[:, 0, :] == 0)).all()
+
+  ttt: np.ndarray = _random_boards(1, (3, 3), 1)[0]
+  assert (legal_action_mask(ttt, 9) == (ttt.reshape(-1) == 0)).all()
+
+def test_masked_dqn_only_picks_legal_moves(tmp_path):
+  env: Ttt2PlayEnv = Ttt2PlayEnv(None, Color.O)
+  model: MaskedDQN = MaskedDQN("MlpPolicy", env, seed=0)
+  assert isinstance(model.q_net, MaskedQNetwork)
+
+  boards: np.ndarray = _random_boards(200, (3, 3), 2)
+  for deterministic in (True, False):
+    model.exploration_rate = 0.5
+    _assert_legal(model.predict(boards, deterministic=deterministic)[0], boards, 9)
+
+  path: str = os.path.join(tmp_path, "masked")
+  model.save(path)
+  loaded: MaskedDQN = MaskedDQN.load(path)
+  assert isinstance(loaded.q_net, MaskedQNetwork)
+  _assert_legal(loaded.predict(boards, deterministic=True)[0], boards, 9)
+
+def test_masked_training_makes_no_illegal_moves():
+  opponent: MaskedOpponent = MaskedOpponent(DQN("MlpPolicy", Ttt2PlayEnv(None, Color.O), seed=1), seed=1)
+  env: Ttt2PlayEnv = Ttt2PlayEnv(opponent, Color.X)
+  model: MaskedDQN = MaskedDQN("MlpPolicy", env, learning_starts=100, seed=0)
+  model.learn(500)
+  assert env.move_count > 0
+  assert env.illegal_count == 0
+
+def test_masked_opponent():
+  boards: np.ndarray = _random_boards(200, (6, 7), 3)
+  dqn: MaskedOpponent = MaskedOpponent(DQN("MlpPolicy", ConnectFourEnv(None, Color.O), seed=0), seed=0)
+  ppo: MaskedOpponent = MaskedOpponent(PPO("MlpPolicy", ConnectFourEnv(None, Color.O), seed=0), seed=0)
+  for opponent in (dqn, ppo):
+    _assert_legal(opponent.predict(boards, deterministic=True)[0], boards, 7)
+    _assert_legal(opponent.predict(boards)[0], boards, 7)
+    assert np.asarray(opponent.predict(boards[0])[0]).shape == ()
+
+def test_env_action_masks():
+  env: Ttt2PlayEnv = Ttt2PlayEnv(None, Color.O)
+  _, info = env.reset()
+  assert info["action_mask"].all()
+  env.board.make_move(Color.O, 4)
+  assert env.action_masks().tolist() == [True] * 4 + [False] + [True] * 4
@@ -0,0 +1,55 @@
+import os
+import pickle
+import numpy as np
+from stable_baselines3 import DQN
+from stable_baselines3.common.vec_env import SubprocVecEnv
+from c4.c4_board import Color
+from c4.c4_env import ConnectFourEnv
+from c4.opponent_spec import LazyOpponent, ModelSpec, SolverSpec
+from c4.ttt_1_play_env import Ttt1PlayEnv
+from c4.ttt_optimal_player import TttOptimalPlayer
+
+def _save_model(tmp_path, name: str, seed: int) -> str:
+  model: DQN = DQN("MlpPolicy", ConnectFourEnv(None, Color.O), seed=seed)
+  path: str = os.path.join(tmp_path, name)
+  model.save(path)
+  return path
+
+def test_model_spec_is_loaded_lazily_and_pickled_as_spec(tmp_path):
+  env: ConnectFourEnv = ConnectFourEnv(ModelSpec(_save_model(tmp_path, "a", 0)), Color.X)
+  assert isinstance(env.opponent, LazyOpponent)
+  assert env.opponent._opponent is None
+
+  env.reset()  # The opening move for O loads the model
+  assert isinstance(env.opponent._opponent, DQN)
+
+  copy: ConnectFourEnv = pickle.loads(pickle.dumps(env))
+  assert copy.opponent._opponent is None
+  copy.reset()
+  assert isinstance(copy.opponent._opponent, DQN)
+
+def test_set_opponent_parameters(tmp_path):
+  env: ConnectFourEnv = ConnectFourEnv(ModelSpec(_save_model(tmp_path, "a", 0)), Color.O)
+  other: DQN = DQN.load(_save_model(tmp_path, "b", 1))
+
+  env.set_opponent_parameters(other.get_parameters())
+  obs: np.ndarray = np.random.default_rng(0).integers(-1, 2, size=(32, 6, 7)).astype(np.float32)
+  assert (env.opponent.predict(obs, deterministic=True)[0] == other.predict(obs, deterministic=True)[0]).all()
+
+def test_subproc_vec_env_with_specs(tmp_path):
+  path: str = _save_model(tmp_path, "a", 0)
+  vec_env: SubprocVecEnv = SubprocVecEnv([lambda: ConnectFourEnv(ModelSpec(path), Color.X) for _ in range(2)], start_method="fork")
+  try:
+    vec_env.reset()
+    vec_env.env_method("set_opponent_parameters", DQN.load(_save_model(tmp_path, "b", 1)).get_parameters())
+    obs, rewards, dones, infos = vec_env.step(np.array([3, 3]))
+    assert obs.shape == (2, 6, 7)
+  finally:
+    vec_env.close()
+
+def test_solver_spec():
+  env: Ttt1PlayEnv = Ttt1PlayEnv(SolverSpec(TttOptimalPlayer), Color.O)
+  env.reset()
+  _, _, done, _, _ = env.step(4)
+  assert not done
+  assert isinstance(env.opponent._opponent, TttOptimalPlayer)
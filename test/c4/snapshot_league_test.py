@@ -0,0 +1,87 @@
+import numpy as np
+from stable_baselines3 import DQN
+from c4.batched_opponent_vec_env import BatchedOpponentVecEnv
+from c4.c4_board import Color
+from c4.snapshot_league import LeagueCallback, SnapshotLeague
+from c4.ttt_2_play_env import Ttt2PlayEnv
+
+def _model(seed: int, env=None) -> DQN:
+  return DQN("MlpPolicy", env if env is not None else Ttt2PlayEnv(None, Color.O), learning_starts=50, seed=seed)
+
+def _random_boards(count: int) -> np.ndarray:
+  return np.random.default_rng(0).integers(-1, 2, size=(count, 3, 3)).astype(np.float32)
+
+def test_snapshots_play_like_their_model():
+  boards: np.ndarray = _random_boards(200)
+  for dtype in (np.float32, np.float16):
+    league: SnapshotLeague = SnapshotLeague(dtype=dtype)
+    model: DQN = _model(0)
+    snapshot_id: int = league.add(model)
+    expected, _ = model.policy.predict(boards, deterministic=True)
+    actions, _ = league.opponent(snapshot_id).predict(boards, deterministic=True)
+    # Half precision may flip the odd near-tie
+    assert (actions == expected).mean() >= (1.0 if dtype == np.float32 else 0.95)
+
+  # Snapshots are frozen: later changes to the model don't reach them
+  snapshot_policy = league.opponent(snapshot_id)
+  for parameter in model.policy.parameters():
+    parameter.data.fill_(0.0)
+  assert any(float(parameter.detach().abs().sum()) > 0 for parameter in snapshot_policy.parameters())
+
+def test_pool_and_cache_stay_within_bounds():
+  models: list[DQN] = [_model(seed) for seed in range(6)]
+  league: SnapshotLeague = SnapshotLeague(max_snapshots=3, cache_size=2)
+  ids: list[int] = [league.add(model) for model in models]
+  assert list(league.snapshots) == ids[-3:]
+
+  # Lazy loading, with the least recently used policy evicted first
+  league.opponent(ids[3])
+  league.opponent(ids[4])
+  league.opponent(ids[3])
+  assert league.loads == 2
+  league.opponent(ids[5])
+  league.opponent(ids[3])
+  assert league.loads == 3
+  league.opponent(ids[4])
+  assert league.loads == 4
+
+  # The memory cap bounds blobs and cached policies together
+  blob: int = len(league.snapshots[ids[5]].blob)
+  # Room for two snapshots and one loaded policy (two are cached above)
+  policy: int = (league.memory_usage() - sum(len(snapshot.blob) for snapshot in league.snapshots.values())) // 2
+  capped: SnapshotLeague = SnapshotLeague(memory_cap=int(2.5 * blob) + policy)
+  for model in models:
+    snapshot_id: int = capped.add(model)
+    capped.opponent(snapshot_id)
+    assert capped.memory_usage() <= capped.memory_cap
+  assert len(capped.snapshots) == 2
+
+def test_loss_rate_prioritisation_favours_strong_snapshots():
+  league: SnapshotLeague = SnapshotLeague(seed=1)
+  weak, strong = league.add(_model(0)), league.add(_model(1))
+  for _ in range(20):
+    league.record(weak, 1.0)
+    league.record(strong, 0.0)
+  samples: list[int] = [league.sample() for _ in range(1000)]
+  assert samples.count(strong) > 0.9 * len(samples)
+
+  uniform: SnapshotLeague = SnapshotLeague(prioritisation="uniform", seed=1)
+  for model in (_model(0), _model(1)):
+    uniform.add(model)
+  assert 400 < [uniform.sample() for _ in range(1000)].count(0) < 600
+
+def test_callback_samples_opponents_without_rebuilding_envs():
+  league: SnapshotLeague = SnapshotLeague(seed=0)
+  league.add(_model(0))
+  vec_env: BatchedOpponentVecEnv = BatchedOpponentVecEnv(
+    [lambda: Ttt2PlayEnv(league.opponent(0), Color.X) for _ in range(4)], per_env_opponents=True)
+  envs: list[Ttt2PlayEnv] = [env.unwrapped for env in vec_env.envs]
+
+  model: DQN = _model(1, vec_env)
+  model.learn(600, callback=LeagueCallback(league, snapshot_interval=200))
+
+  assert [env.unwrapped for env in vec_env.envs] == envs
+  assert len(league.snapshots) == 4
+  assert sum(snapshot.games for snapshot in league.snapshots.values()) > 0
+  # At most one predict() per distinct opponent per step, plus openings
+  assert vec_env.predict_calls <= 2 * 4 * (600 // 4 + 1)
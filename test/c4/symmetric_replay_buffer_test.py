@@ -0,0 +1,73 @@
+import numpy as np
+import torch
+from c4.c4_board import C4Board, Color
+from c4.c4_env import ConnectFourEnv
+from c4.symmetric_replay_buffer import SymmetricReplayBuffer, board_symmetries
+from c4.ttt_board import TttBoard
+from c4.ttt_2_play_env import Ttt2PlayEnv
+
+def _images(board: np.ndarray, cells: np.ndarray) -> set[bytes]:
+  return {board.reshape(-1)[symmetry].tobytes() for symmetry in cells}
+
+def test_symmetries_map_moves_onto_moves():
+  rng = np.random.default_rng(0)
+  for rows, columns, action_count in ((3, 3, 9), (6, 7, 7), (5, 4, 4)):
+    cells, actions = board_symmetries(rows, columns, action_count)
+    assert len(cells) == (8 if action_count == 9 else 2)
+    assert (cells[0] == np.arange(rows * columns)).all()
+    assert len(_images(np.arange(rows * columns), cells)) == len(cells)
+
+  # Playing a move, then transforming the board, is transforming the board,
+  # then playing the transformed move
+  for _ in range(50):
+    c4: C4Board = C4Board()
+    for _ in range(rng.integers(0, 20)):
+      c4.make_move(c4.expected_next_move_color, int(rng.choice(c4.legal_moves())))
+    cells, actions = board_symmetries(c4.rows, c4.columns, c4.columns)
+    for symmetry in range(len(cells)):
+      mirrored: C4Board = C4Board()
+      for move in c4.history:
+        mirrored.make_move(mirrored.expected_next_move_color, int(actions[symmetry, move]))
+      assert (mirrored.board.reshape(-1) == c4.board.reshape(-1)[cells[symmetry]]).all()
+
+    ttt: TttBoard = TttBoard()
+    for _ in range(rng.integers(0, 8)):
+      ttt.make_move(ttt.expected_next_move_color, int(rng.choice(ttt.legal_moves())))
+    cells, actions = board_symmetries(3, 3, 9)
+    for symmetry in range(len(cells)):
+      image: TttBoard = TttBoard()
+      for move in ttt.history:
+        image.make_move(image.expected_next_move_color, int(actions[symmetry, move]))
+      assert (image.board.reshape(-1) == ttt.board.reshape(-1)[cells[symmetry]]).all()
+
+def test_samples_are_symmetric_images_of_stored_transitions():
+  rng = np.random.default_rng(1)
+  for env in (Ttt2PlayEnv(None, Color.O), ConnectFourEnv(None, Color.O)):
+    rows, columns = env.observation_space.shape
+    action_count: int = int(env.action_space.n)
+    buffer: SymmetricReplayBuffer = SymmetricReplayBuffer(100, env.observation_space, env.action_space)
+    cells, actions = board_symmetries(rows, columns, action_count)
+
+    stored: set[bytes] = set()
+    for _ in range(50):
+      obs: np.ndarray = rng.integers(-1, 2, size=(1, rows, columns)).astype(np.float32)
+      action: np.ndarray = rng.integers(action_count, size=(1, 1))
+      next_obs: np.ndarray = rng.integers(-1, 2, size=(1, rows, columns)).astype(np.float32)
+      buffer.add(obs, next_obs, action, np.array([0.5]), np.array([False]), [{}])
+      for symmetry in range(len(cells)):
+        stored.add((
+          obs.reshape(-1)[cells[symmetry]].tobytes()
+          + next_obs.reshape(-1)[cells[symmetry]].tobytes()
+          + np.int64(actions[symmetry, action[0, 0]]).tobytes()))
+
+    torch.manual_seed(0)
+    samples = buffer.sample(400)
+    seen: set[bytes] = set()
+    for obs_t, next_obs_t, action_t in zip(samples.observations, samples.next_observations, samples.actions):
+      key: bytes = (
+        obs_t.numpy().reshape(-1).tobytes() + next_obs_t.numpy().reshape(-1).tobytes() + np.int64(action_t[0]).tobytes())
+      assert key in stored
+      seen.add(key)
+    # Not just the stored transitions themselves
+    assert len(seen) > 50
+    assert (samples.rewards == 0.5).all()
@@ -1,4 +1,5 @@
-from c4.ttt_board import TttBoard, Color
+import random
+from c4.ttt_board import STATE_COUNT, TttBoard, Color
 
 def test_board_legal_moves():
   board: TttBoard = TttBoard()
@@ -93,3 +94,64 @@ X . .
   board: TttBoard = TttBoard.from_string(input)
   for ii in range(9):
     assert not board.failed_to_block(ii)
+
+def test_wins_at_last_move():
+  board: TttBoard = TttBoard()
+  assert not board.wins_at_last_move()
+
+  for move in [0, 3, 4, 5, 6, 8, 2]:
+    board.make_move(board.expected_next_move_color, move)
+    assert board.wins_at_last_move() == (move == 2)
+
+  board = TttBoard()
+  for move in [0, 3, 1, 4, 8, 5, 2]:
+    color: Color = board.expected_next_move_color
+    board.make_move(color, move)
+    assert board.wins_at_last_move() == board.is_winning(color)
+
+def test_zobrist_key():
+  board1: TttBoard = TttBoard()
+  for move in [0, 4, 8]:
+    board1.make_move(board1.expected_next_move_color, move)
+
+  board2: TttBoard = TttBoard()
+  for move in [8, 4, 0]:
+    board2.make_move(board2.expected_next_move_color, move)
+
+  assert board1.key() == board2.key()
+  assert board1.key() == TttBoard.from_string(board1.to_string()).key()
+  assert board1.key() != TttBoard().key()
+
+  board2.make_move(Color.X, 1)
+  assert board1.key() != board2.key()
+
+def test_unmake_move():
+  board: TttBoard = TttBoard()
+  board.make_move(Color.O, 4)
+  before = (board.state(), board.key(), board.index, board.last_move, board.move_count)
+
+  board.make_move(Color.X, 0)
+  board.unmake_move()
+  assert (board.state(), board.key(), board.index, board.last_move, board.move_count) == before
+  assert board.expected_next_move_color == Color.X
+
+  board.unmake_move()
+  assert board.key() == TttBoard().key()
+  assert board.last_move == -1
+  assert board.expected_next_move_color == Color.O
+
+def test_state_index():
+  rng = random.Random(3)
+  indices: dict[int, tuple] = {}
+  for _ in range(300):
+    board: TttBoard = TttBoard()
+    while not board.is_tie() and not board.wins_at_last_move():
+      board.make_move(board.expected_next_move_color, rng.choice(board.legal_moves()))
+      assert 0 <= board.index < STATE_COUNT
+      assert board.index == TttBoard.compute_index(board.board)
+      assert indices.setdefault(board.index, board.state()) == board.state()
+    assert TttBoard.from_string(board.to_string()).index == board.index
+    assert board.copy().index == board.index
+    while len(board.history) > 0:
+      board.unmake_move()
+    assert board.index == 0
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+from c4.c4_board import Color
+from c4.ttt_board import TttBoard
+from c4.ttt_optimal_player import HEADER_DTYPE, RECORD_DTYPE, TttOptimalPlayer
+from c4.ttt_tables import CACHE_NAME as TABLES_CACHE_NAME
+
+def _negamax(board: TttBoard, player: TttOptimalPlayer, seen: set[int]) -> int:
+  # Plain recursive solve, checking the player's table along the way
+  scores: dict[int, int] = {}
+  for move in board.legal_moves():
+    board.make_move(board.expected_next_move_color, move)
+    scores[move] = 1 if board.wins_at_last_move() else 0 if board.is_tie() else -_negamax(board, player, seen)
+    board.unmake_move()
+
+  value: int = max(scores.values())
+  if board.index not in seen:
+    seen.add(board.index)
+    assert player.score(board) == value
+    assert scores[player.get_optimal_move(board)] == value
+    for move, score in scores.items():
+      assert player.move_scores[board.index, move] == score
+  return value
+
+def test_matches_tree_search(tmp_path):
+  player: TttOptimalPlayer = TttOptimalPlayer(str(tmp_path / "optimal.bin"))
+  seen: set[int] = set()
+  assert _negamax(TttBoard(), player, seen) == 0
+  assert len(seen) == 4520  # Non-terminal positions reachable in legal play
+
+  board: TttBoard = TttBoard.from_string("""
+    O O .
+    X X .
+    . . .
+  """)
+  assert player.get_optimal_move(board) == 2
+  assert player.score(board) == 1
+
+  # X to move must block
+  board = TttBoard()
+  for move in (0, 4, 1):
+    board.make_move(board.expected_next_move_color, move)
+  assert board.expected_next_move_color == Color.X
+  assert player.get_optimal_move_for_X(board) == 2
+  assert player.score(board) == 0
+
+def test_table_file_is_mapped(tmp_path):
+  path: str = str(tmp_path / "optimal.bin")
+  TttOptimalPlayer(path)
+  assert sorted(os.listdir(tmp_path)) == ["optimal.bin", TABLES_CACHE_NAME]  # Tables cached alongside
+  player: TttOptimalPlayer = TttOptimalPlayer(path)
+  assert isinstance(player.records, np.memmap)
+  with open(path, "rb") as file:
+    size: int = len(file.read())
+  assert size == HEADER_DTYPE.itemsize + len(player.records) * RECORD_DTYPE.itemsize
+
+  # A damaged file is regenerated
+  with open(path, "r+b") as file:
+    file.write(b"garbage")
+  assert TttOptimalPlayer(path).get_optimal_move(TttBoard()) == player.get_optimal_move(TttBoard())
+
+def test_random_ties(tmp_path):
+  player: TttOptimalPlayer = TttOptimalPlayer(str(tmp_path / "optimal.bin"), random_ties=True, seed=0)
+  openings: set[int] = {player.get_optimal_move(TttBoard()) for _ in range(200)}
+  assert openings == set(range(9))  # Every opening draws
+
+  # Perfect play against itself always draws
+  for _ in range(50):
+    board: TttBoard = TttBoard()
+    while not board.is_tie() and not board.wins_at_last_move():
+      board.make_move(board.expected_next_move_color, player.get_optimal_move(board))
+    assert board.is_tie() and not board.wins_at_last_move()
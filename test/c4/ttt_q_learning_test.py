@@ -0,0 +1,165 @@
+import multiprocessing
+import os
+import random
+import numpy as np
+import pytest
+from c4.cache import CACHE_DIR_VARIABLE
+from c4.ttt_board import TttBoard
+from c4.ttt_optimal_player import TttOptimalPlayer
+from c4.ttt_q_learning import CACHE_NAME, QTableFileError, TttQLearning
+
+def test_q_table_only_picks_legal_moves():
+  random.seed(0)
+  learner: TttQLearning = TttQLearning()
+  for _ in range(5000):
+    learner.train_one_game()
+  assert np.isneginf(learner.q_table[~learner.tables.legal]).all()
+  assert np.isfinite(learner.q_table[learner.tables.legal]).all()
+
+  rng = random.Random(1)
+  for _ in range(200):
+    board: TttBoard = TttBoard()
+    for _ in range(rng.randrange(8)):
+      board.make_move(board.expected_next_move_color, rng.choice(board.legal_moves()))
+      if board.wins_at_last_move():
+        break
+    if not board.wins_at_last_move():
+      assert learner.best_move(board) in board.legal_moves()
+
+def test_learns_to_take_a_win():
+  random.seed(2)
+  learner: TttQLearning = TttQLearning()
+  learner.train_multiple_games(20000)
+  board: TttBoard = TttBoard.from_string("""
+    O O .
+    X X .
+    . . .
+  """)
+  assert learner.best_move(board) == 2
+
+def test_batched_updates_match_sequential_ones():
+  rng = np.random.default_rng(3)
+  batched: TttQLearning = TttQLearning()
+  sequential: TttQLearning = TttQLearning()
+  batched.q_table[batched.tables.legal] = rng.uniform(-1, 1, size=np.count_nonzero(batched.tables.legal))
+  sequential.q_table[:] = batched.q_table
+
+  # Repeats of a few entries, in any order, each toward its own next state
+  states: np.ndarray = rng.choice(np.flatnonzero(~batched.tables.terminal), size=20)
+  keys: np.ndarray = rng.choice(np.flatnonzero(batched.tables.legal[states].reshape(-1)), size=200)
+  keys = states[keys // 9] * 9 + keys % 9
+  entries, counts = TttQLearning._count_entries(keys)
+  assert counts.sum() == len(keys) and (np.diff(entries) > 0).all()
+
+  targets: np.ndarray = rng.uniform(-1, 1, size=len(entries))
+  batched._apply_updates(entries, counts, targets)
+  for key in keys:
+    target: float = float(targets[np.searchsorted(entries, key)])
+    old_q: float = float(sequential.q_table.reshape(-1)[key])
+    sequential.q_table.reshape(-1)[key] = old_q + sequential.learning_rate * (target - old_q)
+  assert np.allclose(batched.q_table[batched.tables.legal], sequential.q_table[sequential.tables.legal], atol=1e-6)
+
+def test_lock_step_training_plays_like_sequential_training(tmp_path):
+  random.seed(4)
+  sequential: TttQLearning = TttQLearning()
+  sequential.train_multiple_games(20000)
+  lock_step: TttQLearning = TttQLearning()
+  lock_step.train_lock_step(20000, parallel_games=1024, seed=4)
+  assert np.isneginf(lock_step.q_table[~lock_step.tables.legal]).all()
+  assert np.isfinite(lock_step.q_table[lock_step.tables.legal]).all()
+
+  # Greedy moves as often optimal, over every position reachable in play
+  optimal: TttOptimalPlayer = TttOptimalPlayer(str(tmp_path / "optimal.bin"), tables=lock_step.tables)
+  states: np.ndarray = lock_step.tables.reachable_states
+  rates: list[float] = []
+  for learner in (sequential, lock_step):
+    moves: np.ndarray = learner.q_table[states].argmax(axis=1)
+    rates.append(float((optimal.move_scores[states, moves] == optimal.scores[states]).mean()))
+  assert rates[1] > rates[0] - 0.03
+
+  board: TttBoard = TttBoard.from_string("""
+    O O .
+    X X .
+    . . .
+  """)
+  assert lock_step.best_move(board) == 2
+
+def test_shared_training_across_processes(capsys):
+  learner: TttQLearning = TttQLearning()
+  learner.train_shared(40000, workers=2, parallel_games=1024, sync_games=5000, seed=5, report_every=10000)
+  assert np.isneginf(learner.q_table[~learner.tables.legal]).all()
+  assert np.isfinite(learner.q_table[learner.tables.legal]).all()
+
+  # Progress lines for the games of both workers together
+  lines: list[str] = capsys.readouterr().out.splitlines()
+  assert lines[-1].startswith("Iteration 40000:")
+
+  board: TttBoard = TttBoard.from_string("""
+    O O .
+    X X .
+    . . .
+  """)
+  assert learner.best_move(board) == 2
+
+def test_shared_training_defaults_to_one_worker_per_core(monkeypatch):
+  started: list[int] = []
+  process_class = multiprocessing.Process
+  def process(*args, **kwargs):
+    started.append(kwargs["args"][1])  # The worker's game count
+    return process_class(*args, **kwargs)
+  monkeypatch.setattr(multiprocessing, "cpu_count", lambda: 3)
+  monkeypatch.setattr(multiprocessing, "Process", process)
+
+  learner: TttQLearning = TttQLearning()
+  learner.train_shared(3000, parallel_games=64, sync_games=1000, seed=0)
+  assert started == [1000, 1000, 1000]
+  assert learner.games == 3000
+
+def test_save_and_load(tmp_path):
+  learner: TttQLearning = TttQLearning()
+  learner.train_lock_step(20000, parallel_games=1024, seed=6)
+  path: str = str(tmp_path / "q.bin")
+  learner.save(path)
+
+  loaded: TttQLearning = TttQLearning.load(path, games=20000)
+  assert loaded.games == 20000
+  assert np.array_equal(loaded.q_table, learner.q_table)
+  # Training goes on in memory, without touching the file
+  loaded.train_lock_step(1000, seed=7)
+  assert loaded.games == 21000
+  assert np.array_equal(TttQLearning.load(path).q_table, learner.q_table)
+
+  with pytest.raises(QTableFileError, match="games"):
+    TttQLearning.load(path, games=10000)
+  with pytest.raises(QTableFileError):
+    TttQLearning.load(str(tmp_path / "missing.bin"))
+
+def test_default_path_follows_cache_dir(tmp_path, monkeypatch):
+  monkeypatch.setenv(CACHE_DIR_VARIABLE, str(tmp_path))
+  TttQLearning().save()
+  assert os.path.exists(tmp_path / CACHE_NAME)
+  assert TttQLearning.load().games == 0
+
+def test_bad_saved_tables_are_rejected(tmp_path):
+  learner: TttQLearning = TttQLearning()
+  path: str = str(tmp_path / "q.bin")
+  learner.save(path)
+  data: bytes = open(path, "rb").read()
+
+  def rejected(contents: bytes) -> bool:
+    with open(path, "wb") as file:
+      file.write(contents)
+    try:
+      TttQLearning.load(path)
+    except QTableFileError:
+      return True
+    return False
+
+  assert not rejected(data)
+  assert rejected(data[:-4])  # Truncated
+  assert rejected(data[:1000] + bytes([data[1000] ^ 1]) + data[1001:])  # A flipped bit
+  assert rejected(b"TTTQTAB" + (2).to_bytes(2, "little") + data[9:])  # Another version
+
+  learner.gamma = 0.9
+  learner.save(path)
+  assert rejected(open(path, "rb").read())
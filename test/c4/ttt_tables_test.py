@@ -0,0 +1,73 @@
+import os
+import numpy as np
+from c4.c4_board import Color
+from c4.cache import CACHE_DIR_VARIABLE
+from c4.ttt_board import TttBoard
+from c4.ttt_tables import CACHE_NAME, TttTables, load_ttt_tables, ttt_tables
+
+def _check(tables: TttTables, board: TttBoard, seen: set[int]) -> None:
+  # Every position reachable from "board", against TttBoard
+  state: int = board.index
+  if state in seen:
+    return
+  seen.add(state)
+
+  won: bool = board.is_winning(Color.O) or board.is_winning(Color.X)
+  assert np.flatnonzero(tables.legal[state]).tolist() == board.legal_moves()
+  assert tables.to_move[state] == board.expected_next_move_color.value
+  assert tables.terminal[state] == (won or board.is_tie())
+  expected_winner: Color = Color.O if board.is_winning(Color.O) else Color.X if board.is_winning(Color.X) else Color.NONE
+  assert tables.winner[state] == expected_winner.value
+  if won:
+    return
+
+  for move in range(9):
+    if move not in board.legal_moves():
+      assert tables.play(state, move) == -1
+      continue
+    board.make_move(board.expected_next_move_color, move)
+    assert tables.play(state, move) == board.index
+    _check(tables, board, seen)
+    board.unmake_move()
+
+def test_tables_match_board():
+  seen: set[int] = set()
+  _check(TttTables.build(), TttBoard(), seen)
+  assert len(seen) == 5478  # Positions reachable in legal play
+
+  tables: TttTables = TttTables.build()
+  assert tables.reachable_states.tolist() == sorted(state for state in seen if not tables.terminal[state])
+
+def test_vectorized_play():
+  tables: TttTables = TttTables.build()
+  rng = np.random.default_rng(0)
+  states: np.ndarray = np.zeros(1000, dtype=np.int64)
+  for _ in range(9):
+    live: np.ndarray = ~tables.terminal[states]
+    moves: np.ndarray = np.argmax(rng.random((len(states), 9)) * tables.legal[states], axis=1)
+    states = np.where(live, tables.play(states, moves), states)
+  assert tables.terminal[states].all()
+  assert set(np.unique(tables.winner[states]).tolist()) == {-1, 0, 1}
+
+def test_cached_on_disk(tmp_path):
+  path: str = str(tmp_path / "tables.npz")
+  built: TttTables = ttt_tables(path)
+  load_ttt_tables.cache_clear()
+  loaded: TttTables = ttt_tables(path)
+  assert loaded is not built
+  for name in ("next_state", "legal", "winner", "terminal", "to_move"):
+    assert (getattr(loaded, name) == getattr(built, name)).all()
+    assert not getattr(loaded, name).flags.writeable
+
+  # A damaged cache file is rebuilt
+  with open(path, "wb") as file:
+    file.write(b"not tables")
+  load_ttt_tables.cache_clear()
+  assert (ttt_tables(path).next_state == built.next_state).all()
+  assert TttTables.load(path).winner.shape == built.winner.shape
+  load_ttt_tables.cache_clear()
+
+def test_default_path_follows_cache_dir(tmp_path, monkeypatch):
+  monkeypatch.setenv(CACHE_DIR_VARIABLE, str(tmp_path))
+  ttt_tables()
+  assert os.path.exists(tmp_path / CACHE_NAME)
@@ -0,0 +1,15 @@
+import os
+import pytest
+from c4.cache import CACHE_DIR_VARIABLE
+
+@pytest.fixture(autouse=True, scope="session")
+def cache_dir(tmp_path_factory):
+  # Tables the code under test caches go to a temporary directory, not to
+  # the user's home
+  previous: str | None = os.environ.get(CACHE_DIR_VARIABLE)
+  os.environ[CACHE_DIR_VARIABLE] = str(tmp_path_factory.mktemp("cache"))
+  yield os.environ[CACHE_DIR_VARIABLE]
+  if previous is None:
+    del os.environ[CACHE_DIR_VARIABLE]
+  else:
+    os.environ[CACHE_DIR_VARIABLE] = previous